@@ -1,34 +1,71 @@
-from flask import Flask, request, jsonify, send_file
+import time
+_import_started = time.perf_counter()  # reported by /health as import_seconds
+
+from flask import Flask, Request, request, jsonify, send_file, Response, stream_with_context
 from flask_cors import CORS
 from flask_sqlalchemy import SQLAlchemy
 from flask_bcrypt import Bcrypt
-from flask_jwt_extended import JWTManager, jwt_required, get_jwt_identity
+from flask_jwt_extended import JWTManager, jwt_required, get_jwt_identity, get_jwt
 from dotenv import load_dotenv
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
-from werkzeug.utils import secure_filename
+from werkzeug.exceptions import RequestEntityTooLarge
+import tempfile
 import os
 import random
-import traceback  # ✅ ADDED: For detailed error logging
-from config import GEMINI_API_KEY
-from models import predict_conversions, predict_roi, predict_actual_roi, predict_actual_conversions, encode_categorical
+import secrets
+import uuid
+from config import (
+    GEMINI_API_KEY, JWT_SECRET_KEY, CONFIG_ERRORS, EXPLAIN_PREDICTIONS, JWT_ACCESS_TOKEN_MINUTES, JWT_REFRESH_TOKEN_DAYS, BCRYPT_LOG_ROUNDS,
+    SEGMENT_METRICS_SHM, DASHBOARD_FEED_SHM, DRIFT_MONITORING, MAX_FILE_SIZE, MAX_REQUEST_SIZE, MAX_JSON_BODY_SIZE, UPLOAD_SPOOL_SIZE, TEMP_DIR, CHUNK_MAX_SIZE,
+    RESULT_PAGE_SIZE, RESULT_PAGE_MAX
+)
+from models import predict_conversions, predict_roi, predict_actual_roi, predict_actual_conversions, get_model_status, warm_up
 from utils import fetch_suggestions
-from reports import generate_pdf
-from input_predict import validate_file, process_file
+from input_predict import validate_frame, summarize_report, process_file, coerce_numeric
+from ingest import read_upload, is_supported, SUPPORTED_EXTENSIONS
+from exports import select_columns, iter_export, EXPORT_MIME_TYPES
+import chunked_uploads
+from chunked_uploads import UploadError
+from serializers import results_response, json_response
+from scenarios import run_sweep, ScenarioError
+from batch_predict import score_batch, add_batch_suggestions, BatchError
+from explanations import explain_rows, average_contributions
+from optimizer import optimize_budget, OptimizationError
+from prediction_store import persist_results, write_metrics
+from result_store import save_results, load_results, result_exists, ResultStoreError
+from concurrency import offload
+from logging_setup import get_logger, init_request_logging
+from compression import compress_response, accepts_compressed_body
+from profiling import init_profiling, is_profile_admin, list_profiles, profile_path
+from jobs import enqueue_upload_job, get_job, job_status, job_result
 from database_models import db
-from auth import register_user, login_user
+from auth import register_user, login_user, refresh_access_token, revoke_refresh_token, is_token_revoked, AuthBusyError
+from dashboard_feed import DashboardFeed, point_from_prediction, stream_events
+from segment_metrics import SegmentRingBuffer
+from drift_monitor import DriftMonitor
 import warnings
 
 
 warnings.filterwarnings('ignore', category=UserWarning, module='pickle')
 
+log = get_logger('app')
+
 
 # Load environment variables
 load_dotenv()
 
 
+class UploadRequest(Request):
+    """Request that spools file uploads above UPLOAD_SPOOL_SIZE to a private temp file."""
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return tempfile.SpooledTemporaryFile(max_size=UPLOAD_SPOOL_SIZE, mode='rb+', dir=TEMP_DIR)
+
+
 app = Flask(__name__)
+app.request_class = UploadRequest
 
 
 # ✅ FIXED CORS CONFIGURATION
@@ -41,7 +78,7 @@ CORS(app, resources={
             "https://*.onrender.com"
         ],
         "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS"],
-        "allow_headers": ["Content-Type", "Authorization"],
+        "allow_headers": ["Content-Type", "Content-Encoding", "Authorization", "X-Finvix-Profile"],
         "supports_credentials": True,
         "expose_headers": ["Content-Type", "Authorization"]
     }
@@ -67,7 +104,14 @@ else:
 
 
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-app.config['JWT_SECRET_KEY'] = os.getenv('JWT_SECRET_KEY', 'default-secret-key-change-in-production')
+# Backstop for bodies without a Content-Length; the per-route limits are in request_size_limit()
+app.config['MAX_CONTENT_LENGTH'] = max(MAX_REQUEST_SIZE, MAX_JSON_BODY_SIZE)
+# No hard-coded fallback: production refuses to start without JWT_SECRET_KEY, and a local
+# setup without one signs with a random per-process key (tokens end with the process)
+app.config['JWT_SECRET_KEY'] = JWT_SECRET_KEY or secrets.token_urlsafe(32)
+app.config['JWT_ACCESS_TOKEN_EXPIRES'] = timedelta(minutes=JWT_ACCESS_TOKEN_MINUTES)
+app.config['JWT_REFRESH_TOKEN_EXPIRES'] = timedelta(days=JWT_REFRESH_TOKEN_DAYS)
+app.config['BCRYPT_LOG_ROUNDS'] = BCRYPT_LOG_ROUNDS
 
 
 # Initialize extensions
@@ -76,6 +120,20 @@ app.bcrypt = Bcrypt(app)
 jwt = JWTManager(app)
 
 
+# Profiling hooks are registered after compression so profiles exclude compression
+# time; they are not installed at all unless PROFILE_ADMINS or PROFILE_USERS is set
+# Request logs are registered first so they run last and see the final response size
+init_request_logging(app)
+app.after_request(compress_response)
+if init_profiling(app):
+    log.info("🔬 Request profiling enabled")
+
+
+@jwt.token_in_blocklist_loader
+def check_token_revoked(jwt_header, jwt_payload):
+    return is_token_revoked(jwt_payload)
+
+
 input_features = [
     'Ad Spend', 'Clicks', 'Impressions', 'Conversion Rate',
     'Click-Through Rate (CTR)', 'Cost Per Click (CPC)', 'Cost Per Conversion',
@@ -165,10 +223,102 @@ def simulate_dashboard_data():
     return data[::-1]
 
 
+# Live dashboard window shared by /dashboard/stream clients (across workers when
+# DASHBOARD_FEED_SHM is set), seeded once from the simulation
+dashboard_feed = DashboardFeed(seed_fn=simulate_dashboard_data, shm_name=DASHBOARD_FEED_SHM or None)
+
+# Rolling ROI/conversions/CTR/cost-per-conversion per Campaign Type and Region
+segment_metrics = SegmentRingBuffer(shm_name=SEGMENT_METRICS_SHM or None)
+
+# Fixed-memory sketches of live model inputs, scored against the reference profile
+drift_monitor = DriftMonitor.from_path() if DRIFT_MONITORING else None
+
+
+def record_live_predictions(inputs, results, frame=None):
+    """Push predictions to live dashboard clients, segment aggregates and drift sketches without failing the request."""
+    try:
+        now = datetime.now()
+        points = [point_from_prediction(row, result, now) for row, result in zip(inputs, results)]
+        dashboard_feed.publish_many(points)
+        segment_metrics.update_many(points)
+        if drift_monitor is not None:
+            drift_monitor.observe(frame if frame is not None else pd.DataFrame(inputs))
+    except Exception as e:
+        log.warning(f"⚠️ Live metrics update failed: {str(e)}")
+
+
+# Endpoints that take whole result sets as JSON; every other route gets the upload limit
+JSON_BODY_ENDPOINTS = {'predict_batch', 'upload_report', 'download_results'}
+
+
+def request_size_limit():
+    return MAX_JSON_BODY_SIZE if request.endpoint in JSON_BODY_ENDPOINTS else MAX_REQUEST_SIZE
+
+
+@app.before_request
+def reject_oversized_request():
+    # Checked before any view runs, so a view's catch-all error handling cannot turn the 413 into a 400
+    if request.content_length is not None and request.content_length > request_size_limit():
+        raise RequestEntityTooLarge()
+
+
+@app.errorhandler(RequestEntityTooLarge)
+def request_too_large(e):
+    return jsonify({
+        'error': f'Request too large. Maximum request size is {request_size_limit() // (1024 * 1024)}MB',
+        'status': 'error'
+    }), 413
+
+
+def upload_too_large():
+    return jsonify({
+        'error': f'File too large. Maximum upload size is {MAX_FILE_SIZE // (1024 * 1024)}MB',
+        'status': 'error'
+    }), 413
+
+
 # Health check endpoint for Render
 @app.route('/health', methods=['GET'])
 def health_check():
-    return jsonify({'status': 'healthy', 'service': 'finvix-backend'}), 200
+    """Readiness: 200 only once config is valid and the models have been warmed up."""
+    model_status = get_model_status()
+    ready = model_status['ready'] and not CONFIG_ERRORS
+    return jsonify({
+        'status': 'healthy' if ready else 'unavailable',
+        'service': 'finvix-backend',
+        'ready': ready,
+        'models': model_status,
+        'config_errors': CONFIG_ERRORS,
+        'timings': {
+            'import_seconds': IMPORT_SECONDS,
+            'model_load_seconds': model_status['load_seconds'],
+            'warmup_seconds': model_status['warmup_seconds']
+        }
+    }), 200 if ready else 503
+
+
+def render_pdf(prefix, *args, **kwargs):
+    """
+    generate_pdf on a native thread into a new temporary file; returns its path.
+
+    reports pulls in matplotlib and reportlab, so it is imported on first use.
+    """
+    from reports import generate_pdf
+    fd, path = tempfile.mkstemp(prefix=f"{prefix}_{datetime.now().strftime('%Y%m%d_%H%M%S')}_", suffix='.pdf', dir=TEMP_DIR)
+    os.close(fd)
+    try:
+        offload(generate_pdf, path, *args, **kwargs)
+    except Exception:
+        os.remove(path)
+        raise
+    return path
+
+
+def send_report(path, download_name=None, **kwargs):
+    """send_file for a rendered report; the file is unlinked at once and lives on only in the open handle."""
+    report = open(path, 'rb')
+    os.remove(path)
+    return send_file(report, as_attachment=True, download_name=download_name or os.path.basename(path), **kwargs)
 
 
 # Public Routes
@@ -197,9 +347,10 @@ def register():
             return jsonify({"message": error}), 409
         
         return jsonify({"message": "User registered successfully"}), 201
+    except AuthBusyError as e:
+        return jsonify({"message": str(e)}), 429
     except Exception as e:
-        print(f"❌ Registration error: {str(e)}")
-        traceback.print_exc()  # ✅ ADDED: Detailed error logging
+        log.exception(f"❌ Registration error: {str(e)}")
         return jsonify({"message": f"Registration failed: {str(e)}"}), 500
 
 
@@ -213,17 +364,39 @@ def login():
         if not username or not password:
             return jsonify({"message": "Missing username or password"}), 400
         
-        access_token, error = login_user(username, password)
+        tokens, error = login_user(username, password)
         if error:
             return jsonify({"message": error}), 401
         
-        return jsonify({"access_token": access_token}), 200
+        return jsonify(tokens), 200
+    except AuthBusyError as e:
+        return jsonify({"message": str(e)}), 429
     except Exception as e:
-        print(f"❌ Login error: {str(e)}")
-        traceback.print_exc()  # ✅ ADDED: Detailed error logging
+        log.exception(f"❌ Login error: {str(e)}")
         return jsonify({"message": "Login failed"}), 500
 
 
+@app.route('/refresh', methods=['POST'])
+@jwt_required(refresh=True)
+def refresh():
+    try:
+        return jsonify({"access_token": refresh_access_token(get_jwt_identity())}), 200
+    except Exception as e:
+        log.exception(f"❌ Token refresh error: {str(e)}")
+        return jsonify({"message": "Token refresh failed"}), 500
+
+
+@app.route('/logout', methods=['POST'])
+@jwt_required(refresh=True)
+def logout():
+    try:
+        revoke_refresh_token(get_jwt()['jti'])
+        return jsonify({"message": "Logged out"}), 200
+    except Exception as e:
+        log.exception(f"❌ Logout error: {str(e)}")
+        return jsonify({"message": "Logout failed"}), 500
+
+
 @app.route('/greeting', methods=['GET'])
 @jwt_required()
 def greeting():
@@ -245,8 +418,7 @@ def greeting():
         }), 200
         
     except Exception as e:
-        print(f"❌ Greeting error: {str(e)}")
-        traceback.print_exc()  # ✅ ADDED: Detailed error logging
+        log.exception(f"❌ Greeting error: {str(e)}")
         return jsonify({'message': 'Failed to fetch greeting'}), 500
 
 
@@ -258,11 +430,112 @@ def dashboard():
         data = simulate_dashboard_data()
         return jsonify({'data': data, 'status': 'success'}), 200
     except Exception as e:
-        print(f"❌ Dashboard error: {str(e)}")
-        traceback.print_exc()  # ✅ ADDED: Detailed error logging
+        log.exception(f"❌ Dashboard error: {str(e)}")
         return jsonify({'message': f'Dashboard error: {str(e)}', 'status': 'error'}), 500
 
 
+@app.route('/dashboard/stream', methods=['GET'])
+@jwt_required(locations=['headers', 'query_string'])
+def dashboard_stream():
+    # EventSource cannot set headers, so the token may also come as ?jwt=<token>.
+    # Reconnecting browsers send Last-Event-ID; ?last_event_id= covers manual resumes.
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    return Response(
+        stream_with_context(stream_events(dashboard_feed, last_event_id)),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+
+@app.route('/metrics/segments', methods=['GET'])
+@jwt_required()
+def segment_metrics_summary():
+    try:
+        window = request.args.get('window', type=int)
+        return jsonify({
+            'window': segment_metrics.effective_window(window),
+            'segments': segment_metrics.summary(window),
+            'status': 'success'
+        }), 200
+    except Exception as e:
+        log.exception(f"❌ Segment metrics error: {str(e)}")
+        return jsonify({'message': f'Segment metrics error: {str(e)}', 'status': 'error'}), 500
+
+
+@app.route('/metrics/drift', methods=['GET'])
+@jwt_required()
+def drift_metrics():
+    if drift_monitor is None:
+        return jsonify({'error': 'Drift monitoring is disabled', 'status': 'error'}), 404
+    try:
+        return jsonify({**drift_monitor.scores(), 'status': 'success'}), 200
+    except Exception as e:
+        log.exception(f"❌ Drift metrics error: {str(e)}")
+        return jsonify({'message': f'Drift metrics error: {str(e)}', 'status': 'error'}), 500
+
+
+@app.route('/metrics/persistence', methods=['GET'])
+@jwt_required()
+def persistence_metrics():
+    """Bulk result write throughput for this worker process."""
+    return jsonify({'writes': write_metrics.summary(), 'status': 'success'}), 200
+
+
+def score_prediction(input_df, model_type):
+    """Run the prediction models for one input row; returns (result, actual_roi, actual_conversions)."""
+    # Get actual predictions with proper encoding
+    actual_roi = predict_actual_roi(input_df)
+    actual_conversions = predict_actual_conversions(input_df)
+
+    log.debug("✅ Actual predictions: ROI=%.2f, Conversions=%.2f", actual_roi, actual_conversions)
+
+    result = {}
+
+    if model_type in ['conversions', 'both']:
+        conv_pred = predict_conversions(input_df)
+        result['conversions'] = float(conv_pred)
+        result['conversions_status'] = determine_status(conv_pred, actual_conversions)
+        result['actual_conversions'] = float(actual_conversions)
+        log.debug("✅ Conversions prediction: %.2f (status: %s)", conv_pred, result['conversions_status'])
+
+    if model_type in ['roi', 'both']:
+        if 'conversions' not in result:
+            conv_pred = predict_conversions(input_df)
+        else:
+            conv_pred = result['conversions']
+        roi_df = input_df.copy()
+        roi_df['Conversions'] = conv_pred
+        roi_pred = predict_roi(roi_df)
+        result['roi'] = float(roi_pred)
+        result['roi_status'] = determine_status(roi_pred, actual_roi)
+        result['actual_roi'] = float(actual_roi)
+        log.debug("✅ ROI prediction: %.2f (status: %s)", roi_pred, result['roi_status'])
+
+    if EXPLAIN_PREDICTIONS and result:
+        result.update(explain_rows(input_df, model_type, conversions=[conv_pred])[0])
+
+    return result, actual_roi, actual_conversions
+
+
+@app.route('/admin/profiles', methods=['GET'])
+@jwt_required()
+def admin_profiles():
+    if not is_profile_admin(get_jwt_identity()):
+        return jsonify({'message': 'Admin access required', 'status': 'error'}), 403
+    return jsonify({'profiles': list_profiles(), 'status': 'success'}), 200
+
+
+@app.route('/admin/profiles/<profile_id>', methods=['GET'])
+@jwt_required()
+def admin_profile_download(profile_id):
+    if not is_profile_admin(get_jwt_identity()):
+        return jsonify({'message': 'Admin access required', 'status': 'error'}), 403
+    path = profile_path(profile_id)
+    if path is None or not os.path.exists(path):
+        return jsonify({'message': 'Profile not found', 'status': 'error'}), 404
+    return send_file(path, as_attachment=True, download_name=os.path.basename(path))
+
+
 @app.route('/predict', methods=['POST'])
 @jwt_required()
 def predict():
@@ -270,7 +543,7 @@ def predict():
         data = request.get_json()
         model_type = data.get('model_type', 'both')
         
-        print(f"🔍 Prediction request received: model_type={model_type}")  # ✅ ADDED: Request logging
+        log.debug("🔍 Prediction request received: model_type=%s", model_type)
         
         if 'input' not in data:
             return jsonify({'error': 'Missing input data', 'status': 'error'}), 400
@@ -305,35 +578,10 @@ def predict():
 
         input_df = pd.DataFrame([input_dict])
         
-        print(f"📊 Input DataFrame created with shape: {input_df.shape}")  # ✅ ADDED: Progress logging
-
-        # Get actual predictions with proper encoding
-        actual_roi = predict_actual_roi(input_df)
-        actual_conversions = predict_actual_conversions(input_df)
-        
-        print(f"✅ Actual predictions: ROI={actual_roi:.2f}, Conversions={actual_conversions:.2f}")  # ✅ ADDED
-
-        result = {}
-
-        if model_type in ['conversions', 'both']:
-            conv_pred = predict_conversions(input_df)
-            result['conversions'] = float(conv_pred)
-            result['conversions_status'] = determine_status(conv_pred, actual_conversions)
-            result['actual_conversions'] = float(actual_conversions)
-            print(f"✅ Conversions prediction: {conv_pred:.2f} (status: {result['conversions_status']})")  # ✅ ADDED
+        log.debug("📊 Input DataFrame created with shape: %s", input_df.shape)
 
-        if model_type in ['roi', 'both']:
-            if 'conversions' not in result:
-                conv_pred = predict_conversions(input_df)
-            else:
-                conv_pred = result['conversions']
-            roi_df = input_df.copy()
-            roi_df['Conversions'] = conv_pred
-            roi_pred = predict_roi(roi_df)
-            result['roi'] = float(roi_pred)
-            result['roi_status'] = determine_status(roi_pred, actual_roi)
-            result['actual_roi'] = float(actual_roi)
-            print(f"✅ ROI prediction: {roi_pred:.2f} (status: {result['roi_status']})")  # ✅ ADDED
+        # Model inference is CPU-bound; offload() keeps it off the gevent hub
+        result, actual_roi, actual_conversions = offload(score_prediction, input_df, model_type)
 
         # Generate AI suggestions
         if model_type in ['conversions', 'both']:
@@ -386,12 +634,68 @@ def predict():
                 )
             result['roi_suggestions'] = fetch_suggestions(roi_prompt)
 
-        print(f"🎉 Prediction completed successfully!")  # ✅ ADDED: Success confirmation
+        record_live_predictions([input_dict], [result], input_df)
+
+        log.debug("🎉 Prediction completed successfully!")
         return jsonify(result)
 
     except Exception as e:
-        print(f"❌ Prediction error: {str(e)}")
-        traceback.print_exc()  # ✅ ADDED: Full stack trace
+        log.exception(f"❌ Prediction error: {str(e)}")
+        return jsonify({'error': str(e), 'status': 'error'}), 400
+
+
+@app.route('/predict/batch', methods=['POST'])
+@jwt_required()
+@accepts_compressed_body
+def predict_batch():
+    """Score many campaigns in one request; invalid items get their own errors."""
+    try:
+        data = request.get_json()
+        model_type, results, frame, positions = offload(score_batch, data)
+        if data.get('suggestions') and len(frame):
+            add_batch_suggestions(results, frame, positions, model_type)
+        if len(frame):
+            record_live_predictions(frame.to_dict('records'), [results[i] for i in positions], frame)
+        return json_response({
+            'model_type': model_type,
+            'count': len(results),
+            'succeeded': len(positions),
+            'failed': len(results) - len(positions),
+            'results': results,
+            'status': 'success'
+        })
+    except BatchError as e:
+        return jsonify({'error': str(e), 'status': 'error'}), 400
+    except Exception as e:
+        log.exception(f"❌ Batch prediction error: {str(e)}")
+        return jsonify({'error': str(e), 'status': 'error'}), 400
+
+
+@app.route('/predict/sweep', methods=['POST'])
+@jwt_required()
+def predict_sweep():
+    """What-if grid over a base campaign, scored in one batch per model (no AI suggestions)."""
+    try:
+        data = request.get_json()
+        return json_response({**offload(run_sweep, data), 'status': 'success'})
+    except ScenarioError as e:
+        return jsonify({'error': str(e), 'status': 'error'}), 400
+    except Exception as e:
+        log.exception(f"❌ Sweep error: {str(e)}")
+        return jsonify({'error': str(e), 'status': 'error'}), 400
+
+
+@app.route('/optimize/budget', methods=['POST'])
+@jwt_required()
+def optimize_budget_allocation():
+    """Split a budget across Campaign Type x Region segments to maximize predicted ROI or conversions."""
+    try:
+        data = request.get_json()
+        return json_response({**offload(optimize_budget, data), 'status': 'success'})
+    except (ScenarioError, OptimizationError) as e:
+        return jsonify({'error': str(e), 'status': 'error'}), 400
+    except Exception as e:
+        log.exception(f"❌ Budget optimization error: {str(e)}")
         return jsonify({'error': str(e), 'status': 'error'}), 400
 
 
@@ -438,21 +742,48 @@ def report():
                 suggestions += results['roi_suggestions'] + "\n"
             suggestions = suggestions.strip() or "No specific suggestions provided."
 
-        filename = f"/tmp/report_{model_type}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
-        generate_pdf(filename, dashboard_data, actual_roi, predicted_roi, actual_conversions, predicted_conversions, suggestions, model_type, results=None)
+        contributions = {metric: results.get(f'{metric}_contributions') for metric in ('conversions', 'roi')}
+        filename = render_pdf(f'report_{model_type}', dashboard_data, actual_roi, predicted_roi, actual_conversions, predicted_conversions, suggestions, model_type,
+                   results=None, contributions=contributions)
 
-        return send_file(filename, as_attachment=True, mimetype='application/pdf')
+        return send_report(filename, mimetype='application/pdf')
 
     except Exception as e:
-        print(f"❌ Report generation error: {str(e)}")
-        traceback.print_exc()  # ✅ ADDED
+        log.exception(f"❌ Report generation error: {str(e)}")
         return jsonify({'error': str(e), 'status': 'error'}), 400
 
 
+def upload_error_response(error):
+    body = {'status': 'error', **error.payload, 'error': str(error)}
+    if error.payload.get('validation'):
+        body['error'] = f"Validation failed: {summarize_report(error.payload['validation'])}"
+    return jsonify(body), error.status_code
+
+
+def store_upload_results(result_id, model_type, results, stats):
+    """Keep a server-side copy of upload results and add its result_id to the response stats."""
+    stored = offload(save_results, result_id, get_jwt_identity(), model_type, results)
+    if stored:
+        stats['result_id'] = result_id
+        stats['expires_at'] = stored['expires_at']
+
+
+def request_results(data):
+    """(results, model_type) from a 'result_id' reference or an inline 'results' list."""
+    if data.get('result_id'):
+        results, info = offload(load_results, data['result_id'], get_jwt_identity())
+        return results, data.get('model_type', info['model_type'])
+    return data.get('results'), data.get('model_type', 'both')
+
+
 @app.route('/upload_predict', methods=['POST'])
 @jwt_required()
 def upload_predict():
     try:
+        # Reject oversized uploads from the header, before the body is read
+        if request.content_length is not None and request.content_length > MAX_FILE_SIZE:
+            return upload_too_large()
+        
         if 'file' not in request.files:
             return jsonify({'error': 'No file uploaded', 'status': 'error'}), 400
         
@@ -462,48 +793,226 @@ def upload_predict():
         if file.filename == '':
             return jsonify({'error': 'No file selected', 'status': 'error'}), 400
         
-        if not (file.filename.endswith('.csv') or file.filename.endswith('.xlsx')):
-            return jsonify({'error': 'Only CSV and Excel files are supported', 'status': 'error'}), 400
+        if not is_supported(file.filename):
+            return jsonify({'error': f'Unsupported file type. Supported: {", ".join(SUPPORTED_EXTENSIONS)}', 'status': 'error'}), 400
         
-        filename = secure_filename(file.filename)
-        temp_path = os.path.join('/tmp', filename)
-        file.save(temp_path)
+        # Parse straight from the request's own stream (memory or a per-request spooled
+        # temp file), so there is no shared /tmp path and no second copy on disk
+        stream = file.stream
+        stream.seek(0, os.SEEK_END)
+        if stream.tell() > MAX_FILE_SIZE:
+            return upload_too_large()
+        stream.seek(0)
         
-        if filename.endswith('.csv'):
-            df = pd.read_csv(temp_path)
-        else:
-            df = pd.read_excel(temp_path)
+        # async=true queues the file for a background worker and returns a job id
+        if request.form.get('async', '').lower() in ('1', 'true', 'yes'):
+            job = enqueue_upload_job(get_jwt_identity(), file.filename, model_type, stream.read())
+            return jsonify({
+                'job_id': job.id,
+                'status': job.status,
+                'status_url': f'/jobs/{job.id}',
+                'result_url': f'/jobs/{job.id}/result'
+            }), 202
         
-        validation_error = validate_file(df)
-        if validation_error:
-            os.remove(temp_path)
-            return jsonify({'error': f'Validation failed: {validation_error}', 'status': 'error'}), 400
+        df = offload(read_upload, stream, file.filename)
         
-        results = process_file(df, model_type)
+        validation = offload(validate_frame, df)
+        if not validation['valid']:
+            return jsonify({
+                'error': f'Validation failed: {summarize_report(validation)}',
+                'validation': validation,
+                'status': 'error'
+            }), 400
         
-        os.remove(temp_path)
+        df = coerce_numeric(df)
+        stats = {}
+        results = offload(process_file, df, model_type, stats)
         
         if not results:
             return jsonify({'error': 'No predictions returned from process_file', 'status': 'error'}), 400
         
-        if len(results) == 1:
-            return jsonify(results[0])
-        else:
-            return jsonify({'results': results, 'status': 'success'})
+        record_live_predictions(df.to_dict('records'), results, df)
+        
+        batch_id = uuid.uuid4().hex
+        if persist_results(batch_id, get_jwt_identity(), model_type, results):
+            stats['batch_id'] = batch_id
+        store_upload_results(batch_id, model_type, results, stats)
+        
+        return results_response(results, stats)
     
+    except RequestEntityTooLarge:
+        return upload_too_large()
+    except Exception as e:
+        log.exception(f"❌ Upload processing error: {str(e)}")
+        return jsonify({'error': f'Upload processing failed: {str(e)}', 'status': 'error'}), 400
+
+
+# Resumable chunked uploads: POST /uploads, PUT /uploads/<id>/parts/<n>, POST /uploads/<id>/complete,
+# then poll GET /uploads/<id> and fetch GET /uploads/<id>/result; scoring runs on the job workers
+@app.route('/uploads', methods=['POST'])
+@jwt_required()
+def initiate_chunked_upload():
+    try:
+        data = request.get_json() or {}
+        upload = chunked_uploads.initiate_upload(
+            get_jwt_identity(), data.get('filename'), data.get('model_type', 'both'), data.get('total_size')
+        )
+        return jsonify(upload), 201
+    except UploadError as e:
+        return upload_error_response(e)
+    except Exception as e:
+        log.exception(f"❌ Chunked upload initiate error: {str(e)}")
+        return jsonify({'error': f'Upload initiation failed: {str(e)}', 'status': 'error'}), 400
+
+
+@app.route('/uploads/<upload_id>', methods=['GET'])
+@jwt_required()
+def chunked_upload_status(upload_id):
+    try:
+        return jsonify(chunked_uploads.get_upload(upload_id, get_jwt_identity())), 200
+    except UploadError as e:
+        return upload_error_response(e)
+
+
+@app.route('/uploads/<upload_id>', methods=['DELETE'])
+@jwt_required()
+def abort_chunked_upload(upload_id):
+    try:
+        chunked_uploads.abort_upload(upload_id, get_jwt_identity())
+        return jsonify({'status': 'success'}), 200
+    except UploadError as e:
+        return upload_error_response(e)
+
+
+@app.route('/uploads/<upload_id>/parts/<int:part_number>', methods=['PUT'])
+@jwt_required()
+def upload_chunk(upload_id, part_number):
+    try:
+        if request.content_length is not None and request.content_length > CHUNK_MAX_SIZE:
+            raise UploadError(f'Chunk too large. Maximum chunk size is {CHUNK_MAX_SIZE // (1024 * 1024)}MB', 413)
+        upload = chunked_uploads.put_part(
+            upload_id, get_jwt_identity(), part_number, request.get_data(cache=False),
+            checksum=request.headers.get('X-Chunk-SHA256')
+        )
+        return jsonify(upload), 200
+    except UploadError as e:
+        return upload_error_response(e)
     except Exception as e:
-        print(f"❌ Upload processing error: {str(e)}")
-        traceback.print_exc()  # ✅ ADDED
+        log.exception(f"❌ Chunk upload error: {str(e)}")
+        return jsonify({'error': f'Chunk upload failed: {str(e)}', 'status': 'error'}), 400
+
+
+@app.route('/uploads/<upload_id>/complete', methods=['POST'])
+@jwt_required()
+def complete_chunked_upload(upload_id):
+    try:
+        data = request.get_json() or {}
+        if not isinstance(data.get('total_parts'), int) or data['total_parts'] < 1:
+            return jsonify({'error': 'total_parts must be a positive integer', 'status': 'error'}), 400
+        upload = chunked_uploads.complete_upload(upload_id, get_jwt_identity(), data['total_parts'])
+        return jsonify({
+            **upload,
+            'status_url': f'/uploads/{upload_id}',
+            'result_url': f'/uploads/{upload_id}/result'
+        }), 202
+    except UploadError as e:
+        return upload_error_response(e)
+    except Exception as e:
+        log.exception(f"❌ Chunked upload completion error: {str(e)}")
         return jsonify({'error': f'Upload processing failed: {str(e)}', 'status': 'error'}), 400
 
 
+@app.route('/uploads/<upload_id>/result', methods=['GET'])
+@jwt_required()
+def chunked_upload_result(upload_id):
+    try:
+        results, stats, upload = chunked_uploads.upload_results(upload_id, get_jwt_identity())
+        if not results:
+            return jsonify({'error': 'No predictions returned from process_file', 'status': 'error'}), 400
+        if result_exists(upload_id, get_jwt_identity()):
+            stats['result_id'] = upload_id
+        else:
+            store_upload_results(upload_id, upload['model_type'], results, stats)
+        return results_response(results, stats)
+    except UploadError as e:
+        return upload_error_response(e)
+    except Exception as e:
+        log.exception(f"❌ Chunked upload result error: {str(e)}")
+        return jsonify({'error': str(e), 'status': 'error'}), 500
+
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+@jwt_required()
+def get_job_status(job_id):
+    try:
+        job = get_job(job_id, get_jwt_identity())
+        if job is None:
+            return jsonify({'error': 'Job not found', 'status': 'error'}), 404
+        return jsonify(job_status(job)), 200
+    except Exception as e:
+        log.exception(f"❌ Job status error: {str(e)}")
+        return jsonify({'error': str(e), 'status': 'error'}), 500
+
+
+@app.route('/jobs/<job_id>/result', methods=['GET'])
+@jwt_required()
+def get_job_result(job_id):
+    try:
+        job = get_job(job_id, get_jwt_identity())
+        if job is None:
+            return jsonify({'error': 'Job not found', 'status': 'error'}), 404
+        if job.status in ('queued', 'running'):
+            return jsonify({**job_status(job), 'error': 'Job has not finished yet'}), 409
+        result = job_result(job) or {}
+        if job.status == 'failed':
+            body = {'error': job.error, 'status': 'error'}
+            if 'validation' in result:
+                body['validation'] = result['validation']
+            return jsonify(body), 400
+        if not result.get('results'):
+            return jsonify({'error': 'No predictions returned from process_file', 'status': 'error'}), 400
+        stats = result.get('stats') or {}
+        if result_exists(job.id, get_jwt_identity()):
+            stats['result_id'] = job.id
+        else:
+            store_upload_results(job.id, job.model_type, result['results'], stats)
+        return results_response(result['results'], stats)
+    except Exception as e:
+        log.exception(f"❌ Job result error: {str(e)}")
+        return jsonify({'error': str(e), 'status': 'error'}), 500
+
+
+@app.route('/results/<result_id>', methods=['GET'])
+@jwt_required()
+def get_stored_results(result_id):
+    """One page of stored upload results (?offset=, ?limit=)."""
+    try:
+        offset = max(request.args.get('offset', 0, type=int), 0)
+        limit = min(max(request.args.get('limit', RESULT_PAGE_SIZE, type=int), 1), RESULT_PAGE_MAX)
+        results, info = offload(load_results, result_id, get_jwt_identity(), offset, limit)
+        next_offset = offset + len(results)
+        return json_response({
+            **info,
+            'offset': offset,
+            'limit': limit,
+            'next_offset': next_offset if next_offset < info['total'] else None,
+            'results': results,
+            'status': 'success'
+        })
+    except ResultStoreError as e:
+        return jsonify({'error': str(e), 'status': 'error'}), e.status_code
+    except Exception as e:
+        log.exception(f"❌ Stored results error: {str(e)}")
+        return jsonify({'error': str(e), 'status': 'error'}), 500
+
+
 @app.route('/upload_report', methods=['POST'])
 @jwt_required()
+@accepts_compressed_body
 def upload_report():
     try:
         data = request.get_json()
-        results = data.get('results')
-        model_type = data.get('model_type', 'both')
+        results, model_type = request_results(data)
 
         if not results or not isinstance(results, list) or len(results) == 0:
             return jsonify({'error': 'No valid prediction results provided', 'status': 'error'}), 400
@@ -528,87 +1037,92 @@ def upload_report():
 
         suggestions = ""
         for row in results:
-            if model_type in ['conversions', 'both'] and 'conversions_suggestions' in row:
-                suggestions += row.get('conversions_suggestions', '') + "\n"
-            if model_type in ['roi', 'both'] and 'roi_suggestions' in row:
-                suggestions += row.get('roi_suggestions', '') + "\n"
+            # Stored results keep every column, so a row without suggestions has them as None
+            if model_type in ['conversions', 'both'] and row.get('conversions_suggestions'):
+                suggestions += row['conversions_suggestions'] + "\n"
+            if model_type in ['roi', 'both'] and row.get('roi_suggestions'):
+                suggestions += row['roi_suggestions'] + "\n"
         suggestions = suggestions.strip() or "No specific suggestions available based on the provided results."
 
         dashboard_data = simulate_dashboard_data()
         
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        filename = f"/tmp/upload_report_{model_type}_{timestamp}.pdf"
-        
-        generate_pdf(filename, dashboard_data, actual_roi_avg, predicted_roi_avg, actual_conversions_avg, predicted_conversions_avg, suggestions, model_type, results=results)
+        contributions = {metric: average_contributions(results, metric) for metric in ('conversions', 'roi')}
+        filename = render_pdf(f'upload_report_{model_type}', dashboard_data, actual_roi_avg, predicted_roi_avg, actual_conversions_avg, predicted_conversions_avg, suggestions, model_type,
+                   results=results, contributions=contributions)
         
-        return send_file(filename, as_attachment=True, download_name=f"{model_type}_report.pdf")
+        return send_report(filename, download_name=f"{model_type}_report.pdf")
     
+    except ResultStoreError as e:
+        return jsonify({'error': str(e), 'status': 'error'}), e.status_code
     except Exception as e:
-        print(f"❌ Upload report error: {str(e)}")
-        traceback.print_exc()  # ✅ ADDED
+        log.exception(f"❌ Upload report error: {str(e)}")
         return jsonify({'error': f'PDF generation failed: {str(e)}', 'status': 'error'}), 400
 
 
 @app.route('/download_results', methods=['POST'])
 @jwt_required()
+@accepts_compressed_body
 def download_results():
     try:
         data = request.get_json()
-        results = data.get('results')
-        model_type = data.get('model_type', 'both')
+        results, model_type = request_results(data)
         file_type = data.get('file_type', 'csv')
         
         if not results:
             return jsonify({'error': 'No results to download', 'status': 'error'}), 400
         
-        df = pd.DataFrame(results)
-        
-        roi_columns = ['actual_roi', 'roi', 'roi_status', 'roi_suggestions']
-        conversions_columns = ['actual_conversions', 'conversions', 'conversions_status', 'conversions_suggestions']
-        
-        if model_type == 'roi':
-            columns = [col for col in roi_columns if col in df.columns]
-        elif model_type == 'conversions':
-            columns = [col for col in conversions_columns if col in df.columns]
-        else:
-            columns = df.columns.tolist()
+        columns = select_columns(results, model_type)
         
         if not columns:
             return jsonify({'error': f'No relevant columns found for model_type: {model_type}', 'status': 'error'}), 400
         
-        df = df[columns]
-        
+        # Stream the file as it is generated instead of writing it to /tmp first
+        if file_type not in EXPORT_MIME_TYPES:
+            file_type = 'csv'
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        if file_type == 'xlsx':
-            filename = f"/tmp/{model_type}_results_{timestamp}.xlsx"
-            df.to_excel(filename, index=False)
-            mime_type = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-        else:
-            filename = f"/tmp/{model_type}_results_{timestamp}.csv"
-            df.to_csv(filename, index=False)
-            mime_type = 'text/csv'
+        download_name = f"{model_type}_results_{timestamp}.{file_type}"
         
-        return send_file(filename, as_attachment=True, mimetype=mime_type)
+        return Response(
+            stream_with_context(iter_export(results, columns, file_type)),
+            mimetype=EXPORT_MIME_TYPES[file_type],
+            headers={'Content-Disposition': f'attachment; filename={download_name}'}
+        )
     
+    except ResultStoreError as e:
+        return jsonify({'error': str(e), 'status': 'error'}), e.status_code
     except Exception as e:
-        print(f"❌ Download results error: {str(e)}")
-        traceback.print_exc()  # ✅ ADDED
+        log.exception(f"❌ Download results error: {str(e)}")
         return jsonify({'error': str(e), 'status': 'error'}), 400
 
 
 # Initialize database
+def warm_up_worker():
+    """Load and exercise the models before this process takes traffic."""
+    ready = warm_up()
+    status = get_model_status()
+    if ready:
+        log.info(f"🔥 Models warmed up (load {status['load_seconds']}s, warm-up {status['warmup_seconds']}s)")
+    else:
+        log.warning(f"⚠️ Model warm-up failed: {status['warmup_error']}")
+    return ready
+
+
 def init_db():
     with app.app_context():
         try:
             db.create_all()
-            print("✅ Database tables verified/created")
+            log.info("✅ Database tables verified/created")
         except Exception as e:
-            print(f"⚠️ Database initialization warning: {str(e)}")
-            traceback.print_exc()  # ✅ ADDED
+            log.exception(f"⚠️ Database initialization warning: {str(e)}")
+
+
+IMPORT_SECONDS = round(time.perf_counter() - _import_started, 3)
+log.info(f"⏱️ app imported in {IMPORT_SECONDS}s")
 
 
 if __name__ == '__main__':
     init_db()
+    warm_up_worker()
     port = int(os.getenv('PORT', 5000))
-    print(f"🚀 Starting Finvix Backend on port {port}")  # ✅ ADDED: Startup message
+    log.info(f"🚀 Starting Finvix Backend on port {port}")
     app.run(debug=False, host='0.0.0.0', port=port)
@@ -1,21 +1,79 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
 from flask import current_app
-from flask_jwt_extended import create_access_token
-from database_models import User, db
+from flask_jwt_extended import create_access_token, create_refresh_token, decode_token
+from database_models import User, RefreshToken, db
+from config import BCRYPT_MAX_WORKERS, BCRYPT_MAX_PENDING
+from concurrency import run_in_executor
+
+# bcrypt releases the GIL, so a small dedicated pool keeps its CPU cost bounded and
+# lets other request threads keep serving predictions while a hash is computed.
+_bcrypt_executor = ThreadPoolExecutor(max_workers=BCRYPT_MAX_WORKERS, thread_name_prefix='bcrypt')
+_bcrypt_slots = threading.BoundedSemaphore(BCRYPT_MAX_WORKERS + BCRYPT_MAX_PENDING)
+
+class AuthBusyError(Exception):
+    """Raised when too many password checks are already queued."""
+
+def _run_bcrypt(fn, *args):
+    if not _bcrypt_slots.acquire(timeout=5):
+        raise AuthBusyError("Too many concurrent authentication requests")
+    try:
+        return run_in_executor(_bcrypt_executor, fn, *args)
+    finally:
+        _bcrypt_slots.release()
+
+def hash_password(password):
+    return _run_bcrypt(current_app.bcrypt.generate_password_hash, password).decode('utf-8')
+
+def check_password(password_hash, password):
+    return _run_bcrypt(current_app.bcrypt.check_password_hash, password_hash, password)
+
+def issue_tokens(username):
+    """Create an access token plus a refresh token recorded server-side for revocation."""
+    access_token = create_access_token(identity=username)
+    refresh_token = create_refresh_token(identity=username)
+    decoded = decode_token(refresh_token)
+    db.session.add(RefreshToken(
+        jti=decoded['jti'],
+        username=username,
+        created_at=datetime.now(timezone.utc).replace(tzinfo=None),
+        expires_at=datetime.fromtimestamp(decoded['exp'], timezone.utc).replace(tzinfo=None)
+    ))
+    db.session.commit()
+    return {'access_token': access_token, 'refresh_token': refresh_token}
 
 def register_user(username, email, password):
     """Register a new user with hashed password."""
     if User.query.filter_by(username=username).first() or User.query.filter_by(email=email).first():
         return None, "Username or email already exists"
-    password_hash = current_app.bcrypt.generate_password_hash(password).decode('utf-8')
+    password_hash = hash_password(password)
     new_user = User(username=username, email=email, password_hash=password_hash)
     db.session.add(new_user)
     db.session.commit()
     return new_user, None
 
 def login_user(username, password):
-    """Log in a user and return a JWT token if credentials are valid."""
+    """Log in a user and return access and refresh tokens if credentials are valid."""
     user = User.query.filter_by(username=username).first()
-    if user and current_app.bcrypt.check_password_hash(user.password_hash, password):
-        access_token = create_access_token(identity=username)  # Changed to use username as string
-        return access_token, None
-    return None, "Invalid username or password"
\ No newline at end of file
+    if user and check_password(user.password_hash, password):
+        return issue_tokens(username), None  # Tokens use username as identity
+    return None, "Invalid username or password"
+
+def refresh_access_token(username):
+    """Issue a new access token; the refresh token was already checked by is_token_revoked."""
+    return create_access_token(identity=username)
+
+def revoke_refresh_token(jti):
+    """Revoke a refresh token so it can no longer renew access tokens."""
+    token = RefreshToken.query.filter_by(jti=jti).first()
+    if token is not None and token.revoked_at is None:
+        token.revoked_at = datetime.now(timezone.utc).replace(tzinfo=None)
+        db.session.commit()
+
+def is_token_revoked(jwt_payload):
+    """Blocklist check: only refresh tokens are stored, access tokens simply expire."""
+    if jwt_payload.get('type') != 'refresh':
+        return False
+    token = RefreshToken.query.filter_by(jti=jwt_payload['jti']).first()
+    return token is None or token.revoked_at is not None
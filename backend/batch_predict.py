@@ -0,0 +1,111 @@
+"""
+Bulk JSON scoring: many campaigns per /predict/batch request.
+
+Each item of 'inputs' is a /predict style list of the 13 features or an object keyed by
+feature name. Items are checked for shape one by one, then validated together with
+validate_frame and scored with one batched call per model. An invalid item gets its own
+error entry in the results and does not fail the rest of the batch.
+
+Suggestions are off by default. With "suggestions": true the first BATCH_MAX_SUGGESTIONS
+scored items get them, as in /upload_predict; the rest keep their explanations only.
+"""
+import numpy as np
+import pandas as pd
+from config import BATCH_MAX_ITEMS, BATCH_MAX_SUGGESTIONS, EXPLAIN_PREDICTIONS
+from explanations import explain_rows
+from input_predict import expected_columns, numeric_features, validate_frame, add_suggestions
+from scenarios import score_scenarios
+
+
+class BatchError(ValueError):
+    """The batch as a whole is malformed (not individual items)."""
+
+
+def item_row(item):
+    """(row dict, None) for a well-shaped item, else (None, error)."""
+    if isinstance(item, list):
+        if len(item) != len(expected_columns):
+            return None, {'rule': 'shape', 'message': f'Expected {len(expected_columns)} features, got {len(item)}'}
+        return dict(zip(expected_columns, item)), None
+    if isinstance(item, dict):
+        missing = [feature for feature in expected_columns if feature not in item]
+        if missing:
+            return None, {'rule': 'missing_column', 'message': f"Missing features: {', '.join(missing)}"}
+        return {feature: item[feature] for feature in expected_columns}, None
+    return None, {'rule': 'shape', 'message': 'Each input must be a list of features or an object keyed by feature'}
+
+
+def parse_batch(data):
+    """
+    Split a request into a frame of valid items and per-item errors.
+
+    Returns (model_type, frame, positions, errors): positions[i] is the request index of
+    frame row i, and errors maps a request index to its list of problems.
+    """
+    model_type = data.get('model_type', 'both')
+    if model_type not in ('conversions', 'roi', 'both'):
+        raise BatchError("model_type must be 'conversions', 'roi' or 'both'")
+    inputs = data.get('inputs')
+    if not isinstance(inputs, list) or not inputs:
+        raise BatchError("Missing inputs: send 'inputs' as a non-empty list")
+    if len(inputs) > BATCH_MAX_ITEMS:
+        raise BatchError(f"Batch has {len(inputs)} inputs; the maximum is {BATCH_MAX_ITEMS}")
+
+    rows, positions, errors = [], [], {}
+    for index, item in enumerate(inputs):
+        row, error = item_row(item)
+        if error is not None:
+            errors[index] = [error]
+        else:
+            rows.append(row)
+            positions.append(index)
+    frame = pd.DataFrame.from_records(rows, columns=expected_columns)
+
+    # One vectorized pass over every well-shaped item; its row numbers map back to items
+    report = validate_frame(frame, max_errors=len(frame) * len(expected_columns))
+    invalid = set()
+    for error in report['errors']:
+        position = error['row'] - 1
+        invalid.add(position)
+        errors.setdefault(positions[position], []).append(
+            {key: error[key] for key in ('column', 'rule', 'value', 'message')}
+        )
+    keep = [i for i in range(len(frame)) if i not in invalid]
+    frame = frame.iloc[keep].reset_index(drop=True)
+    frame[numeric_features] = frame[numeric_features].apply(pd.to_numeric).astype(np.float64)
+    return model_type, frame, [positions[i] for i in keep], errors
+
+
+def score_batch(data):
+    """
+    Parse, validate and score a /predict/batch request (CPU-bound part).
+
+    Returns (model_type, results, frame, positions): results has one entry per input in
+    request order; frame holds the scored items and positions their request indexes.
+    """
+    model_type, frame, positions, errors = parse_batch(data)
+    results = [None] * (len(positions) + len(errors))
+    for index, item_errors in errors.items():
+        results[index] = {'index': index, 'status': 'error', 'errors': item_errors}
+    if not len(frame):
+        return model_type, results, frame, positions
+
+    scores = score_scenarios(frame, model_type)
+    columns = {name: values.tolist() for name, values in scores.items()}
+    explain = data.get('explain', EXPLAIN_PREDICTIONS)
+    explanations = explain_rows(frame, model_type, conversions=scores.get('conversions')) if explain else None
+
+    for i, index in enumerate(positions):
+        result = {'index': index, 'status': 'success'}
+        result.update({name: values[i] for name, values in columns.items()})
+        if explanations is not None:
+            result.update(explanations[i])
+        results[index] = result
+    return model_type, results, frame, positions
+
+
+def add_batch_suggestions(results, frame, positions, model_type, limit=BATCH_MAX_SUGGESTIONS):
+    """Gemini suggestions for the first `limit` scored items (I/O-bound; no rate-limit pause)."""
+    records = frame.head(limit).to_dict('records')
+    for input_dict, index in zip(records, positions):
+        add_suggestions(results[index], model_type, input_dict, pause=0)
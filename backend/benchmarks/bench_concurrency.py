@@ -0,0 +1,118 @@
+"""
+Compare requests in flight per gunicorn worker: sync vs gevent.
+
+Starts a fake Gemini server that answers after --latency seconds, then runs one gunicorn
+worker of each class against it and fires --requests concurrent /predict calls. Model
+inference is stubbed out so only the LLM wait is measured; no network access or API key
+is needed.
+
+Usage (from the backend folder):
+    python benchmarks/bench_concurrency.py --requests 32 --latency 0.5
+"""
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_gemini import FakeGeminiServer  # noqa: E402
+
+SAMPLE_INPUT = [1500.0, 300, 20000, 0.05, 0.015, 5.0, 75.0, 150.0,
+                'Search Ads', 'North America', 'Retail', 'Small', 1.0]
+
+
+def make_app():
+    """gunicorn app factory: the real Flask app with constant model outputs."""
+    import app as app_module
+    for name in ('predict_conversions', 'predict_roi', 'predict_actual_roi', 'predict_actual_conversions'):
+        setattr(app_module, name, lambda df: 100.0)
+    app_module.init_db()
+    return app_module.app
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def wait_for(url, timeout=60):
+    import requests
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            requests.get(url, timeout=1)
+            return
+        except requests.RequestException:
+            time.sleep(0.2)
+    raise RuntimeError(f"server at {url} did not start")
+
+
+def run_case(worker_class, env, token, gemini, args):
+    import requests
+    port = free_port()
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', '-w', '1', '-k', worker_class,
+         '-b', f'127.0.0.1:{port}', '--pythonpath', 'benchmarks', 'bench_concurrency:make_app()'],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        base = f'http://127.0.0.1:{port}'
+        wait_for(base + '/')
+        gemini.stats['peak_in_flight'] = 0
+
+        def call(_):
+            response = requests.post(base + '/predict', json={'input': SAMPLE_INPUT, 'model_type': 'both'},
+                                     headers={'Authorization': f'Bearer {token}'}, timeout=600)
+            return response.status_code
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(args.requests) as pool:
+            statuses = list(pool.map(call, range(args.requests)))
+        seconds = time.perf_counter() - start
+        ok = statuses.count(200)
+        print(f"{worker_class:<10}{ok:>6}/{args.requests:<6}{seconds:>10.2f}{ok / seconds:>10.1f}{gemini.stats['peak_in_flight']:>12}")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=32)
+    parser.add_argument('--latency', type=float, default=0.5, help='Fake Gemini response time in seconds')
+    args = parser.parse_args()
+
+    gemini = FakeGeminiServer(latency=args.latency).start()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ)
+        env.update({
+            'GEMINI_API_KEY': env.get('GEMINI_API_KEY', 'bench'),
+            'JWT_SECRET_KEY': env.get('JWT_SECRET_KEY', 'bench'),
+            'GEMINI_API_BASE': gemini.url,
+            'DATABASE_URL': f'sqlite:///{tmp}/bench.db',
+            'GUNICORN_WORKER_CONNECTIONS': str(max(args.requests, 100)),
+        })
+        os.environ.update(env)
+        from flask_jwt_extended import create_access_token
+        app = make_app()
+        with app.app_context():
+            token = create_access_token(identity='bench')
+
+        print(f"\n📊 {args.requests} concurrent /predict calls, one worker, Gemini latency {args.latency}s")
+        print(f"{'worker':<10}{'ok':>13}{'seconds':>10}{'req/s':>10}{'peak LLM':>12}")
+        for worker_class in ('sync', 'gevent'):
+            run_case(worker_class, env, token, gemini, args)
+    gemini.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""
+Compare upload parse time per format.
+
+Writes the same synthetic campaign data as CSV, XLSX, Parquet and Arrow IPC, then times
+ingest.read_upload for each one next to the previous pd.read_csv / pd.read_excel path.
+
+Usage (from the backend folder):
+    python benchmarks/bench_ingest.py --rows 100000 --repeat 3
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ingest import read_upload  # noqa: E402
+from input_predict import expected_columns, expected_categories  # noqa: E402
+
+
+def make_campaigns(rows, seed=42):
+    """Synthetic upload with the 13 expected columns and valid categories."""
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        'Ad Spend': rng.uniform(100, 10000, rows),
+        'Clicks': rng.integers(10, 5000, rows),
+        'Impressions': rng.integers(1000, 100000, rows),
+        'Conversion Rate': rng.uniform(0, 0.2, rows),
+        'Click-Through Rate (CTR)': rng.uniform(0, 0.1, rows),
+        'Cost Per Click (CPC)': rng.uniform(0.1, 10, rows),
+        'Cost Per Conversion': rng.uniform(5, 500, rows),
+        'Customer Acquisition Cost (CAC)': rng.uniform(10, 1000, rows),
+        'Seasonality Factor': rng.uniform(0.5, 1.5, rows),
+    })
+    for feature, categories in expected_categories.items():
+        df[feature] = rng.choice(categories, rows)
+    return df[expected_columns]
+
+
+def time_call(fn, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    import pyarrow.feather as feather
+
+    df = make_campaigns(args.rows)
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = {ext: os.path.join(tmp, f"campaigns{ext}") for ext in ('.csv', '.xlsx', '.parquet', '.arrow')}
+        df.to_csv(paths['.csv'], index=False)
+        df.to_excel(paths['.xlsx'], index=False)
+        df.to_parquet(paths['.parquet'], index=False)
+        feather.write_feather(df, paths['.arrow'])
+
+        cases = [
+            ('csv (pd.read_csv)', lambda: pd.read_csv(paths['.csv'])),
+            ('csv (read_upload)', lambda: read_upload(paths['.csv'], 'campaigns.csv')),
+            ('xlsx (openpyxl)', lambda: pd.read_excel(paths['.xlsx'], engine='openpyxl')),
+            ('xlsx (read_upload)', lambda: read_upload(paths['.xlsx'], 'campaigns.xlsx')),
+            ('parquet (read_upload)', lambda: read_upload(paths['.parquet'], 'campaigns.parquet')),
+            ('arrow (read_upload)', lambda: read_upload(paths['.arrow'], 'campaigns.arrow')),
+        ]
+
+        print(f"\n📊 Parse time for {args.rows:,} rows (best of {args.repeat})")
+        print(f"{'format':<24}{'file MB':>10}{'seconds':>10}{'rows/s':>14}{'memory MB':>12}")
+        for name, fn in cases:
+            ext = '.' + name.split(' ')[0]
+            seconds = time_call(fn, args.repeat)
+            memory = fn().memory_usage(deep=True).sum() / 1e6
+            size = os.path.getsize(paths[ext]) / 1e6
+            print(f"{name:<24}{size:>10.1f}{seconds:>10.3f}{args.rows / seconds:>14,.0f}{memory:>12.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+"""
+Compare result persistence throughput.
+
+Writes the same synthetic upload results with per-row ORM inserts (db.session.add) and
+with prediction_store.write_results (COPY on PostgreSQL, executemany elsewhere).
+
+Usage (from the backend folder):
+    python benchmarks/bench_result_writes.py --rows 100000
+    DATABASE_URL=postgresql://... python benchmarks/bench_result_writes.py --rows 100000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime
+from flask import Flask
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database_models import db, PredictionResult, PredictionSuggestion  # noqa: E402
+from prediction_store import write_results, delete_batch  # noqa: E402
+
+
+def make_results(rows):
+    return [{
+        'conversions': 10.0 + i % 7,
+        'conversions_status': 'Expected',
+        'actual_conversions': 11.0,
+        'roi': 1.5,
+        'roi_status': 'Expected',
+        'actual_roi': 1.4,
+        'conversions_suggestions': 'Shift budget towards the best performing region.',
+        'roi_suggestions': 'Lower the cost per click on weak keywords.'
+    } for i in range(rows)]
+
+
+def orm_insert(batch_id, results):
+    created_at = datetime.utcnow()
+    for i, result in enumerate(results):
+        db.session.add(PredictionResult(
+            batch_id=batch_id, row_index=i, username='bench', model_type='both', created_at=created_at,
+            **{k: result[k] for k in ('conversions', 'conversions_status', 'actual_conversions',
+                                      'roi', 'roi_status', 'actual_roi')}
+        ))
+        for kind in ('conversions', 'roi'):
+            db.session.add(PredictionSuggestion(
+                batch_id=batch_id, row_index=i, kind=kind, suggestion=result[f'{kind}_suggestions']
+            ))
+    db.session.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--chunk-size', type=int, default=None)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = Flask(__name__)
+        app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URL') or f"sqlite:///{tmp}/bench.db"
+        db.init_app(app)
+        results = make_results(args.rows)
+
+        with app.app_context():
+            db.create_all()
+            print(f"\n📊 Writing {args.rows:,} results to {db.engine.dialect.name}")
+            print(f"{'method':<24}{'seconds':>10}{'rows/s':>14}")
+
+            batch_id = uuid.uuid4().hex
+            start = time.perf_counter()
+            orm_insert(batch_id, results)
+            seconds = time.perf_counter() - start
+            print(f"{'orm (session.add)':<24}{seconds:>10.3f}{args.rows / seconds:>14,.0f}")
+            delete_batch(batch_id)
+
+            batch_id = uuid.uuid4().hex
+            stats = write_results(batch_id, 'bench', 'both', results, chunk_size=args.chunk_size)
+            name = f"bulk ({stats['method']})"
+            print(f"{name:<24}{stats['seconds']:>10.3f}{stats['rows_per_second']:>14,.0f}")
+            delete_batch(batch_id)
+
+
+if __name__ == '__main__':
+    main()
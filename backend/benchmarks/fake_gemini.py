@@ -0,0 +1,123 @@
+"""
+Local stand-in for the Gemini generateContent API, for benchmarks and load tests.
+
+Answers every POST after a configurable latency (with jitter), fails a share of calls
+with HTTP 500 and rate-limits another share with HTTP 429 + Retry-After. Point the app at
+it with GEMINI_API_BASE=http://127.0.0.1:<port>.
+
+Usage (from the backend folder):
+    python benchmarks/fake_gemini.py --port 8089 --latency 0.8 --jitter 0.3 --error-rate 0.01 --rate-limit-rate 0.05
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class FakeGeminiServer:
+    """Threaded fake Gemini server with call statistics."""
+
+    def __init__(self, port=0, latency=0.5, jitter=0.0, error_rate=0.0, rate_limit_rate=0.0,
+                 retry_after=1, seed=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.stats = {'calls': 0, 'ok': 0, 'errors': 0, 'rate_limited': 0, 'in_flight': 0, 'peak_in_flight': 0}
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', port), self._handler())
+        self.httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        return f'http://127.0.0.1:{self.httpd.server_address[1]}'
+
+    def _outcome(self):
+        with self._lock:
+            roll = self._random.random()
+            delay = max(0.0, self.latency + self._random.uniform(-self.jitter, self.jitter))
+        if roll < self.rate_limit_rate:
+            return 429, 0.0
+        if roll < self.rate_limit_rate + self.error_rate:
+            return 500, delay
+        return 200, delay
+
+    def _count(self, **changes):
+        with self._lock:
+            for key, value in changes.items():
+                self.stats[key] += value
+            self.stats['peak_in_flight'] = max(self.stats['peak_in_flight'], self.stats['in_flight'])
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                status, delay = server._outcome()
+                server._count(calls=1, in_flight=1)
+                time.sleep(delay)
+                server._count(in_flight=-1)
+
+                if status == 200:
+                    server._count(ok=1)
+                    body = {'candidates': [{'content': {'parts': [{'text': 'Rebalance spend towards the best converting region.'}]}}]}
+                elif status == 429:
+                    server._count(rate_limited=1)
+                    body = {'error': {'code': 429, 'status': 'RESOURCE_EXHAUSTED'}}
+                else:
+                    server._count(errors=1)
+                    body = {'error': {'code': 500, 'status': 'INTERNAL'}}
+
+                payload = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                if status == 429:
+                    self.send_header('Retry-After', str(server.retry_after))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--port', type=int, default=8089)
+    parser.add_argument('--latency', type=float, default=0.5, help='Mean response time in seconds')
+    parser.add_argument('--jitter', type=float, default=0.0, help='Uniform +/- jitter in seconds')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Share of calls answered with HTTP 500')
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0, help='Share of calls answered with HTTP 429')
+    args = parser.parse_args()
+
+    server = FakeGeminiServer(args.port, args.latency, args.jitter, args.error_rate, args.rate_limit_rate).start()
+    print(f"🤖 Fake Gemini listening on {server.url} (GEMINI_API_BASE={server.url})")
+    try:
+        while True:
+            time.sleep(10)
+            print(f"📊 {server.stats}")
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == '__main__':
+    main()
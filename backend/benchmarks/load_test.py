@@ -0,0 +1,237 @@
+"""
+End-to-end load test against a local fake Gemini server.
+
+Starts benchmarks/fake_gemini.py (configurable latency, errors and 429s), runs the real app
+under gunicorn with GEMINI_API_BASE pointed at it, registers a few users and then sends
+an open-loop mix of /login, /predict, /upload_predict and /report requests at --rate
+requests per second for --duration seconds. Latency is measured from each request's
+scheduled start, so a backed-up server shows up as latency instead of a lower send rate.
+
+Writes a per-endpoint latency (p50/p90/p99/max) and throughput report to --output.
+
+Usage (from the backend folder):
+    python benchmarks/load_test.py --rate 10 --duration 30
+    python benchmarks/load_test.py --worker-class sync --workers 4 --mix predict=1
+"""
+import argparse
+import io
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_gemini import FakeGeminiServer  # noqa: E402
+from bench_concurrency import free_port, wait_for, SAMPLE_INPUT  # noqa: E402
+from bench_ingest import make_campaigns  # noqa: E402
+
+DEFAULT_MIX = 'predict=6,report=2,login=1,upload_predict=1'
+PASSWORD = 'load-test-password'
+REPORT_RESULTS = {
+    'conversions': 39.4, 'actual_conversions': 48.8, 'conversions_status': 'negative',
+    'roi': 60.6, 'actual_roi': 55.9, 'roi_status': 'positive',
+    'conversions_suggestions': 'Rebalance spend towards the best converting region.',
+    'roi_suggestions': 'Lower bids on keywords with a weak conversion rate.'
+}
+
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(','):
+        name, _, weight = part.partition('=')
+        mix[name.strip()] = float(weight or 1)
+    unknown = set(mix) - {'login', 'predict', 'upload_predict', 'report'}
+    if unknown:
+        raise SystemExit(f"Unknown endpoints in --mix: {', '.join(sorted(unknown))}")
+    return mix
+
+
+class LoadClient:
+    """Issues one request per endpoint type with a thread-local requests session."""
+
+    def __init__(self, base, users, upload_rows):
+        import requests
+        self.requests = requests
+        self.base = base
+        self.users = users
+        self.tokens = {}
+        self.local = threading.local()
+        self.upload_body = make_campaigns(upload_rows).to_csv(index=False).encode()
+
+    @property
+    def session(self):
+        if not hasattr(self.local, 'session'):
+            self.local.session = self.requests.Session()
+        return self.local.session
+
+    def setup(self):
+        for user in self.users:
+            self.session.post(f'{self.base}/register', json={
+                'username': user, 'email': f'{user}@loadtest.local', 'password': PASSWORD
+            }, timeout=60)
+            self.tokens[user] = self.login(user).json()['access_token']
+
+    def login(self, user=None):
+        user = user or random.choice(self.users)
+        return self.session.post(f'{self.base}/login', json={'username': user, 'password': PASSWORD}, timeout=300)
+
+    def _auth(self):
+        return {'Authorization': f'Bearer {self.tokens[random.choice(self.users)]}'}
+
+    def predict(self):
+        return self.session.post(f'{self.base}/predict', json={'input': SAMPLE_INPUT, 'model_type': 'both'},
+                                 headers=self._auth(), timeout=300)
+
+    def upload_predict(self):
+        return self.session.post(f'{self.base}/upload_predict', headers=self._auth(), timeout=300,
+                                 files={'file': ('load.csv', io.BytesIO(self.upload_body), 'text/csv')},
+                                 data={'model_type': 'both'})
+
+    def report(self):
+        return self.session.post(f'{self.base}/report', json={'results': REPORT_RESULTS, 'model_type': 'both'},
+                                 headers=self._auth(), timeout=300)
+
+
+def summarize(samples, duration):
+    """Per-endpoint and overall latency/throughput from (endpoint, status, latency, service) tuples."""
+    by_endpoint = defaultdict(list)
+    for sample in samples:
+        by_endpoint[sample[0]].append(sample)
+    by_endpoint['all'] = samples
+
+    report = {}
+    for endpoint, rows in by_endpoint.items():
+        latencies = np.array([row[2] for row in rows]) * 1000
+        statuses = defaultdict(int)
+        for row in rows:
+            statuses[str(row[1])] += 1
+        ok = sum(1 for row in rows if isinstance(row[1], int) and 200 <= row[1] < 300)
+        report[endpoint] = {
+            'requests': len(rows),
+            'ok': ok,
+            'errors': len(rows) - ok,
+            'statuses': dict(statuses),
+            'throughput_rps': round(ok / duration, 2),
+            'p50_ms': round(float(np.percentile(latencies, 50)), 1),
+            'p90_ms': round(float(np.percentile(latencies, 90)), 1),
+            'p99_ms': round(float(np.percentile(latencies, 99)), 1),
+            'max_ms': round(float(latencies.max()), 1),
+            'mean_service_ms': round(float(np.mean([row[3] for row in rows])) * 1000, 1)
+        }
+    return report
+
+
+def run_load(client, mix, rate, duration, max_in_flight):
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    samples, lock = [], threading.Lock()
+
+    def fire(endpoint, scheduled):
+        sent = time.perf_counter()
+        try:
+            status = getattr(client, endpoint)().status_code
+        except Exception as e:
+            status = type(e).__name__
+        finished = time.perf_counter()
+        with lock:
+            samples.append((endpoint, status, finished - scheduled, finished - sent))
+
+    total = int(rate * duration)
+    with ThreadPoolExecutor(max_in_flight) as pool:
+        start = time.perf_counter()
+        for i in range(total):
+            scheduled = start + i / rate
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            pool.submit(fire, random.choices(names, weights)[0], scheduled)
+    elapsed = time.perf_counter() - start
+    return samples, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rate', type=float, default=10, help='Requests per second sent to the app')
+    parser.add_argument('--duration', type=float, default=30, help='Seconds of load')
+    parser.add_argument('--mix', default=DEFAULT_MIX, help=f'Endpoint weights (default {DEFAULT_MIX})')
+    parser.add_argument('--users', type=int, default=5)
+    parser.add_argument('--upload-rows', type=int, default=3, help='Rows per /upload_predict file')
+    parser.add_argument('--workers', type=int, default=2, help='gunicorn workers')
+    parser.add_argument('--worker-class', default='gevent')
+    parser.add_argument('--max-in-flight', type=int, default=256, help='Client-side concurrency cap')
+    parser.add_argument('--latency', type=float, default=0.5, help='Fake Gemini mean latency (s)')
+    parser.add_argument('--jitter', type=float, default=0.2, help='Fake Gemini latency jitter (s)')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Share of Gemini calls failing with 500')
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0, help='Share of Gemini calls answered 429')
+    parser.add_argument('--database-url', default=None, help='Defaults to a temporary SQLite file')
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--output', default='load_report.json')
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    mix = parse_mix(args.mix)
+    gemini = FakeGeminiServer(latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+                              rate_limit_rate=args.rate_limit_rate, seed=args.seed).start()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        port = free_port()
+        env = dict(os.environ)
+        env.update({
+            'GEMINI_API_KEY': env.get('GEMINI_API_KEY', 'load-test'),
+            'JWT_SECRET_KEY': env.get('JWT_SECRET_KEY', 'load-test'),
+            'GEMINI_API_BASE': gemini.url,
+            'DATABASE_URL': args.database_url or f'sqlite:///{tmp}/load.db',
+            'PORT': str(port),
+            'WEB_CONCURRENCY': str(args.workers),
+            'GUNICORN_WORKER_CLASS': args.worker_class,
+        })
+        log_path = os.path.join(tmp, 'gunicorn.log')
+        with open(log_path, 'w') as log:
+            # Create the tables once, before several workers race to do it
+            subprocess.run([sys.executable, '-c', 'from app import init_db; init_db()'],
+                           cwd=BACKEND_DIR, env=env, stdout=log, stderr=log, check=True)
+            server = subprocess.Popen([sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'app:app'],
+                                      cwd=BACKEND_DIR, env=env, stdout=log, stderr=log)
+        try:
+            base = f'http://127.0.0.1:{port}'
+            wait_for(base + '/health', timeout=120)
+            client = LoadClient(base, [f'load{i}' for i in range(args.users)], args.upload_rows)
+            client.setup()
+
+            print(f"\n🚦 {args.rate:g} req/s for {args.duration:g}s, {args.workers} {args.worker_class} worker(s), "
+                  f"Gemini {args.latency}±{args.jitter}s, errors {args.error_rate:.0%}, 429s {args.rate_limit_rate:.0%}")
+            samples, elapsed = run_load(client, mix, args.rate, args.duration, args.max_in_flight)
+        finally:
+            server.terminate()
+            server.wait()
+    gemini.stop()
+
+    report = {
+        'config': vars(args),
+        'elapsed_seconds': round(elapsed, 2),
+        'endpoints': summarize(samples, elapsed),
+        'gemini': dict(gemini.stats)
+    }
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    print(f"{'endpoint':<16}{'reqs':>7}{'ok':>7}{'rps':>8}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for endpoint, row in sorted(report['endpoints'].items(), key=lambda item: item[0] == 'all'):
+        print(f"{endpoint:<16}{row['requests']:>7}{row['ok']:>7}{row['throughput_rps']:>8.2f}"
+              f"{row['p50_ms']:>10.1f}{row['p90_ms']:>10.1f}{row['p99_ms']:>10.1f}{row['max_ms']:>10.1f}")
+    print(f"🤖 Gemini: {report['gemini']}")
+    print(f"📝 Report written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
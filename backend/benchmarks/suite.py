@@ -0,0 +1,181 @@
+"""
+Hot-path benchmark suite with saved baselines.
+
+Times model encoding and inference, upload scoring and validation, dashboard simulation
+and PDF rendering at several sizes. Inference is timed through the batch API at every
+size; the single-row API (which scores only the first row) only at one row. Each case runs a few times after one warm-up run and
+the median is compared with benchmarks/baselines.json; the run fails (exit code 1) when
+any case is more than --threshold slower than its baseline.
+
+Runs fully offline: fetch_suggestions is replaced by a canned answer and add_suggestions
+runs with pause=0, so the one-second pause between Gemini calls is skipped. Baselines are machine-specific, so re-save them
+(--save) after changing hardware.
+
+Usage (from the backend folder):
+    python benchmarks/suite.py                    # compare with baselines.json
+    python benchmarks/suite.py --save             # record new baselines
+    python benchmarks/suite.py --only predict     # cases whose name contains "predict"
+"""
+import argparse
+import functools
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# Offline, self-contained settings; must be set before config is imported
+os.environ.setdefault('GEMINI_API_KEY', 'benchmark')
+os.environ.setdefault('JWT_SECRET_KEY', 'benchmark')
+os.environ.setdefault('GEMINI_API_BASE', 'http://127.0.0.1:9')
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+os.environ.setdefault('LOG_LEVEL', 'WARNING')
+
+import models  # noqa: E402
+import input_predict  # noqa: E402
+from bench_ingest import make_campaigns  # noqa: E402
+
+BASELINES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baselines.json')
+ROW_COUNTS = (1, 1000, 100000)
+
+
+def canned_suggestion(prompt):
+    return 'Shift budget to the best performing region and tighten targeting on weak keywords.'
+
+
+input_predict.fetch_suggestions = canned_suggestion
+input_predict.add_suggestions = functools.partial(input_predict.add_suggestions, pause=0)
+
+
+def sample_results(rows):
+    frame = make_campaigns(rows)
+    return [{
+        'conversions': 40.0 + i % 10,
+        'conversions_status': 'positive',
+        'actual_conversions': 42.0,
+        'roi': 60.0 + i % 7,
+        'roi_status': 'negative',
+        'actual_roi': 55.0,
+        'conversions_suggestions': canned_suggestion(''),
+        'roi_suggestions': canned_suggestion(''),
+        **frame.iloc[i].to_dict()
+    } for i in range(rows)]
+
+
+def model_input(rows, name):
+    df = make_campaigns(rows)
+    if name.startswith('predict_roi'):
+        df['Conversions'] = 40.0
+    return (df,)
+
+
+def build_cases():
+    """(name, setup, fn, repeat): setup() returns the argument tuple for fn."""
+    from app import simulate_dashboard_data
+
+    cases = []
+    for rows in ROW_COUNTS:
+        repeat = 5 if rows < 100000 else 3
+        cases.append((f'encode_categorical[{rows}]', lambda rows=rows: (make_campaigns(rows),),
+                      models.encode_categorical, repeat))
+        # The single-row API returns the first row's prediction; only time it on one row
+        names = ['predict_actual_roi', 'predict_actual_conversions', 'predict_conversions', 'predict_roi']
+        if rows == 1:
+            names += [f'{name}_batch' for name in names]
+        else:
+            names = [f'{name}_batch' for name in names]
+        for name in names:
+            cases.append((f'{name}[{rows}]', lambda rows=rows, name=name: model_input(rows, name),
+                          getattr(models, name), repeat))
+
+    for rows in (10, 100):
+        cases.append((f'process_file[{rows}]', lambda rows=rows: (make_campaigns(rows), 'both'),
+                      input_predict.process_file, 3))
+    for rows in (1000, 100000):
+        cases.append((f'validate_file[{rows}]', lambda rows=rows: (make_campaigns(rows),),
+                      input_predict.validate_file, 5))
+
+    cases.append(('simulate_dashboard_data', lambda: (), simulate_dashboard_data, 200))
+
+    def pdf_args(rows):
+        results = sample_results(rows)
+        path = os.path.join(tempfile.gettempdir(), f'finvix_bench_{rows}.pdf')
+        return (path, simulate_dashboard_data(), 55.0, 60.0, 42.0, 40.0,
+                canned_suggestion(''), 'both', results if rows > 1 else None)
+
+    def render(*args):
+        from reports import generate_pdf
+        generate_pdf(*args)
+
+    for rows in (1, 100, 1000):
+        cases.append((f'generate_pdf[{rows}]', lambda rows=rows: pdf_args(rows), render, 3 if rows < 1000 else 1))
+    return cases
+
+
+def time_case(setup, fn, repeat):
+    args = setup()
+    timings = []
+    fn(*args)
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn(*args)
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--save', action='store_true', help='Write the measured medians as the new baselines')
+    parser.add_argument('--threshold', type=float, default=0.25, help='Allowed slowdown, 0.25 = 25%%')
+    parser.add_argument('--only', default=None, help='Run only cases whose name contains this text')
+    parser.add_argument('--baselines', default=BASELINES_PATH)
+    args = parser.parse_args()
+
+    models.ensure_models_loaded()
+    cases = build_cases()
+
+    baselines = {}
+    if os.path.exists(args.baselines):
+        with open(args.baselines) as f:
+            baselines = json.load(f)
+
+    measured, regressions = {}, []
+    print(f"\n📊 Finvix benchmark suite (median seconds, threshold +{args.threshold:.0%})")
+    print(f"{'case':<42}{'median':>12}{'baseline':>12}{'change':>10}")
+    for name, setup, fn, repeat in cases:
+        if args.only and args.only not in name:
+            continue
+        seconds = time_case(setup, fn, repeat)
+        measured[name] = round(seconds, 6)
+        baseline = baselines.get(name)
+        if baseline:
+            change = seconds / baseline - 1
+            flag = ' ❌' if change > args.threshold else ''
+            if flag:
+                regressions.append(name)
+            print(f"{name:<42}{seconds:>12.5f}{baseline:>12.5f}{change:>+10.1%}{flag}")
+        else:
+            print(f"{name:<42}{seconds:>12.5f}{'-':>12}{'':>10}")
+
+    if args.save:
+        baselines.update(measured)
+        with open(args.baselines, 'w') as f:
+            json.dump(dict(sorted(baselines.items())), f, indent=2)
+            f.write('\n')
+        print(f"\n💾 Saved {len(measured)} baselines to {args.baselines}")
+        return 0
+
+    if regressions:
+        print(f"\n❌ {len(regressions)} case(s) regressed more than {args.threshold:.0%}: {', '.join(regressions)}")
+        return 1
+    print("\n✅ No regressions")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
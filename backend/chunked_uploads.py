@@ -0,0 +1,634 @@
+"""
+Resumable chunked uploads (/uploads).
+
+Parts are written to CHUNKED_UPLOAD_DIR/<upload_id> next to a JSON manifest, which is
+only changed under a per-upload flock. CSV parts are cut into complete records as they
+arrive and every run of records is queued as its own scoring job; other formats are
+streamed into one file on disk at completion and queued in CHUNKED_UPLOAD_SEGMENT_ROWS
+row segments. Rows already queued earlier in the upload are left out of later segments
+and filled in from the first copy's result, so duplicates are scored once per upload.
+
+Status goes uploading -> (assembling) -> scoring -> finalizing -> completed | failed.
+Polls collect finished jobs under the lock; persisting the results ('finalizing') runs
+after the lock is released, by one request at a time.
+
+Upload state is single-host: parts, manifest and per-segment results live on local
+disk, so every request for one upload must reach the host that holds it (or
+CHUNKED_UPLOAD_DIR must be a shared mount with working flock). The scoring jobs carry
+their own data, so workers can run anywhere.
+"""
+import codecs
+import csv
+import hashlib
+import io
+import json
+import os
+import shutil
+import time
+import uuid
+from contextlib import contextmanager
+import numpy as np
+import pandas as pd
+from concurrency import offload
+from config import (
+    CHUNKED_UPLOAD_DIR, CHUNKED_UPLOAD_MAX_SIZE, CHUNK_MAX_SIZE, CHUNKED_UPLOAD_TTL_SECONDS, CHUNKED_UPLOAD_SEGMENT_ROWS
+)
+from database_models import db, Job
+from ingest import is_supported, get_extension
+from input_predict import expected_columns
+from jobs import enqueue_upload_job, job_result
+from prediction_store import persist_results, delete_batch
+from logging_setup import get_logger
+
+
+log = get_logger('chunked_uploads')
+
+
+class UploadError(Exception):
+    """Chunked upload failure that maps to an HTTP status code."""
+
+    def __init__(self, message, status_code=400, payload=None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.payload = payload or {}
+
+
+def _upload_dir(upload_id):
+    # upload ids are uuid4 hex strings; anything else could escape the upload directory
+    if not upload_id or not all(c in '0123456789abcdef' for c in upload_id) or len(upload_id) != 32:
+        raise UploadError('Unknown upload', 404)
+    return os.path.join(CHUNKED_UPLOAD_DIR, upload_id)
+
+
+def _part_path(directory, part_number):
+    return os.path.join(directory, f"part-{part_number:06d}")
+
+
+def _carry_path(directory, part_number):
+    # Bytes after the last complete CSV record once parts 1..part_number are parsed
+    return os.path.join(directory, f"carry-{part_number:06d}")
+
+
+def _results_path(directory, segment):
+    return os.path.join(directory, f"results-{int(segment):06d}.jsonl")
+
+
+def _keys_path(directory, segment):
+    # Row hashes of a segment in file order, and which of those rows its job scores
+    return os.path.join(directory, f"keys-{int(segment):06d}.npy"), os.path.join(directory, f"sent-{int(segment):06d}.npy")
+
+
+def _assembled_path(directory, filename):
+    return os.path.join(directory, f"assembled{get_extension(filename)}")
+
+
+def _read_bytes(path):
+    if not os.path.exists(path):
+        return b''
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def _write_atomic(path, data):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+@contextmanager
+def _locked(directory):
+    """Serialize manifest updates for one upload across threads and worker processes."""
+    import fcntl
+    with open(os.path.join(directory, '.lock'), 'a') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _read_manifest(directory):
+    path = os.path.join(directory, 'manifest.json')
+    if not os.path.exists(path):
+        raise UploadError('Unknown upload', 404)
+    with open(path) as f:
+        return json.load(f)
+
+
+def _write_manifest(directory, manifest):
+    path = os.path.join(directory, 'manifest.json')
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f)
+    os.replace(tmp_path, path)
+
+
+def _load(upload_id, owner):
+    directory = _upload_dir(upload_id)
+    manifest = _read_manifest(directory)
+    if manifest['owner'] != owner:
+        raise UploadError('Unknown upload', 404)
+    return directory, manifest
+
+
+def purge_expired(now=None):
+    """Remove uploads that were not completed within CHUNKED_UPLOAD_TTL_SECONDS."""
+    now = now or time.time()
+    if not os.path.isdir(CHUNKED_UPLOAD_DIR):
+        return 0
+    removed = 0
+    for name in os.listdir(CHUNKED_UPLOAD_DIR):
+        directory = os.path.join(CHUNKED_UPLOAD_DIR, name)
+        try:
+            if now - os.path.getmtime(directory) > CHUNKED_UPLOAD_TTL_SECONDS:
+                shutil.rmtree(directory, ignore_errors=True)
+                removed += 1
+        except OSError:
+            continue
+    return removed
+
+
+def initiate_upload(owner, filename, model_type='both', total_size=None):
+    """
+    Start a chunked upload.
+
+    Returns:
+        dict: Upload status including the new upload_id.
+    """
+    if not filename or not is_supported(filename):
+        raise UploadError('Unsupported file type')
+    if total_size is not None and int(total_size) > CHUNKED_UPLOAD_MAX_SIZE:
+        raise UploadError(f'File too large. Maximum upload size is {CHUNKED_UPLOAD_MAX_SIZE // (1024 * 1024)}MB', 413)
+    purge_expired()
+
+    upload_id = uuid.uuid4().hex
+    directory = _upload_dir(upload_id)
+    os.makedirs(directory)
+    manifest = {
+        'upload_id': upload_id,
+        'owner': owner,
+        'filename': filename,
+        'model_type': model_type,
+        'total_size': int(total_size) if total_size is not None else None,
+        'created_at': time.time(),
+        'parts': {},
+        # Incremental CSV state: parts already cut into records, the header record and
+        # one scoring job per segment of complete records, keyed by part number
+        'parsed_through': 0,
+        'header': None,
+        'segments': {},
+        'rows_scored': 0,
+        'deduplicated_rows': 0,
+        'validation': None,
+        'error': None,
+        'batch_id': None,
+        'status': 'uploading'
+    }
+    _write_manifest(directory, manifest)
+    return status(manifest)
+
+
+def status(manifest):
+    """Client-facing view of an upload; `parts` lets the client resume with only the missing ones."""
+    received = sorted(int(n) for n in manifest['parts'])
+    return {
+        'upload_id': manifest['upload_id'],
+        'filename': manifest['filename'],
+        'model_type': manifest['model_type'],
+        'status': manifest['status'],
+        'parts': received,
+        'received_bytes': sum(part['size'] for part in manifest['parts'].values()),
+        'total_size': manifest['total_size'],
+        'segments_queued': sum(1 for segment in manifest['segments'].values() if segment['status'] == 'queued'),
+        'segments_scored': sum(1 for segment in manifest['segments'].values() if segment['status'] == 'scored'),
+        'rows_scored': manifest['rows_scored'],
+        'deduplicated_rows': manifest['deduplicated_rows'],
+        'validation': manifest['validation'],
+        'error': manifest['error'],
+        'max_chunk_size': CHUNK_MAX_SIZE
+    }
+
+
+def get_upload(upload_id, owner):
+    """Upload status, after picking up the results of any scoring jobs that finished."""
+    directory, manifest = _load(upload_id, owner)
+    if not manifest['segments']:
+        return status(manifest)
+    with _locked(directory):
+        manifest = _read_manifest(directory)
+        _collect_segments(directory, manifest)
+    if manifest['status'] == 'finalizing':
+        manifest = _finalize(directory)
+    return status(manifest)
+
+
+def put_part(upload_id, owner, part_number, data, checksum=None):
+    """
+    Store one numbered part, verifying its SHA-256 checksum when the client sends one.
+
+    Re-sending a part with the same content is a no-op, so clients can simply retry.
+    For CSV uploads every contiguous run of parts from the start is cut into complete
+    records and queued as a scoring job, so workers start before the rest of the file
+    has arrived. Nothing is scored inside the request.
+    """
+    directory, manifest = _load(upload_id, owner)
+    if manifest['status'] != 'uploading':
+        raise UploadError(f"Upload is already {manifest['status']}", 409)
+    if part_number < 1:
+        raise UploadError('Part numbers start at 1')
+    if len(data) > CHUNK_MAX_SIZE:
+        raise UploadError(f'Chunk too large. Maximum chunk size is {CHUNK_MAX_SIZE // (1024 * 1024)}MB', 413)
+
+    digest = hashlib.sha256(data).hexdigest()
+    if checksum and checksum.lower() != digest:
+        raise UploadError('Checksum mismatch', 400, {'expected': checksum, 'received': digest})
+
+    with _locked(directory):
+        manifest = _read_manifest(directory)
+        if manifest['status'] != 'uploading':
+            raise UploadError(f"Upload is already {manifest['status']}", 409)
+        existing = manifest['parts'].get(str(part_number))
+        if existing and existing['sha256'] == digest:
+            return status(manifest)
+        if existing and part_number <= manifest['parsed_through']:
+            raise UploadError('Part was already processed with different content', 409)
+        received = sum(part['size'] for n, part in manifest['parts'].items() if n != str(part_number))
+        if received + len(data) > CHUNKED_UPLOAD_MAX_SIZE:
+            raise UploadError(f'File too large. Maximum upload size is {CHUNKED_UPLOAD_MAX_SIZE // (1024 * 1024)}MB', 413)
+
+        _write_atomic(_part_path(directory, part_number), data)
+        manifest['parts'][str(part_number)] = {'size': len(data), 'sha256': digest}
+
+        if get_extension(manifest['filename']) == '.csv':
+            _queue_ready_parts(directory, manifest)
+        _write_manifest(directory, manifest)
+        return status(manifest)
+
+
+def _split_records(data, max_records=None, final=False):
+    """
+    Split CSV bytes after the last record that is certainly complete.
+
+    Records are found with the csv reader, so a line break inside a quoted field never
+    ends a row. Unless final, the last record is always left over: it may continue in
+    the next part.
+
+    Returns:
+        tuple: (complete bytes, leftover bytes, number of non-empty records in complete).
+    """
+    # surrogateescape keeps undecodable bytes 1:1, so offsets map back onto the raw bytes
+    text = codecs.getincrementaldecoder('utf-8')('surrogateescape').decode(data, final=final)
+    consumed = [0]
+
+    def lines():
+        for line in io.StringIO(text, newline=''):
+            consumed[0] += len(line)
+            yield line
+
+    boundary, rows, previous = 0, 0, None
+    for record in csv.reader(lines()):
+        if previous is not None:
+            boundary, rows = previous_end, rows + bool(previous)
+            if max_records and rows >= max_records:
+                break
+        previous, previous_end = record, consumed[0]
+    if final and previous is not None:
+        boundary, rows = previous_end, rows + bool(previous)
+    complete = text[:boundary].encode('utf-8', 'surrogateescape')
+    return complete, data[len(complete):], rows
+
+
+def _segment_frame(data):
+    """Parse a CSV segment (header included) as text, so re-serializing it keeps every value as sent."""
+    return pd.read_csv(io.BytesIO(data), dtype=str, keep_default_na=False, encoding_errors='surrogateescape')
+
+
+def _row_keys(frame):
+    columns = [col for col in expected_columns if col in frame.columns] or list(frame.columns)
+    return pd.util.hash_pandas_object(frame[columns], index=False).to_numpy()
+
+
+def _seen_keys(directory, manifest, segment):
+    """Row hashes of every segment queued before this one (read from disk, so a retried segment sees the same set)."""
+    earlier = [number for number in manifest['segments'] if int(number) < segment]
+    if not earlier:
+        return np.empty(0, dtype=np.uint64)
+    return np.concatenate([np.load(_keys_path(directory, number)[0]) for number in earlier])
+
+
+def _queue_segment(directory, manifest, segment, frame):
+    """
+    Queue one self-contained piece of the upload as a scoring job (workers may run on other nodes).
+
+    Rows identical to a row of an earlier segment are not sent again; _read_results gives
+    them the earlier row's result. Duplicates within the segment are left to the job.
+    """
+    keys = _row_keys(frame)
+    fresh = ~np.isin(keys, _seen_keys(directory, manifest, segment))
+    keys_path, sent_path = _keys_path(directory, segment)
+    np.save(keys_path, keys)
+    np.save(sent_path, fresh)
+    entry = {'job_id': None, 'rows': len(frame), 'sent': int(fresh.sum()), 'status': 'queued'}
+    if entry['sent']:
+        data = frame[fresh].to_csv(index=False).encode('utf-8', 'surrogateescape')
+        name = os.path.splitext(manifest['filename'])[0] + '.csv'
+        entry['job_id'] = enqueue_upload_job(manifest['owner'], name, manifest['model_type'], data, kind='upload_part').id
+    else:
+        entry.update(status='scored', rows_scored=len(frame), deduplicated_rows=len(frame))
+        _write_atomic(_results_path(directory, segment), b'')
+    manifest['segments'][str(segment)] = entry
+
+
+def _queue_ready_parts(directory, manifest):
+    """Cut every contiguous part after parsed_through into complete records and queue them."""
+    while str(manifest['parsed_through'] + 1) in manifest['parts']:
+        part_number = manifest['parsed_through'] + 1
+        data = _read_bytes(_carry_path(directory, manifest['parsed_through'])) + \
+            _read_bytes(_part_path(directory, part_number))
+
+        if manifest['header'] is None:
+            header, rest, found = _split_records(data, max_records=1)
+            if found:
+                manifest['header'] = header.decode('utf-8', 'surrogateescape')
+                data = rest
+
+        if manifest['header'] is not None:
+            body, data, rows = offload(_split_records, data)
+            if rows and manifest['validation'] is None:
+                frame = offload(_segment_frame, manifest['header'].encode('utf-8', 'surrogateescape') + body)
+                _queue_segment(directory, manifest, part_number, frame)
+        # Carries are keyed by part number, so re-running a part after a crash reads the same input
+        _write_atomic(_carry_path(directory, part_number), data)
+        manifest['parsed_through'] = part_number
+
+
+def _cancel_queued(manifest):
+    """Drop scoring jobs no worker has claimed yet."""
+    job_ids = [segment['job_id'] for segment in manifest['segments'].values() if segment['status'] == 'queued']
+    if job_ids:
+        Job.query.filter(Job.id.in_(job_ids), Job.status == 'queued').delete(synchronize_session=False)
+        db.session.commit()
+
+
+def _collect_segments(directory, manifest):
+    """
+    Pick up the results of finished scoring jobs, in file order.
+
+    Each segment's results go to their own results-<n>.jsonl, written under a temporary
+    name and renamed before the manifest records the segment as scored, so a retried or
+    re-collected segment replaces its file instead of appending to it. Once every segment
+    has finished the upload moves to 'finalizing' (see _finalize) or fails. Called under
+    the upload's lock.
+    """
+    offset = 0
+    for number in sorted(manifest['segments'], key=int):
+        segment = manifest['segments'][number]
+        if segment['status'] == 'queued':
+            job = db.session.get(Job, segment['job_id'], populate_existing=True)
+            if job is None:
+                segment['status'] = 'failed'
+                manifest['error'] = manifest['error'] or 'Scoring job was lost'
+            elif job.status == 'succeeded':
+                result = job_result(job)
+                lines = ''.join(json.dumps(row) + '\n' for row in result['results'])
+                _write_atomic(_results_path(directory, number), lines.encode('utf-8'))
+                segment.update(status='scored', rows_scored=segment['rows'],
+                               deduplicated_rows=segment['rows'] - segment['sent'] + result['stats'].get('deduplicated_rows', 0))
+            elif job.status == 'failed':
+                segment['status'] = 'failed'
+                validation = (job_result(job) or {}).get('validation')
+                if validation is None:
+                    manifest['error'] = manifest['error'] or job.error
+                elif manifest['validation'] is None:
+                    # Job rows count from 1 among the rows it was sent; report them as file rows
+                    sent_rows = np.flatnonzero(np.load(_keys_path(directory, number)[1]))
+                    for error in validation['errors']:
+                        if error['row'] is not None:
+                            error['row'] = offset + int(sent_rows[error['row'] - 1]) + 1
+                    manifest['validation'] = validation
+        offset += segment['rows']
+
+    scored = [segment for segment in manifest['segments'].values() if segment['status'] == 'scored']
+    manifest['rows_scored'] = sum(segment['rows_scored'] for segment in scored)
+    manifest['deduplicated_rows'] = sum(segment['deduplicated_rows'] for segment in scored)
+
+    if manifest['validation'] is not None or manifest['error'] is not None:
+        _cancel_queued(manifest)
+        if manifest['status'] == 'scoring':
+            manifest['status'] = 'failed'
+    elif manifest['status'] == 'scoring' and len(scored) == len(manifest['segments']):
+        manifest['status'] = 'finalizing'
+    _write_manifest(directory, manifest)
+
+
+def _finalize(directory):
+    """
+    Persist a fully scored upload's results and mark it completed; returns the manifest.
+
+    Runs outside the manifest lock, so polls and status requests are not held up by the
+    database write. A non-blocking lock of its own lets one request do the work while
+    concurrent ones just report 'finalizing'; an interrupted finalize is redone by the
+    next poll (its partial batch is deleted first).
+    """
+    import fcntl
+    with open(os.path.join(directory, '.finalize'), 'a') as lock_file:
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return _read_manifest(directory)
+        try:
+            manifest = _read_manifest(directory)
+            if manifest['status'] != 'finalizing':
+                return manifest
+            delete_batch(manifest['upload_id'])
+            stored = persist_results(manifest['upload_id'], manifest['owner'], manifest['model_type'],
+                                     _read_results(directory, manifest))
+            with _locked(directory):
+                manifest = _read_manifest(directory)
+                if stored:
+                    manifest['batch_id'] = manifest['upload_id']
+                manifest['status'] = 'completed'
+                _write_manifest(directory, manifest)
+            return manifest
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _read_results(directory, manifest):
+    """All results in file order, giving rows left out as duplicates the result of their first copy."""
+    results, first = [], {}
+    for number in sorted(manifest['segments'], key=int):
+        keys_path, sent_path = _keys_path(directory, number)
+        with open(_results_path(directory, number)) as f:
+            scored = (json.loads(line) for line in f)
+            for key, fresh in zip(np.load(keys_path).tolist(), np.load(sent_path).tolist()):
+                row = next(scored) if fresh else first[key]
+                first.setdefault(key, row)
+                results.append(row)
+    return results
+
+
+def _read_frames(path, filename, rows=CHUNKED_UPLOAD_SEGMENT_ROWS):
+    """Yield a non-CSV upload from disk in frames of at most `rows` rows, all columns kept."""
+    extension = get_extension(filename)
+    if extension == '.parquet':
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=rows):
+            yield batch.to_pandas()
+        return
+    if extension in ('.arrow', '.feather', '.ipc'):
+        import pyarrow as pa
+        import pyarrow.ipc as ipc
+        with pa.memory_map(path) as source:
+            try:
+                reader = ipc.open_file(source)
+                batches = (reader.get_batch(i) for i in range(reader.num_record_batches))
+            except pa.ArrowInvalid:
+                source.seek(0)
+                batches = iter(ipc.open_stream(source))
+            for batch in batches:
+                for start in range(0, batch.num_rows, rows):
+                    yield batch.slice(start, rows).to_pandas()
+        return
+    # Excel has no streaming reader; the sheet is read from the assembled file on disk
+    try:
+        df = pd.read_excel(path, engine='calamine')
+    except ImportError:
+        df = pd.read_excel(path, engine='openpyxl')
+    for start in range(0, len(df), rows):
+        yield df.iloc[start:start + rows]
+
+
+def _segment_path(directory, segment):
+    return os.path.join(directory, f"segment-{int(segment):06d}.csv")
+
+
+def _assemble_segments(directory, manifest, total_parts):
+    """
+    Stream the parts of a non-CSV upload into one file on disk and cut it into CSV segments.
+
+    Parts are copied file to file and each segment of at most CHUNKED_UPLOAD_SEGMENT_ROWS
+    rows is written to its own segment-<n>.csv, so no more than one segment is in memory
+    at a time (Excel, which has no streaming reader, is the exception). Returns the count.
+    """
+    path = _assembled_path(directory, manifest['filename'])
+    with open(path + '.tmp', 'wb') as assembled:
+        for n in range(1, total_parts + 1):
+            with open(_part_path(directory, n), 'rb') as part:
+                shutil.copyfileobj(part, assembled)
+    os.replace(path + '.tmp', path)
+    for n in range(1, total_parts + 1):
+        os.remove(_part_path(directory, n))
+    count = 0
+    for count, frame in enumerate(_read_frames(path, manifest['filename']), start=1):
+        _write_atomic(_segment_path(directory, count), frame.to_csv(index=False).encode('utf-8', 'surrogateescape'))
+    os.remove(path)
+    return count
+
+
+def complete_upload(upload_id, owner, total_parts):
+    """
+    Finish an upload once parts 1..total_parts are present and queue what is left to score.
+
+    CSV uploads only queue the records after the last segment queued while parts were
+    arriving. Other formats are assembled on disk and queued in segments; that happens
+    outside the lock, with the upload in 'assembling' status meanwhile. Poll get_upload
+    until the status is 'completed', then fetch upload_results.
+
+    Returns:
+        dict: Upload status (normally 'scoring').
+    """
+    directory, manifest = _load(upload_id, owner)
+    with _locked(directory):
+        manifest = _read_manifest(directory)
+        if manifest['status'] != 'uploading':
+            raise UploadError(f"Upload is already {manifest['status']}", 409)
+        missing = [n for n in range(1, total_parts + 1) if str(n) not in manifest['parts']]
+        extra = [int(n) for n in manifest['parts'] if int(n) > total_parts]
+        if missing or extra:
+            raise UploadError('Upload is incomplete', 400, {'missing_parts': missing, 'unexpected_parts': extra})
+        size = sum(part['size'] for part in manifest['parts'].values())
+        if manifest['total_size'] is not None and size != manifest['total_size']:
+            raise UploadError('Assembled size does not match total_size', 400, {'received_bytes': size})
+
+        if get_extension(manifest['filename']) == '.csv':
+            _queue_ready_parts(directory, manifest)
+            tail = _read_bytes(_carry_path(directory, total_parts))
+            if manifest['header'] is None:
+                raise UploadError('File is empty')
+            # Whatever follows the last complete record is the file's final row(s)
+            _, _, rows = _split_records(tail, final=True)
+            if rows and manifest['validation'] is None:
+                frame = offload(_segment_frame, manifest['header'].encode('utf-8', 'surrogateescape') + tail)
+                _queue_segment(directory, manifest, total_parts + 1, frame)
+            if not manifest['segments']:
+                raise UploadError('File is empty')
+            _start_scoring(directory, manifest)
+        else:
+            manifest['status'] = 'assembling'
+            _write_manifest(directory, manifest)
+
+    if manifest['status'] == 'assembling':
+        try:
+            segments = offload(_assemble_segments, directory, manifest, total_parts)
+        except Exception as e:
+            segments, error = 0, f'Could not read file: {str(e)}'
+        else:
+            error = None if segments else 'File is empty'
+        with _locked(directory):
+            manifest = _read_manifest(directory)
+            if error:
+                manifest.update(status='failed', error=error)
+                _write_manifest(directory, manifest)
+                raise UploadError(error)
+            for number in range(1, segments + 1):
+                frame = offload(_segment_frame, _read_bytes(_segment_path(directory, number)))
+                _queue_segment(directory, manifest, number, frame)
+                os.remove(_segment_path(directory, number))
+            _start_scoring(directory, manifest)
+
+    if manifest['status'] == 'finalizing':
+        # Every remaining row duplicated an earlier one, so nothing was left to score
+        manifest = _finalize(directory)
+    return status(manifest)
+
+
+def _start_scoring(directory, manifest):
+    manifest['status'] = 'scoring'
+    _collect_segments(directory, manifest)
+
+
+def upload_results(upload_id, owner):
+    """
+    Results of a completed upload, in file order.
+
+    Returns:
+        tuple: (results, stats, upload) with stats {'deduplicated_rows': n} plus the
+        batch_id when the results were persisted, and the upload's status.
+    """
+    directory, manifest = _load(upload_id, owner)
+    with _locked(directory):
+        manifest = _read_manifest(directory)
+        if manifest['status'] == 'scoring':
+            _collect_segments(directory, manifest)
+    if manifest['status'] == 'finalizing':
+        manifest = _finalize(directory)
+    if manifest['status'] in ('uploading', 'assembling', 'scoring', 'finalizing'):
+        raise UploadError('Upload has not finished scoring yet', 409, status(manifest))
+    if manifest['validation'] is not None:
+        raise UploadError('Validation failed', 400, {'validation': manifest['validation']})
+    if manifest['status'] == 'failed':
+        raise UploadError(f"Upload scoring failed: {manifest['error']}", 400)
+    # A completed upload's files no longer change, so they are read without the lock
+    results = _read_results(directory, manifest)
+    stats = {'deduplicated_rows': manifest['deduplicated_rows']}
+    if manifest['batch_id']:
+        stats['batch_id'] = manifest['batch_id']
+    return results, stats, status(manifest)
+
+
+def abort_upload(upload_id, owner):
+    directory, manifest = _load(upload_id, owner)
+    _cancel_queued(manifest)
+    shutil.rmtree(directory, ignore_errors=True)
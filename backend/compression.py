@@ -0,0 +1,145 @@
+import zlib
+from functools import wraps
+from flask import request, jsonify
+from config import COMPRESSION_MIN_SIZE, GZIP_LEVEL, BROTLI_QUALITY, MAX_DECOMPRESSED_BODY_SIZE
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always available
+    brotli = None
+
+
+# Media types worth compressing. Server-sent events are left alone: a compressor would
+# hold events back until its buffer fills, which breaks the live stream.
+COMPRESSIBLE_MIME_TYPES = {
+    'application/json',
+    'application/vnd.finvix.columnar+json',
+    'application/vnd.apache.arrow.stream',
+    'text/csv',
+    'text/plain',
+    'text/html',
+}
+
+
+class BodyTooLarge(Exception):
+    """Decompressed request body exceeds MAX_DECOMPRESSED_BODY_SIZE."""
+
+
+DECODE_ERRORS = (ValueError, zlib.error) + ((brotli.error,) if brotli is not None else ())
+
+
+def _gzip_compressor():
+    return zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)  # wbits 31: gzip container
+
+
+class _BrotliCompressor:
+    """brotli.Compressor with the compress/flush interface of zlib compressobj."""
+
+    def __init__(self):
+        self._compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+
+    def compress(self, data):
+        return self._compressor.process(data)
+
+    def flush(self):
+        return self._compressor.finish()
+
+
+def choose_encoding():
+    """Best supported Content-Encoding from Accept-Encoding: br, then gzip, else None."""
+    accepted = request.accept_encodings
+    gzip_quality = accepted.quality('gzip')
+    if brotli is not None and accepted.quality('br') and accepted.quality('br') >= gzip_quality:
+        return 'br'
+    if gzip_quality:
+        return 'gzip'
+    return None
+
+
+def _compressor(encoding):
+    return _BrotliCompressor() if encoding == 'br' else _gzip_compressor()
+
+
+def _compress_chunks(chunks, compressor):
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def compress_response(response):
+    """
+    after_request hook: compress JSON/CSV/Arrow bodies for clients that accept it.
+
+    Buffered responses are compressed when at least COMPRESSION_MIN_SIZE bytes; streamed
+    responses (exports) are compressed chunk by chunk as they are generated.
+    """
+    if (
+        request.method == 'HEAD'
+        or response.direct_passthrough
+        or response.mimetype not in COMPRESSIBLE_MIME_TYPES
+        or not 200 <= response.status_code < 300
+        or response.status_code in (204, 206)
+        or 'Content-Encoding' in response.headers
+    ):
+        return response
+
+    response.vary.add('Accept-Encoding')
+    encoding = choose_encoding()
+    if encoding is None:
+        return response
+
+    if response.is_streamed:
+        response.response = _compress_chunks(response.iter_encoded(), _compressor(encoding))
+        response.headers.pop('Content-Length', None)
+    else:
+        body = response.get_data()
+        if len(body) < COMPRESSION_MIN_SIZE:
+            return response
+        compressor = _compressor(encoding)
+        response.set_data(compressor.compress(body) + compressor.flush())
+
+    response.headers['Content-Encoding'] = encoding
+    return response
+
+
+def decompress_body(data, encoding):
+    """Decode a gzip/deflate/br request body, refusing to inflate past MAX_DECOMPRESSED_BODY_SIZE."""
+    if encoding in ('gzip', 'deflate'):
+        decompressor = zlib.decompressobj(47 if encoding == 'gzip' else 15)  # 47: gzip or zlib header
+        body = decompressor.decompress(data, MAX_DECOMPRESSED_BODY_SIZE + 1)
+        if len(body) > MAX_DECOMPRESSED_BODY_SIZE:
+            raise BodyTooLarge()
+        return body
+    if encoding == 'br' and brotli is not None:
+        decompressor = brotli.Decompressor()
+        parts, size = [], 0
+        for start in range(0, len(data), 64 * 1024):
+            part = decompressor.process(data[start:start + 64 * 1024])
+            size += len(part)
+            if size > MAX_DECOMPRESSED_BODY_SIZE:
+                raise BodyTooLarge()
+            parts.append(part)
+        return b''.join(parts)
+    raise ValueError(f'Unsupported Content-Encoding: {encoding}')
+
+
+def accepts_compressed_body(view):
+    """Let a JSON endpoint receive a gzip, deflate or br encoded request body."""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        encoding = request.headers.get('Content-Encoding', '').strip().lower()
+        if encoding and encoding != 'identity':
+            try:
+                # get_data()/get_json() read the cached body, so the view sees plain JSON
+                request._cached_data = decompress_body(request.get_data(cache=False), encoding)
+            except BodyTooLarge:
+                return jsonify({
+                    'error': f'Request body too large. Maximum is {MAX_DECOMPRESSED_BODY_SIZE // (1024 * 1024)}MB decompressed',
+                    'status': 'error'
+                }), 413
+            except DECODE_ERRORS as e:
+                return jsonify({'error': f'Could not decode request body: {str(e)}', 'status': 'error'}), 400
+        return view(*args, **kwargs)
+    return wrapper
@@ -0,0 +1,62 @@
+"""
+Helpers for the cooperative (gevent) serving mode.
+
+Under `gunicorn -k gevent` sockets, sleeps and locks are monkey-patched, so Gemini calls
+and database waits (with psycogreen) yield to other requests. CPU-bound work does not
+yield, so it is sent to gevent's pool of real OS threads instead. Under sync workers,
+or a plain `python app.py`, every helper just calls the function directly.
+"""
+from config import OFFLOAD_THREADS
+
+
+def is_cooperative():
+    """True when gevent has monkey-patched this process (the gevent worker class)."""
+    try:
+        from gevent import monkey
+    except ImportError:
+        return False
+    return monkey.is_module_patched('socket')
+
+
+_threadpool = None
+
+
+def _native_threadpool():
+    global _threadpool
+    if _threadpool is None:
+        import gevent
+        _threadpool = gevent.get_hub().threadpool
+        _threadpool.maxsize = OFFLOAD_THREADS
+    return _threadpool
+
+
+def offload(fn, *args, **kwargs):
+    """Run CPU-bound fn on a native thread when cooperative, otherwise inline."""
+    if not is_cooperative():
+        return fn(*args, **kwargs)
+    return _native_threadpool().apply(fn, args, kwargs)
+
+
+_executor_pools = {}
+
+
+def _native_pool_for(executor):
+    pool = _executor_pools.get(executor)
+    if pool is None:
+        from gevent.threadpool import ThreadPool
+        pool = _executor_pools[executor] = ThreadPool(executor._max_workers)
+    return pool
+
+
+def run_in_executor(executor, fn, *args):
+    """
+    Run fn on a concurrent.futures executor and wait for it.
+
+    Under gevent the executor's threads are greenlets, so a GIL-releasing CPU task
+    (bcrypt) would still block the hub. The work goes to a pool of real OS threads of
+    the executor's own size instead, kept apart from the offload() pool so the
+    executor's bound still holds and it cannot starve model work.
+    """
+    if is_cooperative():
+        return _native_pool_for(executor).apply(fn, args)
+    return executor.submit(fn, *args).result()
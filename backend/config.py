@@ -10,14 +10,27 @@ load_dotenv()
 # ======================
 
 # Gemini AI API key for AI-powered suggestions
+# (missing required settings abort the import in production; see validate_config below)
 GEMINI_API_KEY = os.getenv('GEMINI_API_KEY')
-if not GEMINI_API_KEY:
-    raise ValueError("GEMINI_API_KEY environment variable is required")
+
+# Gemini endpoint; point GEMINI_API_BASE at a local stub for load tests
+GEMINI_API_BASE = os.getenv('GEMINI_API_BASE', 'https://generativelanguage.googleapis.com/v1beta')
+GEMINI_MODEL = os.getenv('GEMINI_MODEL', 'gemini-2.0-flash')
+GEMINI_TIMEOUT_SECONDS = float(os.getenv('GEMINI_TIMEOUT_SECONDS', 30))
 
 # JWT Secret Key for authentication
 JWT_SECRET_KEY = os.getenv('JWT_SECRET_KEY')
-if not JWT_SECRET_KEY:
-    raise ValueError("JWT_SECRET_KEY environment variable is required")
+
+# Access tokens are short-lived; clients renew them with a refresh token instead of logging in again
+JWT_ACCESS_TOKEN_MINUTES = int(os.getenv('JWT_ACCESS_TOKEN_MINUTES', 15))
+JWT_REFRESH_TOKEN_DAYS = int(os.getenv('JWT_REFRESH_TOKEN_DAYS', 30))
+
+# bcrypt cost factor (log2 rounds) for new password hashes
+BCRYPT_LOG_ROUNDS = int(os.getenv('BCRYPT_LOG_ROUNDS', 12))
+
+# Threads that may run bcrypt at once, and how many more logins may wait for one
+BCRYPT_MAX_WORKERS = int(os.getenv('BCRYPT_MAX_WORKERS', 2))
+BCRYPT_MAX_PENDING = int(os.getenv('BCRYPT_MAX_PENDING', 32))
 
 # ======================
 # Database Configuration
@@ -59,6 +72,207 @@ TEMP_DIR = os.getenv('TEMP_DIR', '/tmp')
 # Maximum file size (in bytes) - 16MB
 MAX_FILE_SIZE = int(os.getenv('MAX_FILE_SIZE', 16 * 1024 * 1024))
 
+# Uploads up to this size stay in memory; larger ones spool to a per-request temp file
+UPLOAD_SPOOL_SIZE = int(os.getenv('UPLOAD_SPOOL_SIZE', 1024 * 1024))
+
+# Resumable chunked uploads (/uploads): part storage, size limits and expiry. Upload state
+# lives on local disk, so all requests for one upload must reach the same host (or this
+# directory must be a shared mount with working flock)
+CHUNKED_UPLOAD_DIR = os.getenv('CHUNKED_UPLOAD_DIR', os.path.join(TEMP_DIR, 'finvix_uploads'))
+CHUNKED_UPLOAD_MAX_SIZE = int(os.getenv('CHUNKED_UPLOAD_MAX_SIZE', 512 * 1024 * 1024))
+CHUNK_MAX_SIZE = int(os.getenv('CHUNK_MAX_SIZE', 8 * 1024 * 1024))
+CHUNKED_UPLOAD_TTL_SECONDS = int(os.getenv('CHUNKED_UPLOAD_TTL_SECONDS', 24 * 60 * 60))
+
+# Rows per scoring job when a non-CSV chunked upload is cut into segments
+CHUNKED_UPLOAD_SEGMENT_ROWS = int(os.getenv('CHUNKED_UPLOAD_SEGMENT_ROWS', 50000))
+
+# Largest request body on the upload routes (and any route without its own limit): the
+# biggest file or chunk plus room for multipart framing and form fields; larger is a 413
+MAX_REQUEST_SIZE = int(os.getenv('MAX_REQUEST_SIZE', max(MAX_FILE_SIZE, CHUNK_MAX_SIZE) + 1024 * 1024))
+
+# Maximum number of individual violations listed in an upload validation report
+VALIDATION_MAX_ERRORS = int(os.getenv('VALIDATION_MAX_ERRORS', 100))
+
+# ======================
+# Background Jobs
+# ======================
+
+# Seconds an idle worker waits before polling the jobs table again
+JOB_POLL_INTERVAL = float(os.getenv('JOB_POLL_INTERVAL', 2))
+
+# A running job whose worker has not sent a heartbeat for this long is requeued
+JOB_STALE_SECONDS = int(os.getenv('JOB_STALE_SECONDS', 300))
+
+# Seconds between heartbeats of a running job; sent for the whole job, not only on progress
+JOB_HEARTBEAT_INTERVAL = float(os.getenv('JOB_HEARTBEAT_INTERVAL', JOB_STALE_SECONDS / 5))
+
+# Attempts before a repeatedly abandoned job is marked failed
+JOB_MAX_ATTEMPTS = int(os.getenv('JOB_MAX_ATTEMPTS', 3))
+
+# Minimum seconds between progress writes for one job
+JOB_PROGRESS_INTERVAL = float(os.getenv('JOB_PROGRESS_INTERVAL', 1))
+
+# ======================
+# Serving
+# ======================
+
+# Native threads for CPU-bound work (model inference, PDF rendering, parsing, bcrypt)
+# when running under the gevent worker class, so it does not stall other requests
+OFFLOAD_THREADS = int(os.getenv('OFFLOAD_THREADS', 4))
+
+# ======================
+# Profiling
+# ======================
+
+# Usernames allowed to profile a request by sending the X-Finvix-Profile header.
+# Profiling hooks are only installed when this or PROFILE_USERS is set, so it costs nothing otherwise.
+PROFILE_ADMINS = {u.strip() for u in os.getenv('PROFILE_ADMINS', '').split(',') if u.strip()}
+
+# Users whose every request is profiled (set by an admin while chasing a slow account)
+PROFILE_USERS = {u.strip() for u in os.getenv('PROFILE_USERS', '').split(',') if u.strip()}
+
+# Where profiles are written, and how many are kept before the oldest are deleted
+PROFILE_DIR = os.getenv('PROFILE_DIR', os.path.join(TEMP_DIR, 'finvix_profiles'))
+PROFILE_MAX_FILES = int(os.getenv('PROFILE_MAX_FILES', 50))
+
+# Seconds between stack samples in sampling mode
+PROFILE_SAMPLE_INTERVAL = float(os.getenv('PROFILE_SAMPLE_INTERVAL', 0.005))
+
+# ======================
+# Compression
+# ======================
+
+# Buffered responses smaller than this are sent uncompressed
+COMPRESSION_MIN_SIZE = int(os.getenv('COMPRESSION_MIN_SIZE', 1024))
+
+# gzip level (1-9) and brotli quality (0-11); mid values keep CPU cost per request low
+GZIP_LEVEL = int(os.getenv('GZIP_LEVEL', 6))
+BROTLI_QUALITY = int(os.getenv('BROTLI_QUALITY', 5))
+
+# Largest request body accepted after decoding Content-Encoding: gzip/br
+MAX_DECOMPRESSED_BODY_SIZE = int(os.getenv('MAX_DECOMPRESSED_BODY_SIZE', 64 * 1024 * 1024))
+
+# Largest request body on the JSON endpoints that take whole result sets (/predict/batch,
+# /upload_report, /download_results); defaults to the decompressed limit, so an uncompressed
+# body is allowed as much as a compressed one inflates to
+MAX_JSON_BODY_SIZE = int(os.getenv('MAX_JSON_BODY_SIZE', MAX_DECOMPRESSED_BODY_SIZE))
+
+# ======================
+# Batch Prediction
+# ======================
+
+# Most campaigns /predict/batch accepts in one request
+BATCH_MAX_ITEMS = int(os.getenv('BATCH_MAX_ITEMS', 1000))
+
+# With "suggestions": true, only this many items per request get Gemini suggestions
+BATCH_MAX_SUGGESTIONS = int(os.getenv('BATCH_MAX_SUGGESTIONS', 25))
+
+# ======================
+# What-if Scenarios & Budget Optimizer
+# ======================
+
+# Largest grid /predict/sweep will score in one request
+SCENARIO_MAX_ROWS = int(os.getenv('SCENARIO_MAX_ROWS', 50000))
+
+# /optimize/budget: longest search per request (requests may ask for less), finest spend
+# grid (units per budget), rows per model call, and scored rows memoized per process
+OPTIMIZER_MAX_SECONDS = float(os.getenv('OPTIMIZER_MAX_SECONDS', 2))
+OPTIMIZER_MAX_STEPS = int(os.getenv('OPTIMIZER_MAX_STEPS', 256))
+OPTIMIZER_BATCH_SIZE = int(os.getenv('OPTIMIZER_BATCH_SIZE', 4096))
+OPTIMIZER_CACHE_SIZE = int(os.getenv('OPTIMIZER_CACHE_SIZE', 100000))
+
+# ======================
+# Prediction Explanations
+# ======================
+
+# Attach per-feature contributions and a one-sentence explanation to every prediction
+EXPLAIN_PREDICTIONS = os.getenv('EXPLAIN_PREDICTIONS', 'true').lower() == 'true'
+
+# exact: TreeSHAP (about 1 ms per row per model on one core); approx: path-based
+# attributions, roughly 100x faster. Both add up to the prediction.
+EXPLAIN_METHOD = os.getenv('EXPLAIN_METHOD', 'exact').lower()
+
+# Features named in the explanation sentence
+EXPLAIN_TOP_FEATURES = int(os.getenv('EXPLAIN_TOP_FEATURES', 3))
+
+# Ask Gemini for upload suggestions; when false the local explanation is used instead,
+# which also skips the one-second pause between Gemini calls
+LLM_SUGGESTIONS = os.getenv('LLM_SUGGESTIONS', 'true').lower() == 'true'
+
+# ======================
+# Result Persistence
+# ======================
+
+# Store every scored upload row (and its suggestions) in the database
+PERSIST_RESULTS = os.getenv('PERSIST_RESULTS', 'true').lower() == 'true'
+
+# Rows written and committed per COPY / executemany round trip
+RESULT_WRITE_CHUNK_SIZE = int(os.getenv('RESULT_WRITE_CHUNK_SIZE', 5000))
+
+# Keep a Parquet copy of each upload's results so /results, /upload_report and
+# /download_results can reference them by result_id; files expire after the TTL
+RESULT_STORE = os.getenv('RESULT_STORE', 'true').lower() == 'true'
+RESULT_STORE_DIR = os.getenv('RESULT_STORE_DIR', os.path.join(TEMP_DIR, 'finvix_results'))
+RESULT_STORE_TTL_SECONDS = int(os.getenv('RESULT_STORE_TTL_SECONDS', 24 * 60 * 60))
+
+# Default and largest page size for GET /results/<result_id>
+RESULT_PAGE_SIZE = int(os.getenv('RESULT_PAGE_SIZE', 100))
+RESULT_PAGE_MAX = int(os.getenv('RESULT_PAGE_MAX', 1000))
+
+# ======================
+# Dashboard Streaming
+# ======================
+
+# Number of hourly points kept in the live dashboard window
+DASHBOARD_WINDOW_SIZE = int(os.getenv('DASHBOARD_WINDOW_SIZE', 24))
+
+# Number of point deltas kept so reconnecting clients can resume from Last-Event-ID
+DASHBOARD_EVENT_BUFFER = int(os.getenv('DASHBOARD_EVENT_BUFFER', 512))
+
+# Seconds between heartbeat comments on an idle /dashboard/stream connection
+DASHBOARD_HEARTBEAT_SECONDS = float(os.getenv('DASHBOARD_HEARTBEAT_SECONDS', 15))
+
+# Maximum lifetime of one /dashboard/stream connection before the client reconnects
+DASHBOARD_STREAM_MAX_SECONDS = float(os.getenv('DASHBOARD_STREAM_MAX_SECONDS', 300))
+
+# Shared-memory block holding the dashboard feed, so every worker on a host streams the same
+# events and Last-Event-ID resumes work across workers; empty keeps the feed per process
+DASHBOARD_FEED_SHM = os.getenv('DASHBOARD_FEED_SHM', 'finvix_dashboard_feed')
+
+# How often a streaming client checks the shared feed for events published by other workers
+DASHBOARD_POLL_SECONDS = float(os.getenv('DASHBOARD_POLL_SECONDS', 0.5))
+
+# ======================
+# Segment Metrics
+# ======================
+
+# Number of recent predictions kept per (Campaign Type, Region) segment
+SEGMENT_WINDOW_CAPACITY = int(os.getenv('SEGMENT_WINDOW_CAPACITY', 1024))
+
+# Shared-memory block holding the aggregates, so every worker on a host reads and updates
+# the same segments; empty keeps the aggregates per process
+SEGMENT_METRICS_SHM = os.getenv('SEGMENT_METRICS_SHM', 'finvix_segment_metrics')
+
+# ======================
+# Input Drift Monitoring
+# ======================
+
+# Track live model inputs against the reference profile (exposed on /metrics/drift)
+DRIFT_MONITORING = os.getenv('DRIFT_MONITORING', 'true').lower() == 'true'
+
+# Reference profile shared by all workers; build it with `python drift_monitor.py <training data>`
+# or let the first worker bootstrap it (written atomically, never into models/)
+DRIFT_REFERENCE_PATH = os.getenv('DRIFT_REFERENCE_PATH', os.path.join(TEMP_DIR, 'finvix_drift_reference.json'))
+
+# Without a reference file, the first this-many observed rows become the reference
+DRIFT_REFERENCE_ROWS = int(os.getenv('DRIFT_REFERENCE_ROWS', 1000))
+
+# Rows per live window; drift is scored over the last one to two windows
+DRIFT_WINDOW_ROWS = int(os.getenv('DRIFT_WINDOW_ROWS', 5000))
+
+# Histogram bins per numeric feature (quantiles of the reference data)
+DRIFT_BINS = int(os.getenv('DRIFT_BINS', 10))
+
 # ======================
 # Model Configuration
 # ======================
@@ -70,8 +284,16 @@ MODELS_DIR = os.path.join(os.path.dirname(__file__), 'models')
 # Logging Configuration
 # ======================
 
+# DEBUG adds dtype dumps and sample rows from the model code; they are not built at INFO
 LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
 
+# text for readable console output, json for one JSON object per line (log collectors)
+LOG_FORMAT = os.getenv('LOG_FORMAT', 'text').lower()
+
+# Share of requests (0-1) that get a request log line; errors and slow requests always do
+LOG_REQUEST_SAMPLE_RATE = float(os.getenv('LOG_REQUEST_SAMPLE_RATE', 0.01))
+LOG_SLOW_REQUEST_SECONDS = float(os.getenv('LOG_SLOW_REQUEST_SECONDS', 2))
+
 # ======================
 # Validation
 # ======================
@@ -96,14 +318,18 @@ def validate_config():
     
     return True
 
-# Run validation when config is imported
+# Run validation when config is imported. In production a missing secret aborts the
+# import, so a misconfigured deploy never serves traffic. Elsewhere errors are kept in
+# CONFIG_ERRORS and reported by /health, so a local setup still boots far enough to say
+# what is wrong
+CONFIG_ERRORS = []
 try:
     validate_config()
 except ValueError as e:
     if FLASK_ENV == 'production':
-        raise e
-    else:
-        print(f"⚠️ Configuration Warning: {e}")
+        raise
+    CONFIG_ERRORS.append(str(e))
+    print(f"⚠️ Configuration Warning: {e}")
 
 # ======================
 # Config Summary
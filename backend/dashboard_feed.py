@@ -0,0 +1,335 @@
+import json
+import os
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import datetime
+import numpy as np
+from config import (
+    DASHBOARD_WINDOW_SIZE, DASHBOARD_EVENT_BUFFER, DASHBOARD_HEARTBEAT_SECONDS, DASHBOARD_STREAM_MAX_SECONDS,
+    DASHBOARD_POLL_SECONDS, TEMP_DIR
+)
+
+
+# Fields of a dashboard point that are averaged across the predictions in one hour
+AVERAGED_FIELDS = ['conversions', 'roi', 'impressions', 'clicks', 'cost_per_conversion', 'ad_spend', 'ctr']
+
+# Bytes reserved for one JSON-encoded point in the window and replay slots
+POINT_BYTES = 1024
+
+# Shared counters in front of the window: last event seq, seeded flag, event-id epoch and
+# the insertion counter that orders window buckets
+HEADER_FIELDS = ['seq', 'seeded', 'epoch', 'order']
+
+
+def bucket_key(timestamp):
+    """Hourly bucket a dashboard point belongs to (YYYY-MM-DDTHH)."""
+    return timestamp[:13]
+
+
+def point_from_prediction(input_dict, result, now=None):
+    """
+    Build a dashboard point from one prediction, using the same fields as simulate_dashboard_data.
+
+    Args:
+        input_dict (dict): The 13 input features of the prediction.
+        result (dict): The prediction result (conversions/roi and their statuses).
+        now (datetime, optional): Timestamp of the prediction.
+
+    Returns:
+        dict: Dashboard point.
+    """
+    now = now or datetime.now()
+    impressions = float(input_dict.get('Impressions', 0) or 0)
+    ctr = float(input_dict.get('Click-Through Rate (CTR)', 0) or 0)
+    ad_spend = float(input_dict.get('Ad Spend', 0) or 0)
+    conversions = float(result.get('conversions', result.get('actual_conversions', 0)) or 0)
+    return {
+        'time': now.isoformat(),
+        'conversions': conversions,
+        'roi': float(result.get('roi', result.get('actual_roi', 0)) or 0),
+        'impressions': impressions,
+        'clicks': float(input_dict.get('Clicks', impressions * ctr) or 0),
+        'cost_per_conversion': ad_spend / conversions if conversions > 0 else 0.0,
+        'ad_spend': ad_spend,
+        'ctr': ctr,
+        'campaign_type': input_dict.get('Campaign Type'),
+        'region': input_dict.get('Region'),
+        'conversions_status': result.get('conversions_status', 'moderate'),
+        'roi_status': result.get('roi_status', 'moderate')
+    }
+
+
+class DashboardFeed:
+    """
+    Broker behind /dashboard/stream.
+
+    Keeps the last DASHBOARD_WINDOW_SIZE hourly points, folds every new prediction into the
+    point of its hour and remembers the last DASHBOARD_EVENT_BUFFER deltas so reconnecting
+    clients can resume from their Last-Event-ID instead of receiving the whole window again.
+
+    The window, the replay ring and the event sequence are fixed-size arrays of JSON slots.
+    When shm_name is set they live in a named shared-memory block (as in SegmentRingBuffer),
+    so every worker on the host publishes into and streams from the same feed and event ids
+    mean the same thing whichever worker a client reconnects to. Clients of other workers
+    notice new events by polling the shared sequence every poll_seconds.
+    """
+
+    def __init__(self, seed_fn, window_size=DASHBOARD_WINDOW_SIZE, buffer_size=DASHBOARD_EVENT_BUFFER,
+                 shm_name=None, poll_seconds=DASHBOARD_POLL_SECONDS):
+        self._seed_fn = seed_fn
+        self._window_size = int(window_size)
+        self._buffer_size = int(buffer_size)
+        self._poll_seconds = poll_seconds
+        window_dtype = np.dtype([('key', 'S16'), ('order', 'i8'), ('count', 'i8'), ('point', f'S{POINT_BYTES}')])
+        events_dtype = np.dtype([('seq', 'i8'), ('payload', f'S{POINT_BYTES + 64}')])
+        header_bytes = len(HEADER_FIELDS) * 8
+        window_bytes = self._window_size * window_dtype.itemsize
+        size = header_bytes + window_bytes + self._buffer_size * events_dtype.itemsize
+
+        self._shm = None
+        if shm_name:
+            from multiprocessing import shared_memory, resource_tracker
+            # The layout is part of the name, so a resized feed never reads an old block
+            name = f"{shm_name}-{self._window_size}-{self._buffer_size}"
+            try:
+                self._shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+            except FileExistsError:
+                self._shm = shared_memory.SharedMemory(name=name)
+            # Otherwise the block is unlinked as soon as any one worker exits
+            resource_tracker.unregister(self._shm._name, 'shared_memory')
+            buffer = self._shm.buf
+            self._lock_path = os.path.join(TEMP_DIR, f"{name}.lock")
+        else:
+            buffer = bytearray(size)
+            self._lock_path = None
+
+        self._header = np.ndarray((len(HEADER_FIELDS),), dtype=np.int64, buffer=buffer)
+        self._window = np.ndarray((self._window_size,), dtype=window_dtype, buffer=buffer, offset=header_bytes)
+        self._events = np.ndarray((self._buffer_size,), dtype=events_dtype, buffer=buffer,
+                                  offset=header_bytes + window_bytes)
+        self._thread_lock = threading.Lock()
+        # Wakes this worker's clients right away; other workers' events are found by polling
+        self._cond = threading.Condition()
+
+    @contextmanager
+    def _locked(self):
+        with self._thread_lock:
+            if self._lock_path is None:
+                yield
+                return
+            import fcntl
+            with open(self._lock_path, 'a') as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _get(self, field):
+        return int(self._header[HEADER_FIELDS.index(field)])
+
+    def _set(self, field, value):
+        self._header[HEADER_FIELDS.index(field)] = value
+
+    def _find(self, key):
+        slots = np.flatnonzero((self._window['order'] > 0) & (self._window['key'] == key.encode()))
+        return int(slots[0]) if len(slots) else None
+
+    def _store(self, slot, key, point, count, order=None):
+        encoded = json.dumps(point).encode()
+        if len(encoded) > POINT_BYTES:
+            raise ValueError(f"Dashboard point is {len(encoded)} bytes; the limit is {POINT_BYTES}")
+        if order is None:
+            order = self._get('order') + 1
+            self._set('order', order)
+        self._window[slot] = (key.encode(), order, count, encoded)
+
+    def _point(self, slot):
+        return json.loads(self._window['point'][slot])
+
+    def _slot_for_new_key(self):
+        """A free window slot, or the slot of the oldest bucket (which is evicted)."""
+        free = np.flatnonzero(self._window['order'] == 0)
+        if len(free):
+            return int(free[0])
+        return int(np.argmin(self._window['order']))
+
+    def _ensure_seeded(self):
+        if self._get('seeded'):
+            return
+        for point in self._seed_fn()[-self._window_size:]:
+            key = bucket_key(point['time'])
+            slot = self._find(key)
+            self._store(self._slot_for_new_key() if slot is None else slot, key, point, count=0)
+        # Event ids carry the epoch so ids from an older feed fall back to a fresh snapshot
+        self._set('epoch', secrets.randbits(32))
+        self._set('seeded', 1)
+
+    @property
+    def epoch(self):
+        with self._locked():
+            self._ensure_seeded()
+            return f"{self._get('epoch'):08x}"
+
+    def event_id(self, seq):
+        return f"{self.epoch}-{seq}"
+
+    def parse_event_id(self, event_id):
+        """Return the sequence number of an event id issued by this feed, or None."""
+        if not event_id:
+            return None
+        epoch, _, seq = str(event_id).rpartition('-')
+        if epoch != self.epoch or not seq.isdigit():
+            return None
+        return int(seq)
+
+    def snapshot(self):
+        """Return (seq, points) for the current window."""
+        with self._locked():
+            self._ensure_seeded()
+            slots = np.flatnonzero(self._window['order'] > 0)
+            slots = slots[np.argsort(self._window['order'][slots])]
+            return self._get('seq'), [self._point(slot) for slot in slots]
+
+    def publish(self, point):
+        """Fold a point into its hourly bucket and notify waiting clients. Returns the event seq."""
+        return self.publish_many([point])
+
+    def publish_many(self, points):
+        """
+        Fold a batch of points (e.g. one upload) into their hourly buckets.
+
+        Points are summed per bucket before the lock is taken, so the lock covers one
+        read-merge-write per touched bucket rather than one per point. Emits one delta per
+        touched bucket, so a large upload does not flood the replay buffer. Returns the last
+        event seq.
+        """
+        batches = OrderedDict()  # key -> [count, sums of AVERAGED_FIELDS, last point]
+        for point in points:
+            batch = batches.setdefault(bucket_key(point['time']), [0, dict.fromkeys(AVERAGED_FIELDS, 0.0), None])
+            batch[0] += 1
+            for field in AVERAGED_FIELDS:
+                batch[1][field] += point[field]
+            batch[2] = point
+
+        with self._locked():
+            self._ensure_seeded()
+            touched = OrderedDict()
+            for key, (added, sums, last) in batches.items():
+                merged = dict(last)
+                slot = self._find(key)
+                count = 0 if slot is None else int(self._window['count'][slot])
+                current = self._point(slot) if count > 0 else None
+                for field in AVERAGED_FIELDS:
+                    previous = current[field] * count if current else 0.0
+                    merged[field] = (previous + sums[field]) / (count + added)
+                if slot is None:
+                    slot = self._slot_for_new_key()
+                    self._store(slot, key, merged, count=added)
+                    touched[key] = ('append', slot, merged)
+                else:
+                    self._store(slot, key, merged, count + added, order=int(self._window['order'][slot]))
+                    touched[key] = ('update', slot, merged)
+            seq = self._get('seq')
+            for key, (op, slot, merged) in touched.items():
+                if self._window['key'][slot] != key.encode():
+                    continue  # evicted again by a newer bucket in the same batch
+                seq += 1
+                payload = json.dumps({'op': op, 'point': merged}).encode()
+                self._events[seq % self._buffer_size] = (seq, payload)
+            self._set('seq', seq)
+        with self._cond:
+            self._cond.notify_all()
+        return seq
+
+    def _events_since(self, seq):
+        current = self._get('seq')
+        if seq > current:
+            return None
+        if seq == current:
+            return []
+        if seq < current - self._buffer_size:
+            return None  # the client fell behind the replay buffer
+        return [(event_seq, json.loads(self._events['payload'][event_seq % self._buffer_size]))
+                for event_seq in range(seq + 1, current + 1)]
+
+    def events_since(self, seq):
+        """Return buffered events newer than seq, or None if seq cannot be resumed."""
+        with self._locked():
+            self._ensure_seeded()
+            return self._events_since(seq)
+
+    def wait_for_events(self, seq, timeout):
+        """
+        Block until events newer than seq exist or the timeout expires.
+
+        Returns:
+            list | None: New (seq, payload) events, an empty list on timeout, or None when
+            seq can no longer be resumed and the client needs a new snapshot.
+        """
+        deadline = time.monotonic() + timeout
+        while self._get('seq') == seq:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            with self._cond:
+                self._cond.wait(min(remaining, self._poll_seconds) if self._shm is not None else remaining)
+        return self.events_since(seq)
+
+    def close(self):
+        if self._shm is not None:
+            # The array views must go before the shared-memory mapping can be closed
+            del self._header, self._window, self._events
+            self._shm.close()
+
+
+def format_sse(data, event=None, event_id=None):
+    """Serialize one server-sent event."""
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    if event:
+        lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data)}")
+    return "\n".join(lines) + "\n\n"
+
+
+def stream_events(feed, last_event_id=None, heartbeat_seconds=DASHBOARD_HEARTBEAT_SECONDS,
+                  max_seconds=DASHBOARD_STREAM_MAX_SECONDS, clock=time.monotonic):
+    """
+    Generate the SSE stream for one dashboard client.
+
+    Sends the window once (or only the missed deltas when last_event_id can be resumed),
+    then pushes new and updated points as they are published, with a heartbeat comment
+    while idle. The stream ends after max_seconds so the worker is released; EventSource
+    reconnects automatically with Last-Event-ID and resumes from the buffered deltas.
+    """
+    deadline = clock() + max_seconds
+
+    yield "retry: 3000\n\n"
+
+    seq = feed.parse_event_id(last_event_id)
+    missed = feed.events_since(seq) if seq is not None else None
+
+    if missed is None:
+        seq, points = feed.snapshot()
+        yield format_sse({'data': points, 'status': 'success'}, event='snapshot', event_id=feed.event_id(seq))
+    else:
+        for event_seq, payload in missed:
+            seq = event_seq
+            yield format_sse(payload, event='point', event_id=feed.event_id(event_seq))
+
+    while clock() < deadline:
+        events = feed.wait_for_events(seq, timeout=min(heartbeat_seconds, max(deadline - clock(), 0)))
+        if events is None:
+            seq, points = feed.snapshot()
+            yield format_sse({'data': points, 'status': 'success'}, event='snapshot', event_id=feed.event_id(seq))
+        elif events:
+            for event_seq, payload in events:
+                seq = event_seq
+                yield format_sse(payload, event='point', event_id=feed.event_id(event_seq))
+        else:
+            yield ": heartbeat\n\n"
@@ -7,4 +7,60 @@ class User(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(80), unique=True, nullable=False)
     email = db.Column(db.String(120), unique=True, nullable=False)
-    password_hash = db.Column(db.String(128), nullable=False)
\ No newline at end of file
+    password_hash = db.Column(db.String(128), nullable=False)
+
+class Job(db.Model):
+    """Background scoring job; workers claim queued rows with SELECT ... FOR UPDATE SKIP LOCKED."""
+    __tablename__ = 'jobs'
+    id = db.Column(db.String(32), primary_key=True)
+    username = db.Column(db.String(80), nullable=False, index=True)
+    kind = db.Column(db.String(32), nullable=False, default='upload_predict')
+    status = db.Column(db.String(16), nullable=False, default='queued', index=True)  # queued, running, succeeded, failed
+    model_type = db.Column(db.String(16), nullable=False, default='both')
+    filename = db.Column(db.String(255))
+    payload = db.Column(db.LargeBinary)
+    progress = db.Column(db.Integer, nullable=False, default=0)
+    total = db.Column(db.Integer, nullable=False, default=0)
+    result = db.Column(db.Text)
+    error = db.Column(db.Text)
+    worker_id = db.Column(db.String(64))
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, nullable=False, index=True)
+    started_at = db.Column(db.DateTime)
+    heartbeat_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+
+class RefreshToken(db.Model):
+    """Server-side record of an issued refresh token so it can be revoked."""
+    __tablename__ = 'refresh_tokens'
+    id = db.Column(db.Integer, primary_key=True)
+    jti = db.Column(db.String(36), unique=True, nullable=False, index=True)
+    username = db.Column(db.String(80), nullable=False, index=True)
+    created_at = db.Column(db.DateTime, nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False)
+    revoked_at = db.Column(db.DateTime)
+
+class PredictionResult(db.Model):
+    """One scored row of an upload; written in bulk by prediction_store.write_results."""
+    __tablename__ = 'prediction_results'
+    id = db.Column(db.BigInteger().with_variant(db.Integer, 'sqlite'), primary_key=True)
+    batch_id = db.Column(db.String(32), nullable=False, index=True)
+    row_index = db.Column(db.Integer, nullable=False)
+    username = db.Column(db.String(80), nullable=False, index=True)
+    model_type = db.Column(db.String(16), nullable=False)
+    conversions = db.Column(db.Float)
+    actual_conversions = db.Column(db.Float)
+    conversions_status = db.Column(db.String(32))
+    roi = db.Column(db.Float)
+    actual_roi = db.Column(db.Float)
+    roi_status = db.Column(db.String(32))
+    created_at = db.Column(db.DateTime, nullable=False)
+
+class PredictionSuggestion(db.Model):
+    """LLM suggestion text for a stored result, keyed by (batch_id, row_index, kind)."""
+    __tablename__ = 'prediction_suggestions'
+    id = db.Column(db.BigInteger().with_variant(db.Integer, 'sqlite'), primary_key=True)
+    batch_id = db.Column(db.String(32), nullable=False, index=True)
+    row_index = db.Column(db.Integer, nullable=False)
+    kind = db.Column(db.String(16), nullable=False)  # conversions or roi
+    suggestion = db.Column(db.Text)
@@ -0,0 +1,424 @@
+"""
+Input drift monitoring with fixed-memory, mergeable sketches.
+
+Every numeric feature gets a histogram over bin edges taken from the reference profile's
+quantiles, plus underflow/overflow bins and a missing counter. Every categorical feature
+gets a counter over the label encoder's classes plus an "unseen" slot for the values
+encode_categorical silently maps to 0. Sketches are plain count arrays: two of them merge
+by addition and memory does not grow with traffic.
+
+Live counts are kept in two generations of DRIFT_WINDOW_ROWS rows, so scores cover the
+last one to two windows. Each feature is scored against the reference with the population
+stability index (PSI): below 0.1 stable, 0.1-0.25 moderate shift, above 0.25 drift.
+
+The reference profile is read from DRIFT_REFERENCE_PATH. Build it from training data with
+    python drift_monitor.py training.csv
+Without one, the first worker to see DRIFT_REFERENCE_ROWS rows builds it under a file lock
+and writes it atomically to DRIFT_REFERENCE_PATH; every other worker loads that file instead
+of building its own. Workers reload the file whenever it changes (checked every
+RELOAD_SECONDS), which also resets their live counts.
+
+The reference is shared, but the live sketches are not: each worker scores only the
+traffic it served, and /metrics/drift says so ('scope': 'worker').
+"""
+import argparse
+import json
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from config import DRIFT_REFERENCE_PATH, DRIFT_REFERENCE_ROWS, DRIFT_WINDOW_ROWS, DRIFT_BINS
+from input_predict import expected_categories, numeric_features
+from logging_setup import get_logger
+
+
+log = get_logger('drift')
+
+PSI_MODERATE = 0.1
+PSI_SIGNIFICANT = 0.25
+
+# Floor for empty bins, so PSI stays finite when a bin is empty on one side
+PSI_EPSILON = 1e-4
+
+# Live rows needed before a PSI is given a status; tiny samples always look drifted
+MIN_SCORED_ROWS = 100
+
+SMALL_FRAME_ROWS = 64
+
+# How often a worker checks whether the shared reference file changed
+RELOAD_SECONDS = 30
+
+
+def known_categories():
+    """Categories the label encoders know, falling back to the validation lists."""
+    import models
+    if models.label_encoders is not None:
+        return {feature: [str(value) for value in models.label_encoders[feature].classes_]
+                for feature in expected_categories if feature in models.label_encoders}
+    return {feature: list(values) for feature, values in expected_categories.items()}
+
+
+def psi(reference, live):
+    """Population stability index between two count or proportion vectors."""
+    reference = np.asarray(reference, dtype=np.float64)
+    live = np.asarray(live, dtype=np.float64)
+    if reference.sum() == 0 or live.sum() == 0:
+        return None
+    p = np.maximum(reference / reference.sum(), PSI_EPSILON)
+    q = np.maximum(live / live.sum(), PSI_EPSILON)
+    return float(np.sum((q - p) * np.log(q / p)))
+
+
+def drift_status(score, rows):
+    if score is None:
+        return 'no data'
+    if rows < MIN_SCORED_ROWS:
+        return 'insufficient data'
+    if score > PSI_SIGNIFICANT:
+        return 'drift'
+    if score > PSI_MODERATE:
+        return 'moderate'
+    return 'stable'
+
+
+def numeric_column(df, feature):
+    """Column as float64; unparseable or absent values become NaN."""
+    if feature not in df:
+        return np.full(len(df), np.nan)
+    column = df[feature]
+    try:
+        return column.to_numpy(dtype=np.float64)
+    except (TypeError, ValueError):
+        return pd.to_numeric(column, errors='coerce').to_numpy(dtype=np.float64)
+
+
+def numeric_sketch(values, edges):
+    """(histogram over len(edges) + 1 bins, missing count, sum, count) for one column."""
+    finite = np.isfinite(values)
+    present = values[finite]
+    counts = np.bincount(np.searchsorted(edges, present, side='right'), minlength=len(edges) + 1)
+    return counts, int((~finite).sum()), float(present.sum()), int(len(present))
+
+
+def categorical_sketch(df, feature, lookup):
+    """Counts per known category ({category: position}), with unseen values in one extra slot."""
+    unseen = len(lookup)
+    if feature not in df:
+        return np.bincount(np.full(len(df), unseen), minlength=unseen + 1)
+    column = df[feature]
+    if len(column) <= SMALL_FRAME_ROWS:
+        # A dict lookup beats pandas' per-call overhead for single predictions
+        codes = np.fromiter((lookup.get(str(value), unseen) for value in column.tolist()), dtype=np.int64, count=len(column))
+    else:
+        codes = pd.Index(list(lookup)).get_indexer(column.astype(str))
+        codes[codes < 0] = unseen
+    return np.bincount(codes, minlength=unseen + 1)
+
+
+def build_reference(df, bins=DRIFT_BINS, categories=None):
+    """Reference profile (JSON-ready) from a frame of training or bootstrap rows."""
+    categories = categories or known_categories()
+    profile = {'rows': int(len(df)), 'created_at': datetime.utcnow().isoformat(), 'numeric': {}, 'categorical': {}}
+    for feature in numeric_features:
+        values = numeric_column(df, feature)
+        present = values[np.isfinite(values)]
+        if len(present) == 0:
+            continue
+        # Interior quantile cut points between the observed min and max; duplicates
+        # (heavy ties) are dropped so every bin has width
+        quantiles = np.quantile(present, np.linspace(0, 1, bins + 1))
+        edges = np.unique(quantiles)
+        counts, missing, total, count = numeric_sketch(values, edges)
+        profile['numeric'][feature] = {
+            'edges': edges.tolist(),
+            'counts': counts.tolist(),
+            'missing': missing,
+            'mean': total / count
+        }
+    for feature, values in categories.items():
+        profile['categorical'][feature] = {
+            'categories': values,
+            'counts': categorical_sketch(df, feature, {value: i for i, value in enumerate(values)}).tolist()
+        }
+    return profile
+
+
+def read_reference(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def write_reference(reference, path, indent=None):
+    """Write a reference atomically: readers see the old file or the new one, never half of one."""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, partial = tempfile.mkstemp(prefix='.drift_reference.', suffix='.tmp', dir=directory)
+    try:
+        os.fchmod(fd, 0o644)
+        with os.fdopen(fd, 'w') as f:
+            json.dump(reference, f, indent=indent)
+        os.replace(partial, path)
+    except Exception:
+        if os.path.exists(partial):
+            os.remove(partial)
+        raise
+
+
+@contextmanager
+def _reference_lock(path):
+    """Serialize bootstrapping of one reference file across worker processes."""
+    import fcntl
+    with open(f'{path}.lock', 'a') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+class DriftMonitor:
+    """
+    Live input sketches scored against a reference profile.
+
+    observe() does the binning outside the lock and only adds count vectors under it, so
+    concurrent requests barely contend. The reference comes from reference_path when one
+    is given; live counts are per-process, so each worker scores its own share of traffic.
+    merge() adds another monitor's live counts (same reference) to this one.
+    """
+
+    def __init__(self, reference=None, window_rows=DRIFT_WINDOW_ROWS, reference_rows=DRIFT_REFERENCE_ROWS,
+                 reference_path=None):
+        self.window_rows = int(window_rows)
+        self.reference_rows = int(reference_rows)
+        self.reference_path = reference_path
+        self.reference = None
+        self._lock = threading.Lock()
+        self._pending = []  # bootstrap rows, until a reference exists
+        self._pending_rows = 0
+        self._reference_mtime = None
+        self._checked_at = 0.0
+        self.observed_rows = 0
+        if reference is not None:
+            self._set_reference(reference)
+
+    @classmethod
+    def from_path(cls, path=DRIFT_REFERENCE_PATH, **kwargs):
+        monitor = cls(reference_path=path, **kwargs)
+        monitor._load_reference()
+        return monitor
+
+    def _load_reference(self):
+        """Load the shared reference file if it is new or changed since the last load; True if loaded."""
+        if not self.reference_path:
+            return False
+        try:
+            mtime = os.path.getmtime(self.reference_path)
+            if mtime == self._reference_mtime:
+                return False
+            reference = read_reference(self.reference_path)
+        except FileNotFoundError:
+            return False
+        except (OSError, ValueError) as e:
+            log.warning(f"⚠️ Could not read drift reference {self.reference_path}: {str(e)}")
+            return False
+        self._set_reference(reference)
+        self._reference_mtime = mtime
+        self._pending, self._pending_rows = [], 0
+        return True
+
+    def _refresh(self):
+        """Pick up a reference another worker (or the CLI) wrote; throttled once a reference is loaded."""
+        now = time.monotonic()
+        if self.reference is not None and now - self._checked_at < RELOAD_SECONDS:
+            return
+        self._checked_at = now
+        with self._lock:
+            if self._load_reference():
+                log.info(f"📐 Drift reference loaded from {self.reference_path}")
+
+    def _set_reference(self, reference):
+        self.reference = reference
+        self.numeric = list(reference['numeric'])
+        self.edges = [np.asarray(reference['numeric'][f]['edges']) for f in self.numeric]
+        self.categorical = list(reference['categorical'])
+        self.categories = [reference['categorical'][f]['categories'] for f in self.categorical]
+        self._lookups = [{value: i for i, value in enumerate(values)} for values in self.categories]
+        # Two generations of live counts; index self._current is filling up
+        self._current = 0
+        self._rows = np.zeros(2, dtype=np.int64)
+        self._numeric_counts = [np.zeros((2, len(edges) + 1), dtype=np.int64) for edges in self.edges]
+        self._missing = np.zeros((2, len(self.numeric)), dtype=np.int64)
+        self._sums = np.zeros((2, len(self.numeric)))
+        self._present = np.zeros((2, len(self.numeric)), dtype=np.int64)
+        self._category_counts = [np.zeros((2, len(values) + 1), dtype=np.int64) for values in self.categories]
+
+    def _bootstrap(self, df):
+        """Collect rows until there are enough to freeze as the reference."""
+        needed = self.reference_rows - self._pending_rows
+        self._pending.append(df.iloc[:needed])
+        self._pending_rows += min(len(df), needed)
+        if self._pending_rows < self.reference_rows:
+            return
+        frame = pd.concat(self._pending, ignore_index=True)
+        if not self.reference_path:
+            self._set_bootstrap_reference(frame)
+            return
+        try:
+            with _reference_lock(self.reference_path):
+                # Another worker may have written it while this one was collecting rows
+                if self._load_reference():
+                    return
+                reference = self._set_bootstrap_reference(frame)
+                write_reference(reference, self.reference_path)
+                self._reference_mtime = os.path.getmtime(self.reference_path)
+        except OSError as e:
+            log.warning(f"⚠️ Could not share drift reference {self.reference_path}: {str(e)}")
+            if self.reference is None:
+                self._set_bootstrap_reference(frame)
+
+    def _set_bootstrap_reference(self, frame):
+        reference = build_reference(frame)
+        reference['source'] = 'bootstrap'
+        self._pending, self._pending_rows = [], 0
+        self._set_reference(reference)
+        log.info(f"📐 Drift reference built from the first {reference['rows']} observed rows")
+        return reference
+
+    def observe(self, df):
+        """Add a frame of model inputs to the live sketches."""
+        if df is None or len(df) == 0:
+            return
+        if self.reference_path:
+            self._refresh()
+        if self.reference is None:
+            with self._lock:
+                if self.reference is None:
+                    self._bootstrap(df)
+                    return
+
+        sketches = [numeric_sketch(numeric_column(df, f), edges) for f, edges in zip(self.numeric, self.edges)]
+        categorical = [categorical_sketch(df, f, lookup) for f, lookup in zip(self.categorical, self._lookups)]
+
+        with self._lock:
+            if self._rows[self._current] >= self.window_rows:
+                self._current ^= 1
+                self._clear(self._current)
+            g = self._current
+            for i, (counts, missing, total, count) in enumerate(sketches):
+                self._numeric_counts[i][g] += counts
+                self._missing[g, i] += missing
+                self._sums[g, i] += total
+                self._present[g, i] += count
+            for i, counts in enumerate(categorical):
+                self._category_counts[i][g] += counts
+            self._rows[g] += len(df)
+            self.observed_rows += len(df)
+
+    def _clear(self, generation):
+        self._rows[generation] = 0
+        self._missing[generation] = 0
+        self._sums[generation] = 0
+        self._present[generation] = 0
+        for counts in self._numeric_counts + self._category_counts:
+            counts[generation] = 0
+
+    def merge(self, other):
+        """Add another monitor's live counts (built on the same reference) into this one."""
+        with self._lock, other._lock:
+            self._rows[self._current] += other._rows.sum()
+            self._missing[self._current] += other._missing.sum(axis=0)
+            self._sums[self._current] += other._sums.sum(axis=0)
+            self._present[self._current] += other._present.sum(axis=0)
+            for mine, theirs in zip(self._numeric_counts + self._category_counts,
+                                    other._numeric_counts + other._category_counts):
+                mine[self._current] += theirs.sum(axis=0)
+            self.observed_rows += other.observed_rows
+
+    def scores(self):
+        """PSI and summary statistics per feature over this worker's live window."""
+        if self.reference_path:
+            self._refresh()
+        if self.reference is None:
+            return {
+                'status': 'collecting reference',
+                'scope': 'worker',
+                'worker_pid': os.getpid(),
+                'reference_rows_collected': self._pending_rows,
+                'reference_rows_needed': self.reference_rows
+            }
+
+        with self._lock:
+            rows = int(self._rows.sum())
+            numeric_counts = [counts.sum(axis=0) for counts in self._numeric_counts]
+            missing = self._missing.sum(axis=0)
+            sums = self._sums.sum(axis=0)
+            present = self._present.sum(axis=0)
+            category_counts = [counts.sum(axis=0) for counts in self._category_counts]
+
+        features = {}
+        for i, feature in enumerate(self.numeric):
+            ref = self.reference['numeric'][feature]
+            live = numeric_counts[i]
+            score = psi(ref['counts'], live)
+            features[feature] = {
+                'type': 'numeric',
+                'psi': score,
+                'status': drift_status(score, rows),
+                'reference_mean': ref['mean'],
+                'live_mean': float(sums[i] / present[i]) if present[i] else None,
+                'out_of_range_share': float((live[0] + live[-1]) / live.sum()) if live.sum() else None,
+                'missing_share': float(missing[i] / rows) if rows else None
+            }
+        for i, feature in enumerate(self.categorical):
+            ref = self.reference['categorical'][feature]
+            live = category_counts[i]
+            score = psi(ref['counts'], live)
+            features[feature] = {
+                'type': 'categorical',
+                'psi': score,
+                'status': drift_status(score, rows),
+                'unseen_share': float(live[-1] / live.sum()) if live.sum() else None,
+                'live_counts': dict(zip(self.categories[i] + ['(unseen)'], live.tolist()))
+            }
+
+        scored = [f for f in features.values() if f['psi'] is not None]
+        worst = max((f['psi'] for f in scored), default=None)
+        return {
+            'status': drift_status(worst, rows),
+            'max_psi': worst,
+            'drifted_features': sorted(name for name, f in features.items() if f['status'] == 'drift'),
+            # Live counts cover only the requests this worker served
+            'scope': 'worker',
+            'worker_pid': os.getpid(),
+            'window_rows': rows,
+            'observed_rows': self.observed_rows,
+            'reference': {
+                'rows': self.reference['rows'],
+                'created_at': self.reference.get('created_at'),
+                'source': self.reference.get('source', 'file')
+            },
+            'features': features
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build the drift reference profile from training data')
+    parser.add_argument('path', help='Training data file (CSV, Excel, Parquet or JSON lines)')
+    parser.add_argument('--output', default=DRIFT_REFERENCE_PATH)
+    parser.add_argument('--bins', type=int, default=DRIFT_BINS)
+    args = parser.parse_args()
+
+    from ingest import read_upload
+    with open(args.path, 'rb') as f:
+        df = read_upload(f, args.path)
+    reference = build_reference(df, bins=args.bins)
+    write_reference(reference, args.output, indent=2)
+    log.info(f"📐 Drift reference with {reference['rows']} rows written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+"""
+Deterministic "why" for each prediction, from the models' own feature contributions.
+
+explain_rows() scores a whole frame at once and returns, per row and per predicted metric,
+`<metric>_contributions` ({feature: effect}) and a one-sentence `<metric>_explanation`.
+An effect is how far that feature moved the prediction away from the model's average
+prediction; the average plus all effects equals the prediction.
+"""
+import numpy as np
+from config import EXPLAIN_TOP_FEATURES
+from models import explain_conversions_batch, explain_roi_batch, predict_conversions_batch
+
+
+METRIC_LABELS = {'conversions': 'conversions', 'roi': 'ROI'}
+
+
+def describe(metric, contributions, average, top=EXPLAIN_TOP_FEATURES):
+    """One sentence naming the features that moved the prediction the most."""
+    label = METRIC_LABELS[metric]
+    drivers = sorted(contributions.items(), key=lambda item: abs(item[1]), reverse=True)[:top]
+    drivers = [(feature, effect) for feature, effect in drivers if abs(effect) >= 0.005]
+    if not drivers:
+        return f"Predicted {label} is close to the model's average of {average:.2f}; no single feature stands out."
+    parts = [f"{feature} {'raised' if effect > 0 else 'lowered'} it by {abs(effect):.2f}" for feature, effect in drivers]
+    joined = parts[0] if len(parts) == 1 else ', '.join(parts[:-1]) + f" and {parts[-1]}"
+    return f"Compared with the model's average {label} of {average:.2f}, {joined}."
+
+
+def _explain_metric(metric, contributions, bias):
+    records = contributions.round(4).to_dict('records')
+    return [{
+        f'{metric}_contributions': row,
+        f'{metric}_explanation': describe(metric, row, float(average))
+    } for row, average in zip(records, bias)]
+
+
+def explain_rows(df, model_type, conversions=None):
+    """
+    Contributions and explanations for every row of df (one batched call per model).
+
+    conversions are the predicted conversions the ROI model takes as input; they are
+    predicted here when not passed in.
+    """
+    explained = [{} for _ in range(len(df))]
+    if model_type in ['conversions', 'both']:
+        for row, extra in zip(explained, _explain_metric('conversions', *explain_conversions_batch(df))):
+            row.update(extra)
+    if model_type in ['roi', 'both']:
+        if conversions is None:
+            conversions = predict_conversions_batch(df)
+        roi_input = df.assign(Conversions=np.asarray(conversions, dtype=np.float64))
+        for row, extra in zip(explained, _explain_metric('roi', *explain_roi_batch(roi_input))):
+            row.update(extra)
+    return explained
+
+
+def average_contributions(results, metric):
+    """Mean effect per feature across result rows that carry contributions, or None."""
+    rows = [row[f'{metric}_contributions'] for row in results
+            if isinstance(row.get(f'{metric}_contributions'), dict)]
+    if not rows:
+        return None
+    features = list(rows[0])
+    means = np.mean([[row.get(feature, 0.0) for feature in features] for row in rows], axis=0)
+    return dict(zip(features, means.tolist()))
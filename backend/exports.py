@@ -0,0 +1,190 @@
+import csv
+import io
+import json
+import queue
+import threading
+from config import TEMP_DIR
+
+
+roi_columns = ['actual_roi', 'roi', 'roi_status', 'roi_explanation', 'roi_suggestions']
+conversions_columns = ['actual_conversions', 'conversions', 'conversions_status', 'conversions_explanation', 'conversions_suggestions']
+
+# Result fields exported as float64 in Parquet; every other field is exported as text
+NUMERIC_COLUMNS = {'roi', 'actual_roi', 'conversions', 'actual_conversions'}
+
+# Nested per-feature contributions do not fit a flat file; their explanation sentence is exported instead
+NESTED_COLUMNS = {'roi_contributions', 'conversions_contributions'}
+
+EXPORT_MIME_TYPES = {
+    'csv': 'text/csv',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    'parquet': 'application/vnd.apache.parquet',
+}
+
+# Rows serialized per chunk yielded to the response
+EXPORT_BATCH_SIZE = 5000
+
+
+def select_columns(rows, model_type):
+    """Columns to export for a model type, in the same order /download_results always used."""
+    if model_type == 'roi':
+        wanted = roi_columns
+    elif model_type == 'conversions':
+        wanted = conversions_columns
+    else:
+        wanted = None
+    seen = {}
+    for row in rows:
+        for key in row:
+            if key not in NESTED_COLUMNS:
+                seen.setdefault(key, None)
+    if wanted is None:
+        return list(seen)
+    return [col for col in wanted if col in seen]
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file object that collects bytes until the generator drains them."""
+
+    def __init__(self):
+        super().__init__()
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+class _QueueSink(io.RawIOBase):
+    """Write-only, non-seekable file object that hands every write to a bounded queue."""
+
+    def __init__(self, chunks, cancelled):
+        super().__init__()
+        self._chunks = chunks
+        self._cancelled = cancelled
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        while True:
+            if self._cancelled.is_set():
+                raise IOError("Export cancelled by client")
+            try:
+                self._chunks.put(bytes(data), timeout=1)
+                return len(data)
+            except queue.Full:
+                continue
+
+
+def iter_csv(rows, columns, batch_size=EXPORT_BATCH_SIZE):
+    """Yield the CSV export a batch of rows at a time."""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=columns, extrasaction='ignore')
+    writer.writeheader()
+    for i, row in enumerate(rows, start=1):
+        writer.writerow(row)
+        if i % batch_size == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def _parquet_schema(columns):
+    """Fixed schema from the known result fields, so no later row can contradict it."""
+    import pyarrow as pa
+    return pa.schema([pa.field(col, pa.float64() if col in NUMERIC_COLUMNS else pa.string()) for col in columns])
+
+
+def _to_float(value):
+    try:
+        return None if value is None or isinstance(value, bool) else float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _to_string(value):
+    if value is None:
+        return None
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, default=str)
+    return str(value)
+
+
+def iter_parquet(rows, columns, batch_size=EXPORT_BATCH_SIZE):
+    """Yield the Parquet export one row group at a time."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    schema = _parquet_schema(columns)
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema, compression='snappy')
+    for start in range(0, len(rows), batch_size):
+        batch = rows[start:start + batch_size]
+        arrays = []
+        for field in schema:
+            convert = _to_float if pa.types.is_floating(field.type) else _to_string
+            arrays.append(pa.array([convert(row.get(field.name)) for row in batch], type=field.type))
+        writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+        yield sink.drain()
+    writer.close()
+    yield sink.drain()
+
+
+def iter_xlsx(rows, columns):
+    """
+    Yield the XLSX export while it is being written.
+
+    xlsxwriter runs in constant-memory mode (rows are flushed as they are written) in a
+    background thread and writes the zip container into a bounded queue, so neither the
+    worksheet nor the finished file is ever held in memory.
+    """
+    import xlsxwriter
+    chunks = queue.Queue(maxsize=16)
+    cancelled = threading.Event()
+    done = object()
+
+    def produce():
+        try:
+            workbook = xlsxwriter.Workbook(_QueueSink(chunks, cancelled), {'constant_memory': True, 'tmpdir': TEMP_DIR})
+            worksheet = workbook.add_worksheet()
+            worksheet.write_row(0, 0, columns)
+            for i, row in enumerate(rows, start=1):
+                worksheet.write_row(i, 0, [row.get(col) for col in columns])
+            workbook.close()
+            chunks.put(done)
+        except Exception as e:
+            chunks.put(e)
+
+    producer = threading.Thread(target=produce, daemon=True)
+    producer.start()
+    try:
+        while True:
+            item = chunks.get()
+            if item is done:
+                break
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        cancelled.set()
+
+
+EXPORT_WRITERS = {
+    'csv': iter_csv,
+    'xlsx': iter_xlsx,
+    'parquet': iter_parquet,
+}
+
+
+def iter_export(rows, columns, file_type):
+    """Pick the streaming writer for a file type (unknown types fall back to CSV)."""
+    return EXPORT_WRITERS.get(file_type, iter_csv)(rows, columns)
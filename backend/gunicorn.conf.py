@@ -0,0 +1,40 @@
+"""
+Gunicorn settings for the Finvix API.
+
+The default worker class is gevent: each worker serves many requests at once, and a
+request waiting on Gemini or PostgreSQL yields instead of holding the whole worker.
+Set GUNICORN_WORKER_CLASS=sync to go back to one request per worker.
+"""
+import os
+import sys
+
+# app.py uses flat imports (from config import ...), so its folder must be importable
+# when the app is loaded as backend.app:app from the repository root
+pythonpath = os.path.dirname(os.path.abspath(__file__))
+
+bind = f"0.0.0.0:{os.getenv('PORT', '5000')}"
+workers = int(os.getenv('WEB_CONCURRENCY', 4))
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'gevent')
+
+# Concurrent requests per gevent worker
+worker_connections = int(os.getenv('GUNICORN_WORKER_CONNECTIONS', 100))
+
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 120))
+graceful_timeout = 30
+keepalive = 5
+
+
+def post_fork(server, worker):
+    # psycopg2 is a C extension, so gevent cannot patch it; psycogreen makes its
+    # socket waits cooperative so database queries yield like HTTP calls do
+    if worker_class == 'gevent':
+        from psycogreen.gevent import patch_psycopg
+        patch_psycopg()
+
+
+def post_worker_init(worker):
+    # Runs after the app is imported and before this worker accepts connections, so
+    # requests never pay for model loading and /health only answers once warmed up.
+    # Go through the module gunicorn loaded (backend.app): `from app import` would
+    # import app.py a second time as a separate module
+    sys.modules[worker.wsgi.import_name].warm_up_worker()
@@ -0,0 +1,129 @@
+import os
+import pandas as pd
+from input_predict import expected_columns, expected_categories
+
+
+# Upload formats accepted by /upload_predict
+SUPPORTED_EXTENSIONS = ('.csv', '.xlsx', '.parquet', '.arrow', '.feather', '.ipc')
+
+categorical_features = list(expected_categories.keys())
+
+
+def get_extension(filename):
+    return os.path.splitext(filename or '')[1].lower()
+
+
+def is_supported(filename):
+    return get_extension(filename) in SUPPORTED_EXTENSIONS
+
+
+def project_columns(df, source_columns=None):
+    """
+    Keep only the expected input columns, in the expected order, with categorical
+    features stored as pandas categoricals. Missing columns are left for validate_file
+    to report.
+
+    The file's own header (source_columns, or df's columns before projection) is kept
+    in df.attrs['source_columns'] so validation can still check column order and
+    unexpected columns.
+    """
+    source_columns = list(df.columns if source_columns is None else source_columns)
+    df = df[[col for col in expected_columns if col in df.columns]]
+    to_category = {
+        feature: 'category' for feature in categorical_features
+        if feature in df.columns and not isinstance(df[feature].dtype, pd.CategoricalDtype)
+    }
+    df = df.astype(to_category) if to_category else df
+    df.attrs['source_columns'] = source_columns
+    return df
+
+
+def _csv_header(source):
+    """Column names from the CSV header row, leaving a stream where it was."""
+    position = source.tell() if hasattr(source, 'seek') else None
+    columns = list(pd.read_csv(source, nrows=0).columns)
+    if position is not None:
+        source.seek(position)
+    return columns
+
+
+def read_csv(source):
+    wanted = set(expected_columns)
+    source_columns = _csv_header(source)
+    df = pd.read_csv(
+        source,
+        usecols=lambda col: col in wanted,
+        dtype={feature: 'category' for feature in categorical_features}
+    )
+    return project_columns(df, source_columns)
+
+
+def read_excel(source):
+    # calamine parses the workbook in Rust and is several times faster than openpyxl;
+    # fall back to openpyxl (read-only mode) when it is not installed.
+    try:
+        df = pd.read_excel(source, engine='calamine')
+    except ImportError:
+        df = pd.read_excel(source, engine='openpyxl')
+    return project_columns(df)
+
+
+def read_parquet(source):
+    import pyarrow.parquet as pq
+    parquet_file = pq.ParquetFile(source)
+    available = set(parquet_file.schema_arrow.names)
+    columns = [col for col in expected_columns if col in available]
+    table = parquet_file.read(columns=columns)
+    return project_columns(_arrow_to_pandas(table), parquet_file.schema_arrow.names)
+
+
+def read_arrow(source):
+    import pyarrow as pa
+    import pyarrow.ipc as ipc
+    if hasattr(source, 'seek'):
+        source.seek(0)
+    try:
+        table = ipc.open_file(source).read_all()
+    except pa.ArrowInvalid:
+        # Not the random-access file format; try the streaming format
+        if hasattr(source, 'seek'):
+            source.seek(0)
+        table = ipc.open_stream(source).read_all()
+    columns = [col for col in expected_columns if col in table.column_names]
+    return project_columns(_arrow_to_pandas(table.select(columns)), table.column_names)
+
+
+def _arrow_to_pandas(table):
+    """Convert an Arrow table, dictionary-encoding string categories so they arrive as categoricals."""
+    import pyarrow as pa
+    for i, field in enumerate(table.schema):
+        if field.name in categorical_features and (pa.types.is_string(field.type) or pa.types.is_large_string(field.type)):
+            table = table.set_column(i, field.name, table.column(i).dictionary_encode())
+    return table.to_pandas()
+
+
+READERS = {
+    '.csv': read_csv,
+    '.xlsx': read_excel,
+    '.parquet': read_parquet,
+    '.arrow': read_arrow,
+    '.feather': read_arrow,
+    '.ipc': read_arrow,
+}
+
+
+def read_upload(source, filename):
+    """
+    Parse an uploaded campaign file into a DataFrame projected to the expected columns.
+
+    Args:
+        source: Path or binary file-like object with the upload contents.
+        filename (str): Original file name; its extension selects the reader.
+
+    Returns:
+        pd.DataFrame: Parsed data with categorical features as categoricals.
+    """
+    extension = get_extension(filename)
+    if extension not in READERS:
+        raise ValueError(f"Unsupported file type '{extension}'. Supported: {', '.join(SUPPORTED_EXTENSIONS)}")
+    return READERS[extension](source)
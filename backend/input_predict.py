@@ -2,6 +2,8 @@ import pandas as pd
 import numpy as np
 from models import predict_conversions, predict_roi, predict_actual_roi, predict_actual_conversions
 from utils import fetch_suggestions
+from explanations import explain_rows
+from config import VALIDATION_MAX_ERRORS, EXPLAIN_PREDICTIONS, LLM_SUGGESTIONS
 import time
 
 expected_columns = [
@@ -22,24 +24,190 @@ numeric_features = [
     'Cost Per Click (CPC)', 'Cost Per Conversion', 'Customer Acquisition Cost (CAC)', 'Seasonality Factor'
 ]
 
+# Allowed (min, max) for numeric features; None means unbounded. Only raw counts and
+# spend are bounded: the rates, costs and seasonality factor are left as they always were
+numeric_ranges = {feature: (0, None) for feature in ('Ad Spend', 'Clicks', 'Impressions')}
+
+
+def compile_schema(columns, categories, numeric, ranges):
+    """
+    Precompute everything validate_frame needs so each upload only runs vectorized checks.
+
+    Returns:
+        dict: Column order/positions, categorical rules as (column, allowed Index) and
+        numeric rules as (column, min, max).
+    """
+    return {
+        'columns': list(columns),
+        'positions': {col: i for i, col in enumerate(columns)},
+        'categorical': [(col, pd.Index(allowed)) for col, allowed in categories.items()],
+        'numeric': [(col, *ranges.get(col, (None, None))) for col in numeric],
+    }
+
+
+VALIDATION_SCHEMA = compile_schema(expected_columns, expected_categories, numeric_features, numeric_ranges)
+
+
+def validate_frame(df, max_errors=VALIDATION_MAX_ERRORS, schema=VALIDATION_SCHEMA):
+    """
+    Check the whole upload against the schema and report every violation.
+
+    Column set and order, categorical membership, numeric types, missing values and
+    numeric ranges are each checked with one vectorized mask per column.
+
+    Args:
+        df (pd.DataFrame): Parsed upload.
+        max_errors (int): Maximum number of individual violations listed in the report.
+
+    Returns:
+        dict: {'valid', 'error_count', 'truncated', 'errors'} where each error has
+        'row' (1-based data row, None for column-level errors), 'column',
+        'column_index', 'rule', 'value' and 'message'.
+    """
+    errors = []
+    counts = {'total': 0}
+    positions = schema['positions']
+
+    def add(rule, column, message, row=None, value=None):
+        counts['total'] += 1
+        if len(errors) < max_errors:
+            errors.append({
+                'row': row,
+                'column': column,
+                'column_index': positions.get(column),
+                'rule': rule,
+                'value': value,
+                'message': message
+            })
+
+    def add_mask(rule, column, mask, series, message):
+        count = int(mask.sum())
+        if not count:
+            return
+        remaining = max(max_errors - len(errors), 0)
+        rows = np.flatnonzero(mask)[:remaining]
+        # Offending values are only materialized for the rows that make it into the report
+        for row, value in zip(rows, series.iloc[rows].astype(object)):
+            value = None if pd.isna(value) else (value.item() if hasattr(value, 'item') else value)
+            errors.append({
+                'row': int(row) + 1,
+                'column': column,
+                'column_index': positions.get(column),
+                'rule': rule,
+                'value': value,
+                'message': message
+            })
+        counts['total'] += count
+
+    # Header rules are checked against the file's own header when the reader projected it
+    present = list(df.attrs.get('source_columns', df.columns))
+    present_set = set(present) & set(df.columns)
+    for col in schema['columns']:
+        if col not in present_set:
+            add('missing_column', col, f"Missing column '{col}'")
+    for col in present:
+        if col not in positions:
+            add('unexpected_column', col, f"Unexpected column '{col}'")
+    if not counts['total'] and present != schema['columns']:
+        add('column_order', None, f"Invalid column order. Expected: {schema['columns']}, Got: {present}")
+
+    for col, allowed in schema['categorical']:
+        if col not in present_set:
+            continue
+        series = df[col]
+        missing = series.isna().to_numpy()
+        add_mask('missing_value', col, missing, series, f"Missing value in {col}")
+        invalid = ~series.isin(allowed).to_numpy() & ~missing
+        add_mask('invalid_category', col, invalid, series, f"Invalid category in {col}. Expected one of: {list(allowed)}")
+
+    for col, low, high in schema['numeric']:
+        if col not in present_set:
+            continue
+        series = df[col]
+        numeric = series if pd.api.types.is_numeric_dtype(series) else pd.to_numeric(series, errors='coerce')
+        missing = series.isna().to_numpy()
+        add_mask('missing_value', col, missing, series, f"Missing value in {col}")
+        not_numeric = numeric.isna().to_numpy() & ~missing
+        add_mask('not_numeric', col, not_numeric, series, f"Non-numeric value in {col}")
+        numbers = numeric.to_numpy(dtype=np.float64, na_value=np.nan)
+        with np.errstate(invalid='ignore'):
+            if low is not None:
+                add_mask('out_of_range', col, numbers < low, series, f"{col} must be >= {low}")
+            if high is not None:
+                add_mask('out_of_range', col, numbers > high, series, f"{col} must be <= {high}")
+
+    return {
+        'valid': counts['total'] == 0,
+        'error_count': counts['total'],
+        'truncated': counts['total'] > len(errors),
+        'errors': errors
+    }
+
+
+def summarize_report(report, limit=3):
+    """One-line summary of a validation report for error messages."""
+    if report['valid']:
+        return None
+    parts = []
+    for error in report['errors'][:limit]:
+        location = f" (row {error['row']})" if error['row'] is not None else ""
+        value = f": {error['value']!r}" if error['value'] is not None else ""
+        parts.append(f"{error['message']}{location}{value}")
+    more = report['error_count'] - len(parts)
+    suffix = f"; and {more} more" if more > 0 else ""
+    return f"{report['error_count']} problem(s) found. " + "; ".join(parts) + suffix
+
+
+def coerce_numeric(df):
+    """Convert numeric columns that arrived as text (and passed validation) to float64."""
+    text = [col for col in numeric_features if col in df.columns and not pd.api.types.is_numeric_dtype(df[col])]
+    if not text:
+        return df
+    return df.assign(**{col: pd.to_numeric(df[col]).astype(np.float64) for col in text})
+
+
 def validate_file(df):
-    if list(df.columns) != expected_columns:
-        return f"Invalid columns. Expected: {expected_columns}, Got: {list(df.columns)}"
-    
-    for feature in ['Campaign Type', 'Region', 'Industry', 'Company Size']:
-        invalid_values = df[feature].apply(lambda x: x not in expected_categories[feature])
-        if invalid_values.any():
-            return f"Invalid category in {feature}: {df[feature][invalid_values].unique()}"
-    
-    for feature in numeric_features:
-        if not pd.api.types.is_numeric_dtype(df[feature]):
-            return f"Non-numeric values in {feature}"
-    
-    return None
+    """Validate an upload and return a summary of its problems, or None if it is valid."""
+    return summarize_report(validate_frame(df))
+
+def deduplicate_rows(df):
+    """
+    Collapse rows with identical values in the expected input columns.
+
+    Rows are keyed by a 64-bit hash of the 13 input columns.
+
+    Returns:
+        tuple: (unique_df, inverse) where unique_df keeps the first occurrence of each
+        distinct row in file order and inverse[i] is the position in unique_df of row i.
+    """
+    columns = [col for col in expected_columns if col in df.columns]
+    keys = pd.util.hash_pandas_object(df[columns], index=False).to_numpy()
+    inverse, _ = pd.factorize(keys)
+    _, first_rows = np.unique(inverse, return_index=True)
+    return df.iloc[first_rows], inverse
+
+
+def process_file(df, model_type, stats=None, on_progress=None):
+    """
+    Score every row of an upload and fetch suggestions for it.
 
-def process_file(df, model_type):
-    results = []
-    for _, row in df.iterrows():
+    Duplicate rows are scored once and their result is shared by every copy, in the
+    original row order. When a stats dict is passed, the number of rows that were
+    skipped this way is stored under 'deduplicated_rows'. on_progress(done, total) is
+    called after each distinct row is scored.
+
+    With EXPLAIN_PREDICTIONS, feature contributions for all distinct rows are computed
+    in one batch up front and added to each result; they also replace the "why" part of
+    the Gemini prompt, or Gemini altogether when LLM_SUGGESTIONS is off.
+    """
+    unique_df, inverse = deduplicate_rows(df)
+    if stats is not None:
+        stats['deduplicated_rows'] = int(len(df) - len(unique_df))
+
+    explanations = explain_rows(unique_df, model_type) if EXPLAIN_PREDICTIONS else None
+
+    unique_results = []
+    for position, (_, row) in enumerate(unique_df.iterrows()):
         input_df = pd.DataFrame([row.to_dict()])
         
         actual_roi = predict_actual_roi(input_df)
@@ -65,18 +233,35 @@ def process_file(df, model_type):
             result['roi_status'] = determine_status(roi_pred, actual_roi)
             result['actual_roi'] = float(actual_roi)
         
-        if model_type in ['conversions', 'both']:
-            conv_prompt = generate_prompt(result, 'conversions', row.to_dict())
-            result['conversions_suggestions'] = fetch_suggestions(conv_prompt)
-            time.sleep(1)
-        if model_type in ['roi', 'both']:
-            roi_prompt = generate_prompt(result, 'roi', row.to_dict())
-            result['roi_suggestions'] = fetch_suggestions(roi_prompt)
-            time.sleep(1)
+        if explanations is not None:
+            result.update(explanations[position])
         
-        results.append(result)
+        add_suggestions(result, model_type, row.to_dict())
+        
+        unique_results.append(result)
+        if on_progress:
+            on_progress(len(unique_results), len(unique_df))
     
-    return results
+    return [unique_results[i] for i in inverse]
+
+def add_suggestions(result, model_type, input_dict, pause=1):
+    """
+    Fill <metric>_suggestions for a scored row: the explanation (when there is one)
+    followed by Gemini's suggestions, or the explanation alone when LLM_SUGGESTIONS is
+    off. Sleeps `pause` seconds after each Gemini call to stay under its rate limit.
+    """
+    for metric in ('conversions', 'roi'):
+        if model_type not in [metric, 'both']:
+            continue
+        explanation = result.get(f'{metric}_explanation')
+        if explanation and not LLM_SUGGESTIONS:
+            result[f'{metric}_suggestions'] = explanation
+            continue
+        suggestions = fetch_suggestions(generate_prompt(result, metric, input_dict))
+        result[f'{metric}_suggestions'] = f"{explanation} {suggestions}" if explanation else suggestions
+        if pause:
+            time.sleep(pause)
+    return result
 
 def determine_status(predicted, actual):
     if actual == 0:
@@ -93,6 +278,16 @@ def generate_prompt(result, metric, input_dict):
     predicted = result[metric]
     actual = result[f'actual_{metric}']
     
+    # With a local explanation Gemini no longer has to guess why; it only adds strategies
+    explanation = result.get(f'{metric}_explanation')
+    if explanation:
+        goal = {'positive': 'sustain or further increase', 'negative': 'improve'}.get(status, 'enhance')
+        return (
+            f"A {input_dict['Campaign Type']} campaign in {input_dict['Region']} targeting the {input_dict['Industry']} industry "
+            f"has predicted {metric} of {predicted:.2f} against actual {metric} of {actual:.2f}. {explanation} "
+            f"Suggest 2 strategies to {goal} {metric}."
+        )
+    
     if status == 'positive':
         return (
             f"Predicted {metric} of {predicted:.2f} exceeds actual {metric} of {actual:.2f} for a {input_dict['Campaign Type']} campaign "
@@ -0,0 +1,223 @@
+import io
+import json
+import os
+import socket
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from flask import current_app
+from database_models import db, Job
+from config import JOB_STALE_SECONDS, JOB_MAX_ATTEMPTS, JOB_PROGRESS_INTERVAL, JOB_HEARTBEAT_INTERVAL
+from ingest import read_upload
+from input_predict import validate_frame, summarize_report, process_file, coerce_numeric
+from prediction_store import persist_results, delete_batch
+from logging_setup import get_logger
+
+
+log = get_logger('jobs')
+
+
+def default_worker_id():
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+def enqueue_upload_job(username, filename, model_type, data, kind='upload_predict'):
+    """
+    Store an uploaded file as a queued scoring job and return the job.
+
+    kind='upload_part' marks one segment of a chunked upload: it is scored the same way,
+    but its results are persisted with the rest of the upload, not on their own.
+    """
+    job = Job(
+        id=uuid.uuid4().hex,
+        username=username,
+        kind=kind,
+        status='queued',
+        model_type=model_type,
+        filename=filename,
+        payload=data,
+        created_at=datetime.utcnow()
+    )
+    db.session.add(job)
+    db.session.commit()
+    return job
+
+
+def get_job(job_id, username):
+    job = db.session.get(Job, job_id)
+    if job is None or job.username != username:
+        return None
+    return job
+
+
+def job_status(job):
+    """Client-facing view of a job (never includes the payload or results)."""
+    return {
+        'job_id': job.id,
+        'status': job.status,
+        'model_type': job.model_type,
+        'filename': job.filename,
+        'progress': job.progress,
+        'total': job.total,
+        'error': job.error,
+        'created_at': job.created_at.isoformat() if job.created_at else None,
+        'started_at': job.started_at.isoformat() if job.started_at else None,
+        'finished_at': job.finished_at.isoformat() if job.finished_at else None
+    }
+
+
+def job_result(job):
+    """Decoded result of a finished job: {'results': [...], 'stats': {...}} or {'validation': ...}."""
+    return json.loads(job.result) if job.result else None
+
+
+def claim_next_job(worker_id):
+    """
+    Atomically move the oldest queued job to running and return it, or None.
+
+    On PostgreSQL the candidate row is locked with FOR UPDATE SKIP LOCKED, so concurrent
+    workers on any node skip each other's rows instead of blocking. Dialects without row
+    locks (SQLite) ignore the clause; the conditional UPDATE below still guarantees that
+    only one worker wins a job.
+    """
+    while True:
+        candidate = (
+            Job.query.filter_by(status='queued')
+            .order_by(Job.created_at)
+            .with_for_update(skip_locked=True)
+            .first()
+        )
+        if candidate is None:
+            db.session.rollback()
+            return None
+        now = datetime.utcnow()
+        claimed = Job.query.filter_by(id=candidate.id, status='queued').update({
+            'status': 'running',
+            'worker_id': worker_id,
+            'attempts': Job.attempts + 1,
+            'started_at': now,
+            'heartbeat_at': now
+        }, synchronize_session=False)
+        db.session.commit()
+        if claimed == 1:
+            return db.session.get(Job, candidate.id, populate_existing=True)
+
+
+def requeue_stale_jobs(now=None):
+    """Return running jobs whose worker stopped heartbeating to the queue (or fail them)."""
+    now = now or datetime.utcnow()
+    cutoff = now - timedelta(seconds=JOB_STALE_SECONDS)
+    stale = Job.query.filter(Job.status == 'running', Job.heartbeat_at < cutoff)
+    failed = stale.filter(Job.attempts >= JOB_MAX_ATTEMPTS).update({
+        'status': 'failed',
+        'error': 'Worker stopped responding',
+        'finished_at': now
+    }, synchronize_session=False)
+    requeued = Job.query.filter(Job.status == 'running', Job.heartbeat_at < cutoff).update({
+        'status': 'queued',
+        'worker_id': None
+    }, synchronize_session=False)
+    db.session.commit()
+    return requeued, failed
+
+
+def _update(job_id, worker_id, attempt, **fields):
+    """
+    Write job fields only while this worker's claim still holds.
+
+    The claim is the worker id plus the attempt number, so a run that was requeued and
+    claimed again (even by the same worker) cannot overwrite the newer attempt.
+    """
+    updated = Job.query.filter_by(id=job_id, worker_id=worker_id, attempts=attempt, status='running').update(
+        fields, synchronize_session=False
+    )
+    db.session.commit()
+    if updated != 1:
+        log.warning(f"⚠️ Job {job_id} attempt {attempt} is no longer held by {worker_id}; "
+                    f"dropped update of {', '.join(fields)}")
+        return False
+    return True
+
+
+class Heartbeat:
+    """
+    Refresh a claimed job's heartbeat from a background thread for as long as it runs.
+
+    Scoring, explanations and persisting can each outlast JOB_STALE_SECONDS without a
+    progress report; the thread keeps the claim alive through all of them. `lost` is set
+    when the claim is gone (the job was requeued or failed as stale).
+    """
+
+    def __init__(self, job_id, worker_id, attempt, interval=JOB_HEARTBEAT_INTERVAL):
+        self._app = current_app._get_current_object()
+        self._claim = (job_id, worker_id, attempt)
+        self._interval = interval
+        self._stop = threading.Event()
+        self.lost = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f'heartbeat-{job_id}', daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        # Its own app context, so the thread gets its own database session
+        with self._app.app_context():
+            while not self._stop.wait(self._interval):
+                try:
+                    if not _update(*self._claim, heartbeat_at=datetime.utcnow()):
+                        self.lost.set()
+                        return
+                except Exception as e:
+                    db.session.rollback()
+                    log.warning(f"⚠️ Heartbeat for job {self._claim[0]} failed: {str(e)}")
+
+
+def run_job(job, worker_id, on_scored=None):
+    """Parse, validate and score a claimed upload job, reporting progress as it goes."""
+    job_id = job.id
+    claim = (job_id, worker_id, job.attempts)
+    with Heartbeat(*claim) as heartbeat:
+        try:
+            df = read_upload(io.BytesIO(job.payload), job.filename)
+            validation = validate_frame(df)
+            if not validation['valid']:
+                _update(*claim, status='failed', finished_at=datetime.utcnow(),
+                        error=f"Validation failed: {summarize_report(validation)}",
+                        result=json.dumps({'validation': validation}))
+                return
+            df = coerce_numeric(df)
+
+            last_report = [0.0]
+
+            def on_progress(done, total):
+                now = time.monotonic()
+                if done == total or now - last_report[0] >= JOB_PROGRESS_INTERVAL:
+                    last_report[0] = now
+                    _update(*claim, progress=done, total=total)
+
+            stats = {}
+            results = process_file(df, job.model_type, stats, on_progress=on_progress)
+            if heartbeat.lost.is_set():
+                log.warning(f"⚠️ Job {job_id} was taken over while scoring; discarding this attempt's results")
+                return
+            if job.kind == 'upload_predict':
+                if job.attempts > 1:
+                    delete_batch(job_id)  # an earlier attempt may have stored part of this job
+                stored = persist_results(job_id, job.username, job.model_type, results)
+                if stored:
+                    stats['stored_rows'] = stored['rows']
+            if not _update(*claim, status='succeeded', finished_at=datetime.utcnow(), payload=None,
+                           result=json.dumps({'results': results, 'stats': stats})):
+                return
+            if on_scored:
+                on_scored(job, df, results)
+        except Exception as e:
+            log.exception(f"❌ Job {job_id} failed: {str(e)}")
+            db.session.rollback()
+            _update(*claim, status='failed', finished_at=datetime.utcnow(), error=str(e))
@@ -0,0 +1,123 @@
+"""
+Structured, level-gated logging for the backend.
+
+Modules log through get_logger('<module>') instead of print(). LOG_LEVEL sets the
+threshold; debug payloads (dtypes, column lists, sample rows) are only built behind
+log.isEnabledFor(logging.DEBUG), so at INFO they cost nothing. LOG_FORMAT=json writes
+one JSON object per line with any `extra=` fields as keys; text keeps the console output
+readable and appends the fields as key=value.
+
+init_request_logging(app) adds one log line for a LOG_REQUEST_SAMPLE_RATE share of
+requests, and always for 5xx responses and requests slower than LOG_SLOW_REQUEST_SECONDS.
+"""
+import json
+import logging
+import random
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from flask import g, request
+from config import LOG_LEVEL, LOG_FORMAT, LOG_REQUEST_SAMPLE_RATE, LOG_SLOW_REQUEST_SECONDS
+
+
+ROOT_LOGGER = 'finvix'
+
+# Attributes every LogRecord has; anything else on a record came from `extra=`
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime', 'taskName'}
+
+_configured = False
+_configure_lock = threading.Lock()
+
+
+def _extra_fields(record):
+    return {key: value for key, value in vars(record).items() if key not in _RECORD_ATTRIBUTES}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record: timestamp, level, logger, message and extra fields."""
+
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            **_extra_fields(record)
+        }
+        if record.exc_info:
+            entry['exc_info'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class TextFormatter(logging.Formatter):
+    """Console format: level, logger and message, then extra fields as key=value."""
+
+    def __init__(self):
+        super().__init__('%(levelname)s %(name)s: %(message)s')
+
+    def format(self, record):
+        text = super().format(record)
+        fields = _extra_fields(record)
+        if fields:
+            text += ' ' + ' '.join(f'{key}={value}' for key, value in fields.items())
+        return text
+
+
+def configure_logging(level=None, fmt=None):
+    """Attach the finvix handler once per process; later calls only change level/format when given."""
+    global _configured
+    with _configure_lock:
+        logger = logging.getLogger(ROOT_LOGGER)
+        if not _configured or fmt is not None:
+            handler = logging.StreamHandler(sys.stdout)
+            handler.setFormatter(JsonFormatter() if (fmt or LOG_FORMAT) == 'json' else TextFormatter())
+            logger.handlers = [handler]
+            logger.propagate = False
+        if not _configured or level is not None:
+            logger.setLevel((level or LOG_LEVEL).upper())
+        _configured = True
+    return logger
+
+
+def get_logger(name):
+    """Logger under the finvix hierarchy, e.g. get_logger('models') -> finvix.models."""
+    if not _configured:
+        configure_logging()
+    return logging.getLogger(f'{ROOT_LOGGER}.{name}')
+
+
+request_log = get_logger('requests')
+
+
+def _start_request_log():
+    g.log_started = time.perf_counter()
+    g.log_sampled = LOG_REQUEST_SAMPLE_RATE > 0 and random.random() < LOG_REQUEST_SAMPLE_RATE
+
+
+def _finish_request_log(response):
+    started = g.pop('log_started', None)
+    if started is None:
+        return response
+    seconds = time.perf_counter() - started
+    slow = LOG_SLOW_REQUEST_SECONDS > 0 and seconds >= LOG_SLOW_REQUEST_SECONDS
+    if not (g.pop('log_sampled', False) or slow or response.status_code >= 500):
+        return response
+
+    level = logging.WARNING if slow or response.status_code >= 500 else logging.INFO
+    request_log.log(level, 'request', extra={
+        'method': request.method,
+        'path': request.path,
+        'endpoint': request.endpoint,
+        'status': response.status_code,
+        'duration_ms': round(seconds * 1000, 1),
+        'bytes': response.calculate_content_length(),
+        'slow': slow
+    })
+    return response
+
+
+def init_request_logging(app):
+    """Install the sampled request log hooks."""
+    app.before_request(_start_request_log)
+    app.after_request(_finish_request_log)
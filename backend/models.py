@@ -1,12 +1,19 @@
 import joblib
+import logging
 import pandas as pd
 import numpy as np
 import os
+import threading
+import time
 import warnings
+from config import EXPLAIN_METHOD
+from logging_setup import get_logger
 
 
 warnings.filterwarnings('ignore')
 
+log = get_logger('models')
+
 
 # Get the base directory
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -23,6 +30,16 @@ MODEL_PATHS = {
 }
 
 
+# Column order the models were trained on; the ROI model also takes predicted Conversions
+MODEL_FEATURES = [
+    'Ad Spend', 'Clicks', 'Impressions', 'Conversion Rate',
+    'Click-Through Rate (CTR)', 'Cost Per Click (CPC)', 'Cost Per Conversion',
+    'Customer Acquisition Cost (CAC)', 'Campaign Type', 'Region', 'Industry',
+    'Company Size', 'Seasonality Factor'
+]
+ROI_MODEL_FEATURES = MODEL_FEATURES + ['Conversions']
+
+
 # Initialize models as None
 roi_model = None
 conv_model = None
@@ -36,52 +53,52 @@ def load_models():
     global roi_model, conv_model, actual_roi_model, actual_conversions_model, label_encoders
     
     try:
-        print(f"📂 Loading models from: {MODELS_DIR}")
+        log.info(f"📂 Loading models from: {MODELS_DIR}")
         
         # Check if models directory exists
         if not os.path.exists(MODELS_DIR):
-            print(f"⚠️ Models directory not found: {MODELS_DIR}")
+            log.warning(f"⚠️ Models directory not found: {MODELS_DIR}")
             return False
         
         # Load ROI model
         if os.path.exists(MODEL_PATHS['roi_model']):
             roi_model = joblib.load(MODEL_PATHS['roi_model'])
-            print("✅ ROI model loaded successfully")
+            log.info("✅ ROI model loaded successfully")
         else:
-            print(f"⚠️ ROI model not found at: {MODEL_PATHS['roi_model']}")
+            log.warning(f"⚠️ ROI model not found at: {MODEL_PATHS['roi_model']}")
         
         # Load Conversions model
         if os.path.exists(MODEL_PATHS['conv_model']):
             conv_model = joblib.load(MODEL_PATHS['conv_model'])
-            print("✅ Conversions model loaded successfully")
+            log.info("✅ Conversions model loaded successfully")
         else:
-            print(f"⚠️ Conversions model not found at: {MODEL_PATHS['conv_model']}")
+            log.warning(f"⚠️ Conversions model not found at: {MODEL_PATHS['conv_model']}")
         
         # Load Actual ROI model
         if os.path.exists(MODEL_PATHS['actual_roi_model']):
             actual_roi_model = joblib.load(MODEL_PATHS['actual_roi_model'])
-            print("✅ Actual ROI model loaded successfully")
+            log.info("✅ Actual ROI model loaded successfully")
         else:
-            print(f"⚠️ Actual ROI model not found at: {MODEL_PATHS['actual_roi_model']}")
+            log.warning(f"⚠️ Actual ROI model not found at: {MODEL_PATHS['actual_roi_model']}")
         
         # Load Actual Conversions model
         if os.path.exists(MODEL_PATHS['actual_conversions_model']):
             actual_conversions_model = joblib.load(MODEL_PATHS['actual_conversions_model'])
-            print("✅ Actual Conversions model loaded successfully")
+            log.info("✅ Actual Conversions model loaded successfully")
         else:
-            print(f"⚠️ Actual Conversions model not found at: {MODEL_PATHS['actual_conversions_model']}")
+            log.warning(f"⚠️ Actual Conversions model not found at: {MODEL_PATHS['actual_conversions_model']}")
         
         # Load Label Encoders
         if os.path.exists(MODEL_PATHS['label_encoders']):
             label_encoders = joblib.load(MODEL_PATHS['label_encoders'])
-            print("✅ Label encoders loaded successfully")
-            print(f"📋 Available encoders: {list(label_encoders.keys())}")
+            log.info("✅ Label encoders loaded successfully")
+            log.info(f"📋 Available encoders: {list(label_encoders.keys())}")
         else:
-            print(f"⚠️ Label encoders not found at: {MODEL_PATHS['label_encoders']}")
+            log.warning(f"⚠️ Label encoders not found at: {MODEL_PATHS['label_encoders']}")
         
         # Verify all models loaded
         if all([roi_model, conv_model, actual_roi_model, actual_conversions_model, label_encoders]):
-            print("✅ All models loaded successfully!")
+            log.info("✅ All models loaded successfully!")
             return True
         else:
             missing = []
@@ -90,18 +107,69 @@ def load_models():
             if not actual_roi_model: missing.append('Actual ROI model')
             if not actual_conversions_model: missing.append('Actual Conversions model')
             if not label_encoders: missing.append('Label encoders')
-            print(f"⚠️ Missing models: {', '.join(missing)}")
+            log.warning(f"⚠️ Missing models: {', '.join(missing)}")
             return False
             
     except Exception as e:
-        print(f"❌ Error loading models: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        log.exception(f"❌ Error loading models: {str(e)}")
         return False
 
 
-# Load models on module import
-load_models()
+# Models are loaded on first use or by warm_up(), not on import, so workers boot quickly
+_load_lock = threading.Lock()
+_load_attempted = False
+
+# Readiness and timings reported by /health
+warmup_state = {
+    'ready': False,
+    'load_seconds': None,
+    'warmup_seconds': None,
+    'error': None
+}
+
+
+def ensure_models_loaded():
+    """Load the model files once per process (thread-safe)."""
+    global _load_attempted
+    if _load_attempted:
+        return
+    with _load_lock:
+        if not _load_attempted:
+            started = time.perf_counter()
+            load_models()
+            warmup_state['load_seconds'] = round(time.perf_counter() - started, 3)
+            _load_attempted = True
+
+
+WARMUP_ROW = {
+    'Ad Spend': 1000.0, 'Clicks': 200.0, 'Impressions': 10000.0, 'Conversion Rate': 0.05,
+    'Click-Through Rate (CTR)': 0.02, 'Cost Per Click (CPC)': 5.0, 'Cost Per Conversion': 50.0,
+    'Customer Acquisition Cost (CAC)': 100.0, 'Campaign Type': 'Search Ads', 'Region': 'North America',
+    'Industry': 'Tech', 'Company Size': 'Small', 'Seasonality Factor': 1.0
+}
+
+
+def warm_up():
+    """
+    Load the models and push one dummy row through each of them.
+
+    The first predict() call of a freshly unpickled model pays for lazy initialization;
+    doing it here means the first real request does not. Sets warmup_state['ready'].
+    """
+    ensure_models_loaded()
+    started = time.perf_counter()
+    try:
+        input_df = pd.DataFrame([WARMUP_ROW])
+        predict_actual_roi(input_df)
+        predict_actual_conversions(input_df)
+        roi_df = input_df.copy()
+        roi_df['Conversions'] = predict_conversions(input_df)
+        predict_roi(roi_df)
+        warmup_state.update(ready=True, error=None)
+    except Exception as e:
+        warmup_state.update(ready=False, error=str(e))
+    warmup_state['warmup_seconds'] = round(time.perf_counter() - started, 3)
+    return warmup_state['ready']
 
 
 def encode_categorical(input_df):
@@ -116,7 +184,7 @@ def encode_categorical(input_df):
         pd.DataFrame: Encoded DataFrame with all features as numeric types.
     """
     if label_encoders is None:
-        print("⚠️ Label encoders not loaded. Cannot encode categorical features.")
+        log.error("⚠️ Label encoders not loaded. Cannot encode categorical features.")
         raise Exception("Label encoders not loaded")
     
     # Create a copy to avoid modifying original
@@ -125,19 +193,24 @@ def encode_categorical(input_df):
     # Define categorical features that need encoding
     categorical_features = ['Campaign Type', 'Region', 'Industry', 'Company Size']
     
-    print(f"🔍 Input DataFrame shape: {df_encoded.shape}")
-    print(f"🔍 Input columns: {df_encoded.columns.tolist()}")
-    print(f"🔍 Input dtypes BEFORE encoding:\n{df_encoded.dtypes}")
+    # Debug payloads are only built when DEBUG is on; this runs for every upload chunk
+    debug = log.isEnabledFor(logging.DEBUG)
+    if debug:
+        log.debug("🔍 Encoding input", extra={
+            'shape': df_encoded.shape,
+            'columns': df_encoded.columns.tolist(),
+            'dtypes': df_encoded.dtypes.astype(str).to_dict()
+        })
     
     # Encode each categorical feature using vectorized operations
     for feature in categorical_features:
         if feature not in df_encoded.columns:
-            print(f"⚠️ Feature '{feature}' not found in DataFrame")
+            log.warning(f"⚠️ Feature '{feature}' not found in DataFrame")
             df_encoded[feature] = 0
             continue
         
         if feature not in label_encoders:
-            print(f"⚠️ No encoder for '{feature}', using 0")
+            log.warning(f"⚠️ No encoder for '{feature}', using 0")
             df_encoded[feature] = 0
             continue
         
@@ -164,12 +237,14 @@ def encode_categorical(input_df):
             # Assign back to dataframe
             df_encoded[feature] = encoded_values
             
-            print(f"✅ Encoded '{feature}': dtype={df_encoded[feature].dtype}, values={df_encoded[feature].tolist()}")
+            if debug:
+                log.debug(f"✅ Encoded '{feature}'", extra={
+                    'dtype': str(df_encoded[feature].dtype),
+                    'sample': df_encoded[feature].head(5).tolist()
+                })
             
         except Exception as e:
-            print(f"❌ Error encoding '{feature}': {str(e)}")
-            import traceback
-            traceback.print_exc()
+            log.exception(f"❌ Error encoding '{feature}': {str(e)}")
             df_encoded[feature] = 0
     
     # Ensure all numeric features are float64
@@ -188,64 +263,63 @@ def encode_categorical(input_df):
     if 'Conversions' in df_encoded.columns:
         df_encoded['Conversions'] = pd.to_numeric(df_encoded['Conversions'], errors='coerce').fillna(0.0).astype(np.float64)
     
-    print(f"🔍 Output dtypes AFTER encoding:\n{df_encoded.dtypes}")
-    
     # Final validation - ensure NO object types remain
     object_cols = df_encoded.select_dtypes(include=['object']).columns.tolist()
     if object_cols:
-        print(f"⚠️ WARNING: Object columns still present: {object_cols}")
+        log.warning(f"⚠️ Object columns still present, converting to 0: {object_cols}")
         for col in object_cols:
-            print(f"   Converting '{col}' to 0")
             df_encoded[col] = 0
     
-    # Final dtype check
-    print(f"✅ Final encoded DataFrame dtypes:\n{df_encoded.dtypes}")
+    if debug:
+        log.debug("✅ Encoded DataFrame", extra={'dtypes': df_encoded.dtypes.astype(str).to_dict()})
     
     return df_encoded
 
 
+def prepare_features(model, input_df):
+    """
+    Encode input for a model: bare XGBoost models expect label-encoded categories,
+    sklearn Pipelines carry their own OneHotEncoder and expect the raw strings.
+    """
+    if hasattr(model, 'named_steps'):
+        return input_df
+    return encode_categorical(input_df)
+
+
 def predict_conversions(input_df):
     """
     Predict conversions using the trained conversions model.
     """
+    ensure_models_loaded()
     if conv_model is None:
         raise Exception("Conversions model not loaded. Please check model files.")
     
     try:
-        print("\n" + "="*50)
-        print("🔮 PREDICT CONVERSIONS")
-        print("="*50)
-        
-        # Encode categorical features
-        encoded_df = encode_categorical(input_df)
+        # Encode categorical features (the pipeline one-hot encodes raw categories itself)
+        encoded_df = prepare_features(conv_model, input_df)
         
         # Ensure correct column order (if model expects specific order)
-        expected_features = [
-            'Ad Spend', 'Clicks', 'Impressions', 'Conversion Rate',
-            'Click-Through Rate (CTR)', 'Cost Per Click (CPC)', 'Cost Per Conversion',
-            'Customer Acquisition Cost (CAC)', 'Campaign Type', 'Region', 'Industry',
-            'Company Size', 'Seasonality Factor'
-        ]
+        expected_features = MODEL_FEATURES
         
         # Reorder columns to match expected features
         encoded_df = encoded_df[expected_features]
         
-        print(f"📊 Final DataFrame shape: {encoded_df.shape}")
-        print(f"📊 Final DataFrame dtypes:\n{encoded_df.dtypes}")
-        print(f"📊 Sample values:\n{encoded_df.iloc[0].to_dict()}")
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug("🔮 Predicting conversions", extra={
+                'shape': encoded_df.shape,
+                'dtypes': encoded_df.dtypes.astype(str).to_dict(),
+                'sample': encoded_df.iloc[0].to_dict()
+            })
         
         # Make prediction
         prediction = conv_model.predict(encoded_df)[0]
         
-        print(f"✅ Prediction successful: {prediction}")
-        print("="*50 + "\n")
+        log.debug("✅ Conversions prediction: %s", prediction)
         
         return float(prediction)
         
     except Exception as e:
-        print(f"❌ Error in predict_conversions: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        log.exception(f"❌ Error in predict_conversions: {str(e)}")
         raise Exception(f"Error predicting conversions: {str(e)}")
 
 
@@ -253,43 +327,35 @@ def predict_roi(input_df):
     """
     Predict ROI using the trained ROI model.
     """
+    ensure_models_loaded()
     if roi_model is None:
         raise Exception("ROI model not loaded. Please check model files.")
     
     try:
-        print("\n" + "="*50)
-        print("🔮 PREDICT ROI")
-        print("="*50)
-        
-        # Encode categorical features
-        encoded_df = encode_categorical(input_df)
+        # Encode categorical features (the pipeline one-hot encodes raw categories itself)
+        encoded_df = prepare_features(roi_model, input_df)
         
         # Expected features for ROI model (includes Conversions)
-        expected_features = [
-            'Ad Spend', 'Clicks', 'Impressions', 'Conversion Rate',
-            'Click-Through Rate (CTR)', 'Cost Per Click (CPC)', 'Cost Per Conversion',
-            'Customer Acquisition Cost (CAC)', 'Campaign Type', 'Region', 'Industry',
-            'Company Size', 'Seasonality Factor', 'Conversions'
-        ]
+        expected_features = ROI_MODEL_FEATURES
         
         # Reorder columns
         encoded_df = encoded_df[expected_features]
         
-        print(f"📊 Final DataFrame shape: {encoded_df.shape}")
-        print(f"📊 Final DataFrame dtypes:\n{encoded_df.dtypes}")
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug("🔮 Predicting ROI", extra={
+                'shape': encoded_df.shape,
+                'dtypes': encoded_df.dtypes.astype(str).to_dict()
+            })
         
         # Make prediction
         prediction = roi_model.predict(encoded_df)[0]
         
-        print(f"✅ Prediction successful: {prediction}")
-        print("="*50 + "\n")
+        log.debug("✅ ROI prediction: %s", prediction)
         
         return float(prediction)
         
     except Exception as e:
-        print(f"❌ Error in predict_roi: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        log.exception(f"❌ Error in predict_roi: {str(e)}")
         raise Exception(f"Error predicting ROI: {str(e)}")
 
 
@@ -297,25 +363,21 @@ def predict_actual_roi(input_df):
     """
     Predict actual ROI using the trained actual ROI model.
     """
+    ensure_models_loaded()
     if actual_roi_model is None:
         raise Exception("Actual ROI model not loaded. Please check model files.")
     
     try:
         encoded_df = encode_categorical(input_df)
         
-        expected_features = [
-            'Ad Spend', 'Clicks', 'Impressions', 'Conversion Rate',
-            'Click-Through Rate (CTR)', 'Cost Per Click (CPC)', 'Cost Per Conversion',
-            'Customer Acquisition Cost (CAC)', 'Campaign Type', 'Region', 'Industry',
-            'Company Size', 'Seasonality Factor'
-        ]
+        expected_features = MODEL_FEATURES
         
         encoded_df = encoded_df[expected_features]
         prediction = actual_roi_model.predict(encoded_df)[0]
         return float(prediction)
         
     except Exception as e:
-        print(f"❌ Error in predict_actual_roi: {str(e)}")
+        log.error(f"❌ Error in predict_actual_roi: {str(e)}")
         raise Exception(f"Error predicting actual ROI: {str(e)}")
 
 
@@ -323,28 +385,117 @@ def predict_actual_conversions(input_df):
     """
     Predict actual conversions using the trained actual conversions model.
     """
+    ensure_models_loaded()
     if actual_conversions_model is None:
         raise Exception("Actual conversions model not loaded. Please check model files.")
     
     try:
         encoded_df = encode_categorical(input_df)
         
-        expected_features = [
-            'Ad Spend', 'Clicks', 'Impressions', 'Conversion Rate',
-            'Click-Through Rate (CTR)', 'Cost Per Click (CPC)', 'Cost Per Conversion',
-            'Customer Acquisition Cost (CAC)', 'Campaign Type', 'Region', 'Industry',
-            'Company Size', 'Seasonality Factor'
-        ]
+        expected_features = MODEL_FEATURES
         
         encoded_df = encoded_df[expected_features]
         prediction = actual_conversions_model.predict(encoded_df)[0]
         return float(prediction)
         
     except Exception as e:
-        print(f"❌ Error in predict_actual_conversions: {str(e)}")
+        log.error(f"❌ Error in predict_actual_conversions: {str(e)}")
         raise Exception(f"Error predicting actual conversions: {str(e)}")
 
 
+def predict_conversions_batch(input_df):
+    """Predicted conversions for every row of input_df, in one model call."""
+    ensure_models_loaded()
+    if conv_model is None:
+        raise Exception("Conversions model not loaded. Please check model files.")
+    encoded_df = prepare_features(conv_model, input_df)[MODEL_FEATURES]
+    return np.asarray(conv_model.predict(encoded_df), dtype=np.float64)
+
+
+def predict_roi_batch(input_df):
+    """Predicted ROI for every row of input_df (which must include Conversions), in one model call."""
+    ensure_models_loaded()
+    if roi_model is None:
+        raise Exception("ROI model not loaded. Please check model files.")
+    encoded_df = prepare_features(roi_model, input_df)[ROI_MODEL_FEATURES]
+    return np.asarray(roi_model.predict(encoded_df), dtype=np.float64)
+
+
+def predict_actual_roi_batch(input_df):
+    """Actual ROI for every row of input_df, in one model call."""
+    ensure_models_loaded()
+    if actual_roi_model is None:
+        raise Exception("Actual ROI model not loaded. Please check model files.")
+    encoded_df = encode_categorical(input_df)[MODEL_FEATURES]
+    return np.asarray(actual_roi_model.predict(encoded_df), dtype=np.float64)
+
+
+def predict_actual_conversions_batch(input_df):
+    """Actual conversions for every row of input_df, in one model call."""
+    ensure_models_loaded()
+    if actual_conversions_model is None:
+        raise Exception("Actual conversions model not loaded. Please check model files.")
+    encoded_df = encode_categorical(input_df)[MODEL_FEATURES]
+    return np.asarray(actual_conversions_model.predict(encoded_df), dtype=np.float64)
+
+
+def _source_feature(column, features):
+    """Input feature a transformed column came from: 'num__Clicks' -> Clicks, 'cat__Region_Asia' -> Region."""
+    name = column.split('__', 1)[-1]
+    if name in features:
+        return name
+    for feature in features:
+        if name.startswith(f"{feature}_"):
+            return feature
+    return name
+
+
+def feature_contributions(model, input_df, features):
+    """
+    Per-feature contributions from XGBoost's native pred_contribs (TreeSHAP, or the
+    faster path-based approximation when EXPLAIN_METHOD is approx).
+
+    Returns (DataFrame of contributions with one column per input feature, bias array);
+    bias + the row sum equals the prediction. For Pipelines the contributions of the
+    one-hot columns of a category are summed back into that category's feature.
+    """
+    import xgboost as xgb
+
+    if hasattr(model, 'named_steps'):
+        preprocessor, regressor = model[:-1], model[-1]
+        matrix = preprocessor.transform(input_df[features])
+        columns = [_source_feature(column, features) for column in preprocessor.get_feature_names_out()]
+    else:
+        regressor = model
+        matrix = encode_categorical(input_df)[features]
+        columns = features
+
+    booster = regressor.get_booster()
+    dmatrix = xgb.DMatrix(matrix, feature_names=booster.feature_names if hasattr(model, 'named_steps') else None)
+    contribs = booster.predict(dmatrix, pred_contribs=True, approx_contribs=EXPLAIN_METHOD == 'approx')
+
+    # Map transformed columns onto input features with one matrix product
+    mapping = np.zeros((len(columns), len(features)))
+    mapping[np.arange(len(columns)), [features.index(column) for column in columns]] = 1.0
+    return pd.DataFrame(contribs[:, :-1] @ mapping, columns=features, index=input_df.index), contribs[:, -1]
+
+
+def explain_conversions_batch(input_df):
+    """Feature contributions to the conversions prediction for every row."""
+    ensure_models_loaded()
+    if conv_model is None:
+        raise Exception("Conversions model not loaded. Please check model files.")
+    return feature_contributions(conv_model, input_df, MODEL_FEATURES)
+
+
+def explain_roi_batch(input_df):
+    """Feature contributions to the ROI prediction for every row (input_df must include Conversions)."""
+    ensure_models_loaded()
+    if roi_model is None:
+        raise Exception("ROI model not loaded. Please check model files.")
+    return feature_contributions(roi_model, input_df, ROI_MODEL_FEATURES)
+
+
 # Utility function to check if models are ready
 def models_ready():
     """Check if all required models are loaded."""
@@ -360,5 +511,9 @@ def get_model_status():
         'actual_roi_model': actual_roi_model is not None,
         'actual_conversions_model': actual_conversions_model is not None,
         'label_encoders': label_encoders is not None,
-        'all_loaded': models_ready()
+        'all_loaded': models_ready(),
+        'ready': warmup_state['ready'],
+        'load_seconds': warmup_state['load_seconds'],
+        'warmup_seconds': warmup_state['warmup_seconds'],
+        'warmup_error': warmup_state['error']
     }
@@ -0,0 +1,316 @@
+"""
+Ad-spend allocation across Campaign Type x Region segments.
+
+Each segment is the base campaign with its Campaign Type and Region swapped in and its Ad
+Spend set to the segment's share of the budget; Clicks and Impressions scale with spend
+(CPC and CTR stay as in the base campaign). Predicted conversions come from the
+conversions model and feed the ROI model, as in /predict. The objective is the predicted
+return, sum(spend * ROI / 100), i.e. the spend-weighted ROI of the whole budget, or total
+predicted conversions with objective='conversions'.
+
+A segment's outcome depends only on its own spend, so the search scores each segment's
+response curve on a spend grid and finds the best split exactly by dynamic programming.
+The grid starts coarse and doubles in resolution until OPTIMIZER_MAX_STEPS or the time
+budget is reached; scored points are memoized process-wide, so a refinement (or a repeat
+request) only scores the spend levels it has not seen yet.
+"""
+import math
+import threading
+import time
+from collections import OrderedDict
+from itertools import product
+import numpy as np
+import pandas as pd
+from config import OPTIMIZER_MAX_SECONDS, OPTIMIZER_MAX_STEPS, OPTIMIZER_BATCH_SIZE, OPTIMIZER_CACHE_SIZE
+from input_predict import expected_categories
+from models import MODEL_FEATURES, predict_conversions_batch, predict_roi_batch
+from scenarios import parse_base
+
+
+INITIAL_STEPS = 8
+SEGMENT_FEATURES = ('Campaign Type', 'Region')
+VOLUME_FEATURES = ('Clicks', 'Impressions')
+
+
+class OptimizationError(ValueError):
+    """Invalid budget, segment or constraint specification."""
+
+
+class EvaluationCache:
+    """Thread-safe LRU memo of (conversions, roi) per scored feature row."""
+
+    def __init__(self, capacity=OPTIMIZER_CACHE_SIZE):
+        self.capacity = capacity
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_many(self, keys):
+        with self._lock:
+            values = []
+            for key in keys:
+                value = self._entries.get(key)
+                if value is not None:
+                    self._entries.move_to_end(key)
+                values.append(value)
+            return values
+
+    def put_many(self, keys, values):
+        with self._lock:
+            for key, value in zip(keys, values):
+                self._entries[key] = value
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.capacity:
+                self._entries.popitem(last=False)
+
+
+evaluation_cache = EvaluationCache()
+
+
+def parse_request(data):
+    budget = data.get('budget')
+    try:
+        budget = float(budget)
+    except (TypeError, ValueError):
+        raise OptimizationError("budget must be a positive number")
+    if not budget > 0 or not math.isfinite(budget):
+        raise OptimizationError("budget must be a positive number")
+
+    objective = data.get('objective', 'roi')
+    if objective not in ('roi', 'conversions'):
+        raise OptimizationError("objective must be 'roi' or 'conversions'")
+
+    try:
+        time_budget = float(data.get('time_budget_seconds', OPTIMIZER_MAX_SECONDS))
+    except (TypeError, ValueError):
+        raise OptimizationError("time_budget_seconds must be a number")
+    time_budget = min(max(time_budget, 0.0), OPTIMIZER_MAX_SECONDS)
+
+    base = parse_base(data)
+    specs = data.get('segments')
+    if specs is None:
+        specs = [dict(zip(SEGMENT_FEATURES, pair))
+                 for pair in product(*(expected_categories[feature] for feature in SEGMENT_FEATURES))]
+    if not isinstance(specs, list) or not specs:
+        raise OptimizationError("segments must be a non-empty list")
+
+    segments, seen = [], set()
+    for spec in specs:
+        if not isinstance(spec, dict):
+            raise OptimizationError("each segment must be an object")
+        key = tuple(spec.get(feature) for feature in SEGMENT_FEATURES)
+        for feature, value in zip(SEGMENT_FEATURES, key):
+            if value not in expected_categories[feature]:
+                raise OptimizationError(f"Invalid category for {feature}: {value}. Expected one of: {expected_categories[feature]}")
+        if key in seen:
+            raise OptimizationError(f"Duplicate segment: {' / '.join(key)}")
+        seen.add(key)
+        try:
+            min_spend = float(spec.get('min_spend', 0))
+            max_spend = float(spec.get('max_spend', budget))
+        except (TypeError, ValueError):
+            raise OptimizationError(f"Invalid spend limits for {' / '.join(key)}")
+        if not 0 <= min_spend <= max_spend:
+            raise OptimizationError(f"Spend limits for {' / '.join(key)} must satisfy 0 <= min_spend <= max_spend")
+        segments.append({'key': key, 'min_spend': min_spend, 'max_spend': min(max_spend, budget)})
+
+    if sum(segment['min_spend'] for segment in segments) > budget + 1e-9:
+        raise OptimizationError("The segments' min_spend add up to more than the budget")
+    if sum(segment['max_spend'] for segment in segments) < budget - 1e-9:
+        raise OptimizationError("The segments' max_spend add up to less than the budget")
+    return base, budget, objective, time_budget, segments
+
+
+def segment_rows(base, key, spends):
+    """Feature rows for one segment at each spend level."""
+    rows = pd.DataFrame({feature: [base[feature]] * len(spends) for feature in MODEL_FEATURES})
+    for feature, value in zip(SEGMENT_FEATURES, key):
+        rows[feature] = value
+    rows['Ad Spend'] = spends
+    if base['Ad Spend'] > 0:
+        ratio = spends / base['Ad Spend']
+        for feature in VOLUME_FEATURES:
+            rows[feature] = base[feature] * ratio
+    return rows
+
+
+def evaluate(rows, deadline=None, cache=evaluation_cache, stats=None):
+    """
+    (conversions, roi) for each row, scoring cache misses in OPTIMIZER_BATCH_SIZE batches.
+
+    Returns None when the deadline passes before every miss has been scored; batches
+    finished by then stay in the cache.
+    """
+    keys = list(rows.itertuples(index=False, name=None))
+    values = cache.get_many(keys)
+    missing = [i for i, value in enumerate(values) if value is None]
+    if stats is not None:
+        stats['cache_hits'] += len(keys) - len(missing)
+
+    for start in range(0, len(missing), OPTIMIZER_BATCH_SIZE):
+        if deadline is not None and time.perf_counter() > deadline:
+            return None
+        batch = missing[start:start + OPTIMIZER_BATCH_SIZE]
+        frame = rows.iloc[batch]
+        conversions = predict_conversions_batch(frame)
+        roi = predict_roi_batch(frame.assign(Conversions=conversions))
+        scored = list(zip(conversions.tolist(), roi.tolist()))
+        cache.put_many([keys[i] for i in batch], scored)
+        for i, value in zip(batch, scored):
+            values[i] = value
+        if stats is not None:
+            stats['evaluations'] += len(batch)
+
+    return np.array(values, dtype=np.float64).reshape(len(keys), 2)
+
+
+def objective_values(spends, outcomes, objective):
+    """Per-level objective; a segment with no spend contributes nothing."""
+    conversions, roi = outcomes[:, 0], outcomes[:, 1]
+    values = conversions if objective == 'conversions' else spends * roi / 100
+    return np.where(spends > 0, values, 0.0)
+
+
+def solve_allocation(values):
+    """
+    Exact multiple-choice knapsack: values[i, k] is segment i's objective with k extra
+    units (-inf where not allowed). Returns units per segment summing to the grid size,
+    or None if no allocation fits.
+    """
+    segments, width = values.shape
+    steps = width - 1
+    t = np.arange(width)[:, None]
+    k = np.arange(width)[None, :]
+    previous_index = t - k
+    valid = previous_index >= 0
+    previous_index = np.where(valid, previous_index, 0)
+
+    best = values[0].copy()
+    choices = []
+    for i in range(1, segments):
+        candidates = np.where(valid, best[previous_index], -np.inf) + values[i][None, :]
+        choice = candidates.argmax(axis=1)
+        choices.append(choice)
+        best = candidates[np.arange(width), choice]
+
+    if not np.isfinite(best[steps]):
+        return None
+    units, remaining = [0] * segments, steps
+    for i in range(segments - 1, 0, -1):
+        units[i] = int(choices[i - 1][remaining])
+        remaining -= units[i]
+    units[0] = remaining
+    return units
+
+
+def optimize_at(base, budget, objective, segments, steps, deadline, stats):
+    """Best allocation on a grid of `steps` units over the budget left after every min_spend."""
+    free = budget - sum(segment['min_spend'] for segment in segments)
+    unit = free / steps if free > 0 else 0.0
+    levels = np.arange(steps + 1)
+
+    # Every segment's spend levels go through the models together, one batch per refinement
+    spends_by_segment, allowed_by_segment, frames = [], [], []
+    for segment in segments:
+        spends = segment['min_spend'] + levels * unit
+        allowed = (levels == 0) if unit == 0 else spends <= segment['max_spend'] + 1e-9
+        spends_by_segment.append(spends)
+        allowed_by_segment.append(allowed)
+        frames.append(segment_rows(base, segment['key'], spends[allowed]))
+    scored = evaluate(pd.concat(frames, ignore_index=True), deadline, stats=stats)
+    if scored is None:
+        return None
+
+    values, outcomes_by_segment, offset = [], [], 0
+    for spends, allowed in zip(spends_by_segment, allowed_by_segment):
+        count = int(allowed.sum())
+        outcomes = scored[offset:offset + count]
+        offset += count
+        full = np.zeros((steps + 1, 2))
+        full[allowed] = outcomes
+        segment_values = np.full(steps + 1, -np.inf)
+        segment_values[allowed] = objective_values(spends[allowed], outcomes, objective)
+        values.append(segment_values)
+        outcomes_by_segment.append(full)
+
+    if unit == 0:
+        units = [0] * len(segments)
+    else:
+        units = solve_allocation(np.array(values))
+        if units is None:
+            return None
+
+    allocation = []
+    for segment, k, spends, outcomes in zip(segments, units, spends_by_segment, outcomes_by_segment):
+        spend = float(spends[k])
+        conversions, roi = (outcomes[k] if spend > 0 else (0.0, 0.0))
+        allocation.append({
+            **dict(zip(SEGMENT_FEATURES, segment['key'])),
+            'spend': round(spend, 2),
+            'share': round(spend / budget, 4),
+            'conversions': float(conversions),
+            'roi': float(roi),
+            'predicted_return': float(spend * roi / 100)
+        })
+    return allocation
+
+
+def summarize(allocation, budget):
+    spend = sum(row['spend'] for row in allocation)
+    predicted_return = sum(row['predicted_return'] for row in allocation)
+    return {
+        'spend': round(spend, 2),
+        'conversions': sum(row['conversions'] for row in allocation),
+        'predicted_return': predicted_return,
+        'roi': predicted_return / budget * 100
+    }
+
+
+def even_split(base, budget, segments):
+    """Outcome of spreading the budget evenly, for comparison (ignores spend limits)."""
+    spend = budget / len(segments)
+    outcomes = evaluate(pd.concat(
+        [segment_rows(base, segment['key'], np.array([spend])) for segment in segments], ignore_index=True
+    ))
+    allocation = [{'spend': spend, 'conversions': float(conversions), 'predicted_return': spend * roi / 100}
+                  for conversions, roi in outcomes]
+    return summarize(allocation, budget)
+
+
+def optimize_budget(data):
+    """Parse an /optimize/budget request and return the best allocation found in time."""
+    base, budget, objective, time_budget, segments = parse_request(data)
+    started = time.perf_counter()
+    deadline = started + time_budget
+    stats = {'evaluations': 0, 'cache_hits': 0}
+
+    best, best_steps, steps = None, None, INITIAL_STEPS
+    while steps <= OPTIMIZER_MAX_STEPS:
+        # The coarsest grid always completes, so there is an answer even with no time budget
+        allocation = optimize_at(base, budget, objective, segments, steps,
+                                 deadline if best is not None else None, stats)
+        if allocation is not None:
+            best, best_steps = allocation, steps
+        elif best is not None:
+            break
+        if time.perf_counter() > deadline:
+            break
+        steps *= 2
+
+    if best is None:
+        raise OptimizationError("No allocation satisfies the spend limits at the finest grid; loosen min_spend/max_spend")
+
+    return {
+        'budget': budget,
+        'objective': objective,
+        'allocation': best,
+        'totals': summarize(best, budget),
+        'even_split': even_split(base, budget, segments),
+        'search': {
+            'steps': best_steps,
+            'step_size': round((budget - sum(s['min_spend'] for s in segments)) / best_steps, 4),
+            'complete': best_steps * 2 > OPTIMIZER_MAX_STEPS,
+            'evaluations': stats['evaluations'],
+            'cache_hits': stats['cache_hits'],
+            'seconds': round(time.perf_counter() - started, 4)
+        }
+    }
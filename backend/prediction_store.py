@@ -0,0 +1,195 @@
+import csv
+import io
+import threading
+import time
+from datetime import datetime
+from database_models import db, PredictionResult, PredictionSuggestion
+from config import PERSIST_RESULTS, RESULT_WRITE_CHUNK_SIZE
+from logging_setup import get_logger
+
+
+log = get_logger('prediction_store')
+
+
+RESULT_COLUMNS = [
+    'batch_id', 'row_index', 'username', 'model_type',
+    'conversions', 'actual_conversions', 'conversions_status',
+    'roi', 'actual_roi', 'roi_status', 'created_at'
+]
+SUGGESTION_COLUMNS = ['batch_id', 'row_index', 'kind', 'suggestion']
+SUGGESTION_KINDS = ('conversions', 'roi')
+
+# COPY marker for NULL, so empty suggestion strings stay empty strings
+COPY_NULL = '\\N'
+
+
+class WriteMetrics:
+    """Running totals for bulk result writes in this process."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.rows = 0
+        self.suggestions = 0
+        self.seconds = 0.0
+        self.last = None
+
+    def record(self, stats):
+        with self._lock:
+            self.batches += 1
+            self.rows += stats['rows']
+            self.suggestions += stats['suggestions']
+            self.seconds += stats['seconds']
+            self.last = stats
+
+    def summary(self):
+        with self._lock:
+            return {
+                'batches': self.batches,
+                'rows': self.rows,
+                'suggestions': self.suggestions,
+                'seconds': round(self.seconds, 4),
+                'rows_per_second': round(self.rows / self.seconds, 1) if self.seconds else None,
+                'last': self.last
+            }
+
+
+write_metrics = WriteMetrics()
+
+
+def _result_rows(batch_id, username, model_type, results, created_at, start_index=0):
+    rows, suggestions = [], []
+    for offset, result in enumerate(results):
+        row_index = start_index + offset
+        rows.append({
+            'batch_id': batch_id,
+            'row_index': row_index,
+            'username': username,
+            'model_type': model_type,
+            'conversions': result.get('conversions'),
+            'actual_conversions': result.get('actual_conversions'),
+            'conversions_status': result.get('conversions_status'),
+            'roi': result.get('roi'),
+            'actual_roi': result.get('actual_roi'),
+            'roi_status': result.get('roi_status'),
+            'created_at': created_at
+        })
+        for kind in SUGGESTION_KINDS:
+            if f'{kind}_suggestions' in result:
+                suggestions.append({
+                    'batch_id': batch_id,
+                    'row_index': row_index,
+                    'kind': kind,
+                    'suggestion': result[f'{kind}_suggestions']
+                })
+    return rows, suggestions
+
+
+def _copy_cursor():
+    """DB-API cursor that supports COPY (psycopg2 on PostgreSQL), or None."""
+    connection = db.session.connection()
+    if connection.dialect.name != 'postgresql':
+        return None
+    cursor = connection.connection.cursor()
+    if not hasattr(cursor, 'copy_expert'):
+        cursor.close()
+        return None
+    return cursor
+
+
+def _copy_rows(cursor, table, columns, rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator='\n')
+    for row in rows:
+        writer.writerow([COPY_NULL if row[c] is None else row[c] for c in columns])
+    buffer.seek(0)
+    cursor.copy_expert(
+        f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv, NULL '{COPY_NULL}')",
+        buffer
+    )
+
+
+def _write_chunk(rows, suggestions):
+    """Insert one chunk with COPY where possible, otherwise one executemany per table."""
+    cursor = _copy_cursor()
+    if cursor is not None:
+        try:
+            _copy_rows(cursor, PredictionResult.__tablename__, RESULT_COLUMNS, rows)
+            if suggestions:
+                _copy_rows(cursor, PredictionSuggestion.__tablename__, SUGGESTION_COLUMNS, suggestions)
+        finally:
+            cursor.close()
+        method = 'copy'
+    else:
+        db.session.execute(PredictionResult.__table__.insert(), rows)
+        if suggestions:
+            db.session.execute(PredictionSuggestion.__table__.insert(), suggestions)
+        method = 'executemany'
+    db.session.commit()
+    return method
+
+
+def write_results(batch_id, username, model_type, results, start_index=0, chunk_size=None):
+    """
+    Bulk-store scored rows and their suggestions, committing once per chunk.
+
+    Uses PostgreSQL COPY when the driver supports it and batched executemany inserts
+    everywhere else. Throughput is added to write_metrics.
+
+    Returns:
+        dict: rows, suggestions, chunks, method, seconds and rows_per_second for this batch.
+    """
+    chunk_size = chunk_size or RESULT_WRITE_CHUNK_SIZE
+    created_at = datetime.utcnow()
+    started = time.perf_counter()
+    written_rows = written_suggestions = chunks = 0
+    method = None
+
+    try:
+        for begin in range(0, len(results), chunk_size):
+            rows, suggestions = _result_rows(
+                batch_id, username, model_type, results[begin:begin + chunk_size],
+                created_at, start_index + begin
+            )
+            method = _write_chunk(rows, suggestions)
+            written_rows += len(rows)
+            written_suggestions += len(suggestions)
+            chunks += 1
+    except Exception:
+        db.session.rollback()
+        raise
+
+    seconds = time.perf_counter() - started
+    stats = {
+        'batch_id': batch_id,
+        'rows': written_rows,
+        'suggestions': written_suggestions,
+        'chunks': chunks,
+        'method': method,
+        'seconds': round(seconds, 4),
+        'rows_per_second': round(written_rows / seconds, 1) if seconds else None
+    }
+    write_metrics.record(stats)
+    return stats
+
+
+def delete_batch(batch_id):
+    """Remove a stored batch, e.g. before a retried job writes it again."""
+    PredictionSuggestion.query.filter_by(batch_id=batch_id).delete(synchronize_session=False)
+    PredictionResult.query.filter_by(batch_id=batch_id).delete(synchronize_session=False)
+    db.session.commit()
+
+
+def persist_results(batch_id, username, model_type, results, start_index=0):
+    """write_results for request and job code paths: a storage failure is logged, never raised."""
+    if not PERSIST_RESULTS or not results:
+        return None
+    try:
+        stats = write_results(batch_id, username, model_type, results, start_index)
+        log.info(f"💾 Stored {stats['rows']} results for {batch_id} via {stats['method']}", extra={
+            'rows': stats['rows'], 'rows_per_second': stats['rows_per_second']
+        })
+        return stats
+    except Exception as e:
+        log.exception(f"❌ Result persistence error: {str(e)}")
+        return None
@@ -0,0 +1,370 @@
+"""
+Opt-in per-request profiling.
+
+A request is profiled when an admin (PROFILE_ADMINS) sends `X-Finvix-Profile: sample`
+or `X-Finvix-Profile: trace`, or when it comes from a user listed in PROFILE_USERS.
+Either setting enables the hooks; reading profiles back (/admin/profiles) needs an admin.
+
+sample - a native thread records the request's stack every PROFILE_SAMPLE_INTERVAL
+         seconds and writes collapsed stacks (<id>.folded), ready for flamegraph.pl,
+         speedscope or inferno
+trace  - cProfile for the whole request, written as pstats (<id>.prof) for snakeviz
+
+Under gevent workers many requests share one OS thread, so the request's greenlet is
+tracked through greenlet switch events: samples come from its own frames, cProfile only
+runs while it is switched in, and cpu_seconds only counts its own run slices. Work it
+hands to native threads with offload() shows up as time waiting in offload().
+
+Streamed responses are profiled until their body has been sent (or the client went
+away), not only until the view returned.
+
+Each profile gets a <id>.json sidecar with the endpoint, user, status and timings.
+At most PROFILE_MAX_FILES profiles are kept; older ones are deleted.
+"""
+import json
+import os
+import sys
+import time
+import uuid
+from collections import Counter
+from datetime import datetime
+from flask import g, request
+from flask_jwt_extended import verify_jwt_in_request, get_jwt_identity
+from concurrency import is_cooperative
+from config import PROFILE_ADMINS, PROFILE_USERS, PROFILE_DIR, PROFILE_MAX_FILES, PROFILE_SAMPLE_INTERVAL
+from logging_setup import get_logger
+
+
+log = get_logger('profiling')
+
+PROFILE_HEADER = 'X-Finvix-Profile'
+PROFILE_MODES = ('sample', 'trace')
+
+
+def _native_thread_api():
+    """start_new_thread/get_ident for real OS threads, even when gevent has patched them."""
+    try:
+        from gevent import monkey
+        return monkey.get_original('_thread', ['start_new_thread', 'get_ident'])
+    except ImportError:
+        import _thread
+        return _thread.start_new_thread, _thread.get_ident
+
+
+class GreenletActivity:
+    """Whether one greenlet is switched in, and the CPU time it has used while it was."""
+
+    def __init__(self, greenlet, on_switch=None):
+        self.greenlet = greenlet
+        self.on_switch = on_switch
+        self.running = True
+        self.switches = 0
+        self.cpu = 0.0
+        self._since = time.thread_time()
+
+    def switched_in(self):
+        self._since = time.thread_time()
+        self.running = True
+        self.switches += 1
+        if self.on_switch:
+            self.on_switch(True)
+
+    def switched_out(self):
+        self.cpu += time.thread_time() - self._since
+        self.running = False
+        self.switches += 1
+        if self.on_switch:
+            self.on_switch(False)
+
+    def cpu_seconds(self):
+        return self.cpu + (time.thread_time() - self._since if self.running else 0.0)
+
+
+# Greenlets being profiled; one process-wide switch hook dispatches to them while any are
+_tracked = {}
+_previous_trace = None
+_trace_installed = False
+
+
+def _switch_trace(event, args):
+    if event in ('switch', 'throw'):
+        origin, target = args
+        activity = _tracked.get(origin)
+        if activity is not None:
+            activity.switched_out()
+        activity = _tracked.get(target)
+        if activity is not None:
+            activity.switched_in()
+    if _previous_trace is not None:
+        _previous_trace(event, args)
+
+
+def track_current_greenlet():
+    """Start following the calling greenlet's switches; returns its GreenletActivity."""
+    global _previous_trace, _trace_installed
+    import greenlet
+    if not _trace_installed:
+        _previous_trace = greenlet.settrace(_switch_trace)
+        _trace_installed = True
+    current = greenlet.getcurrent()
+    activity = GreenletActivity(current)
+    _tracked[current] = activity
+    return activity
+
+
+def untrack(activity):
+    """Stop following a greenlet; the switch hook is removed with the last one."""
+    global _previous_trace, _trace_installed
+    if activity is None:
+        return
+    _tracked.pop(activity.greenlet, None)
+    if _tracked or not _trace_installed:
+        return
+    import greenlet
+    # Only restore when nobody chained a hook after ours; theirs still calls _switch_trace
+    if greenlet.gettrace() is _switch_trace:
+        greenlet.settrace(_previous_trace)
+        _previous_trace, _trace_installed = None, False
+
+
+class StackSampler:
+    """
+    Samples one request's Python stack from a background thread into folded-stack counts.
+
+    With a GreenletActivity the request's greenlet is sampled instead of the whole OS
+    thread: its live frame while it runs, its suspended frame (gr_frame) while it waits.
+    """
+
+    def __init__(self, interval=PROFILE_SAMPLE_INTERVAL, activity=None):
+        self.interval = interval
+        self.activity = activity
+        self.counts = Counter()
+        self.samples = 0
+        self._running = False
+
+    def start(self):
+        start_new_thread, get_ident = _native_thread_api()
+        self._target = get_ident()
+        self._running = True
+        start_new_thread(self._run, ())
+
+    def _frame(self):
+        activity = self.activity
+        if activity is None:
+            return sys._current_frames().get(self._target)
+        if not activity.running:
+            return activity.greenlet.gr_frame
+        switches = activity.switches
+        frame = sys._current_frames().get(self._target)
+        # A switch while the frame was fetched means it may belong to another greenlet
+        if not activity.running or activity.switches != switches:
+            return None
+        return frame
+
+    def _run(self):
+        while self._running:
+            frame = self._frame()
+            if frame is not None:
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                self.counts[';'.join(reversed(stack))] += 1
+                self.samples += 1
+            time.sleep(self.interval)
+
+    def stop(self):
+        self._running = False
+
+    def write(self, path):
+        with open(path, 'w') as f:
+            for stack, count in self.counts.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+class TraceProfiler:
+    """
+    cProfile wrapper with the same start/stop/write interface as StackSampler.
+
+    With a GreenletActivity, profiling is paused whenever the request's greenlet is
+    switched out, so other requests on the same OS thread are not recorded. Frames that
+    span a switch lose their cumulative time; functions that run between switches are exact.
+    """
+
+    def __init__(self, activity=None):
+        import cProfile
+        self.profile = cProfile.Profile()
+        self.samples = None
+        self._stopped = False
+        if activity is not None:
+            activity.on_switch = self._switched
+
+    def _switched(self, running):
+        if self._stopped:
+            return
+        if running:
+            self.profile.enable()
+        else:
+            self.profile.disable()
+
+    def start(self):
+        self.profile.enable()
+
+    def stop(self):
+        self._stopped = True
+        self.profile.disable()
+
+    def write(self, path):
+        self.profile.dump_stats(path)
+
+
+def _requested_mode():
+    """Profiling mode for the current request, or None. Only called when profiling is configured."""
+    header = request.headers.get(PROFILE_HEADER, '').strip().lower()
+    if not header and not PROFILE_USERS:
+        return None, None
+    try:
+        verify_jwt_in_request(optional=True)
+        user = get_jwt_identity()
+    except Exception:
+        return None, None
+    if header and user in PROFILE_ADMINS:
+        return (header if header in PROFILE_MODES else 'sample'), user
+    if user in PROFILE_USERS:
+        return 'sample', user
+    return None, None
+
+
+def start_profile():
+    mode, user = _requested_mode()
+    if mode is None:
+        return
+    activity = track_current_greenlet() if is_cooperative() else None
+    profiler = StackSampler(activity=activity) if mode == 'sample' else TraceProfiler(activity)
+    g.profile = {
+        'id': f"{datetime.utcnow().strftime('%Y%m%dT%H%M%S%f')}-{uuid.uuid4().hex[:8]}",
+        'mode': mode,
+        'user': user,
+        'profiler': profiler,
+        'activity': activity,
+        'wall_started': time.perf_counter(),
+        'cpu_started': time.thread_time()
+    }
+    profiler.start()
+
+
+def finish_profile(response):
+    state = g.pop('profile', None)
+    if state is None:
+        return response
+    # Kept on the state: a streamed body finishes after the request context is gone
+    state.update(endpoint=request.endpoint, method=request.method, path=request.path,
+                 status=response.status_code)
+    response.headers['X-Finvix-Profile-Id'] = state['id']
+    if response.is_streamed and not response.direct_passthrough:
+        response.response = _profiled_body(response.response, state)
+    else:
+        _finish(state)
+    return response
+
+
+def _profiled_body(body, state):
+    """Pass a streamed body through and end the profile once it is exhausted or closed."""
+    try:
+        yield from body
+    finally:
+        if hasattr(body, 'close'):
+            body.close()
+        _finish(state)
+
+
+def _finish(state):
+    state['profiler'].stop()
+    try:
+        write_profile(state)
+    except Exception as e:
+        log.warning(f"⚠️ Could not write profile: {str(e)}")
+    finally:
+        untrack(state['activity'])
+
+
+def stop_profile(error=None):
+    """teardown hook: make sure a sampler never outlives its request."""
+    state = g.pop('profile', None)
+    if state is not None:
+        state['profiler'].stop()
+        untrack(state['activity'])
+
+
+def write_profile(state):
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    profiler = state['profiler']
+    extension = '.folded' if state['mode'] == 'sample' else '.prof'
+    profiler.write(os.path.join(PROFILE_DIR, state['id'] + extension))
+    metadata = {
+        'id': state['id'],
+        'mode': state['mode'],
+        'file': state['id'] + extension,
+        'endpoint': state['endpoint'],
+        'method': state['method'],
+        'path': state['path'],
+        'user': state['user'],
+        'status': state['status'],
+        'wall_seconds': round(time.perf_counter() - state['wall_started'], 4),
+        'cpu_seconds': round(state['activity'].cpu_seconds() if state['activity'] is not None
+                             else time.thread_time() - state['cpu_started'], 4),
+        'samples': profiler.samples,
+        'sample_interval': PROFILE_SAMPLE_INTERVAL if state['mode'] == 'sample' else None,
+        'created_at': datetime.utcnow().isoformat()
+    }
+    with open(os.path.join(PROFILE_DIR, state['id'] + '.json'), 'w') as f:
+        json.dump(metadata, f)
+    prune_profiles()
+
+
+def list_profiles():
+    """Metadata of stored profiles, newest first."""
+    if not os.path.isdir(PROFILE_DIR):
+        return []
+    profiles = []
+    for name in sorted(os.listdir(PROFILE_DIR), reverse=True):
+        if name.endswith('.json'):
+            try:
+                with open(os.path.join(PROFILE_DIR, name)) as f:
+                    profiles.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+    return profiles
+
+
+def profile_path(profile_id):
+    """Path of a stored profile file, or None (ids are checked against the directory listing)."""
+    for profile in list_profiles():
+        if profile['id'] == profile_id:
+            return os.path.join(PROFILE_DIR, profile['file'])
+    return None
+
+
+def prune_profiles():
+    """Keep only the newest PROFILE_MAX_FILES profiles (ids start with their timestamp)."""
+    for profile in list_profiles()[PROFILE_MAX_FILES:]:
+        for name in (profile['file'], profile['id'] + '.json'):
+            try:
+                os.remove(os.path.join(PROFILE_DIR, name))
+            except OSError:
+                pass
+
+
+def init_profiling(app):
+    """Install the profiling hooks, but only when PROFILE_ADMINS or PROFILE_USERS is configured."""
+    if not PROFILE_ADMINS and not PROFILE_USERS:
+        return False
+    app.before_request(start_profile)
+    app.after_request(finish_profile)
+    app.teardown_request(stop_profile)
+    return True
+
+
+def is_profile_admin(username):
+    return username in PROFILE_ADMINS
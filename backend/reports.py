@@ -1,6 +1,4 @@
-import matplotlib
-matplotlib.use('Agg')
-import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
 from reportlab.lib.pagesizes import letter
 from reportlab.lib.units import inch
 from reportlab.platypus import (
@@ -10,7 +8,9 @@ from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib import colors
 from reportlab.pdfgen import canvas
 import os
+import tempfile
 from datetime import datetime
+from config import TEMP_DIR
 
 def get_custom_styles():
     styles = getSampleStyleSheet()
@@ -71,7 +71,88 @@ def add_header_footer(canvas, doc):
     canvas.drawCentredString(doc.pagesize[0] / 2, 0.5 * inch, f"Page {doc.page}")
     canvas.restoreState()
 
-def generate_pdf(filename, dashboard_data, actual_roi, predicted_roi, actual_conversions, predicted_conversions, suggestions, model_type='both', results=None):
+def contributions_table(contributions, model_type, limit=8):
+    """Feature effect table for the report, largest effects first; None when there is nothing to show."""
+    metrics = [metric for metric in ('conversions', 'roi')
+               if model_type in [metric, 'both'] and contributions.get(metric)]
+    if not metrics:
+        return None
+    features = set().union(*(contributions[metric] for metric in metrics))
+    ranked = sorted(features, key=lambda feature: max(abs(contributions[metric].get(feature, 0.0)) for metric in metrics),
+                    reverse=True)[:limit]
+    header = ['Feature'] + [f"Effect on {'ROI' if metric == 'roi' else 'Conversions'}" for metric in metrics]
+    rows = [[feature] + [f"{contributions[metric].get(feature, 0.0):+.2f}" for metric in metrics] for feature in ranked]
+    table = Table([header] + rows, colWidths=[2.6 * inch] + [1.6 * inch] * len(metrics))
+    table.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.darkblue),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+        ('ALIGN', (1, 0), (-1, -1), 'CENTER'),
+        ('GRID', (0, 0), (-1, -1), 1, colors.black),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('BACKGROUND', (0, 1), (-1, -1), colors.lightgrey),
+        ('FONTSIZE', (0, 0), (-1, -1), 10),
+    ]))
+    return table
+
+def save_chart(fig, chart_files):
+    """
+    Write a chart to its own temporary PNG and return the path.
+
+    Charts are drawn on per-call Figure objects (never the global pyplot state) and saved
+    under unique names, so reports generated concurrently cannot touch each other's images.
+    """
+    fd, path = tempfile.mkstemp(prefix='finvix_chart_', suffix='.png', dir=TEMP_DIR)
+    os.close(fd)
+    chart_files.append(path)
+    fig.tight_layout()
+    fig.savefig(path, bbox_inches='tight', dpi=100)
+    return path
+
+
+def comparison_chart(results, actual_field, predicted_field, label, chart_files):
+    fig = Figure(figsize=(6, 3))
+    ax = fig.subplots()
+    actual = [row.get(actual_field, 0) for row in results]
+    predicted = [row.get(predicted_field, 0) for row in results]
+    labels = [f"Row {i+1}" for i in range(len(results))]
+    x = range(len(labels))
+    ax.bar(x, actual, width=0.4, label=f'Actual {label}', color='#1E90FF', align='center')
+    ax.bar([i + 0.4 for i in x], predicted, width=0.4, label=f'Predicted {label}', color='#32CD32', align='center')
+    ax.set_xticks([i + 0.2 for i in x], labels, rotation=45, ha='right')
+    ax.set_title(f'Actual vs Predicted {label}', fontsize=12, fontweight='bold')
+    ax.set_ylabel(label)
+    ax.legend()
+    return save_chart(fig, chart_files)
+
+
+def trend_chart(times, values, label, color, chart_files):
+    fig = Figure(figsize=(6, 3))
+    ax = fig.subplots()
+    ax.plot(times, values, label=label, color=color, linewidth=2, marker='o')
+    ax.set_title(f'{label} Over Time', fontsize=12, fontweight='bold')
+    ax.set_xlabel('Time (HH:MM)', fontsize=10)
+    ax.set_ylabel(label, fontsize=10)
+    ax.legend(loc='upper left', fontsize=8)
+    ax.grid(True, linestyle='--', alpha=0.7)
+    ax.tick_params(axis='x', labelrotation=45, labelsize=8)
+    for tick in ax.get_xticklabels():
+        tick.set_horizontalalignment('right')
+    return save_chart(fig, chart_files)
+
+
+def generate_pdf(filename, dashboard_data, actual_roi, predicted_roi, actual_conversions, predicted_conversions, suggestions, model_type='both', results=None, contributions=None):
+    chart_files = []
+    try:
+        _build_pdf(filename, dashboard_data, actual_roi, predicted_roi, actual_conversions, predicted_conversions,
+                   suggestions, model_type, results, contributions, chart_files)
+    finally:
+        for path in chart_files:
+            if os.path.exists(path):
+                os.remove(path)
+
+
+def _build_pdf(filename, dashboard_data, actual_roi, predicted_roi, actual_conversions, predicted_conversions,
+               suggestions, model_type, results, contributions, chart_files):
     doc = SimpleDocTemplate(filename, pagesize=letter, leftMargin=inch, rightMargin=inch, topMargin=inch, bottomMargin=inch)
     styles = get_custom_styles()
     story = []
@@ -170,39 +251,13 @@ def generate_pdf(filename, dashboard_data, actual_roi, predicted_roi, actual_con
 
         # Visualizations for Uploaded Data
         if model_type in ['roi', 'both']:
-            plt.figure(figsize=(6, 3))
-            actual_rois = [row.get('actual_roi', 0) for row in results]
-            predicted_rois = [row.get('roi', 0) for row in results]
-            labels = [f"Row {i+1}" for i in range(len(results))]
-            x = range(len(labels))
-            plt.bar(x, actual_rois, width=0.4, label='Actual ROI', color='#1E90FF', align='center')
-            plt.bar([i + 0.4 for i in x], predicted_rois, width=0.4, label='Predicted ROI', color='#32CD32', align='center')
-            plt.xticks([i + 0.2 for i in x], labels, rotation=45, ha='right')
-            plt.title('Actual vs Predicted ROI', fontsize=12, fontweight='bold')
-            plt.ylabel('ROI')
-            plt.legend()
-            plt.tight_layout()
-            plt.savefig('roi_upload_chart.png', bbox_inches='tight', dpi=100)
-            plt.close()
-            story.append(Image('roi_upload_chart.png', width=5 * inch, height=2.5 * inch))
+            chart = comparison_chart(results, 'actual_roi', 'roi', 'ROI', chart_files)
+            story.append(Image(chart, width=5 * inch, height=2.5 * inch))
             story.append(Spacer(1, 0.25 * inch))
 
         if model_type in ['conversions', 'both']:
-            plt.figure(figsize=(6, 3))
-            actual_convs = [row.get('actual_conversions', 0) for row in results]
-            predicted_convs = [row.get('conversions', 0) for row in results]
-            labels = [f"Row {i+1}" for i in range(len(results))]
-            x = range(len(labels))
-            plt.bar(x, actual_convs, width=0.4, label='Actual Conversions', color='#1E90FF', align='center')
-            plt.bar([i + 0.4 for i in x], predicted_convs, width=0.4, label='Predicted Conversions', color='#32CD32', align='center')
-            plt.xticks([i + 0.2 for i in x], labels, rotation=45, ha='right')
-            plt.title('Actual vs Predicted Conversions', fontsize=12, fontweight='bold')
-            plt.ylabel('Conversions')
-            plt.legend()
-            plt.tight_layout()
-            plt.savefig('conv_upload_chart.png', bbox_inches='tight', dpi=100)
-            plt.close()
-            story.append(Image('conv_upload_chart.png', width=5 * inch, height=2.5 * inch))
+            chart = comparison_chart(results, 'actual_conversions', 'conversions', 'Conversions', chart_files)
+            story.append(Image(chart, width=5 * inch, height=2.5 * inch))
             story.append(Spacer(1, 0.25 * inch))
 
     # Dashboard Trends
@@ -211,34 +266,26 @@ def generate_pdf(filename, dashboard_data, actual_roi, predicted_roi, actual_con
 
     if model_type in ['roi', 'both']:
         rois = [entry['roi'] for entry in dashboard_data]
-        plt.figure(figsize=(6, 3))
-        plt.plot(times, rois, label='ROI', color='#1E90FF', linewidth=2, marker='o')
-        plt.title('ROI Over Time', fontsize=12, fontweight='bold')
-        plt.xlabel('Time (HH:MM)', fontsize=10)
-        plt.ylabel('ROI', fontsize=10)
-        plt.legend(loc='upper left', fontsize=8)
-        plt.grid(True, linestyle='--', alpha=0.7)
-        plt.xticks(rotation=45, ha='right', fontsize=8)
-        plt.tight_layout()
-        plt.savefig('roi_trend_chart.png', bbox_inches='tight', dpi=100)
-        plt.close()
-        story.append(Image('roi_trend_chart.png', width=5 * inch, height=2.5 * inch))
+        chart = trend_chart(times, rois, 'ROI', '#1E90FF', chart_files)
+        story.append(Image(chart, width=5 * inch, height=2.5 * inch))
         story.append(Spacer(1, 0.25 * inch))
 
     if model_type in ['conversions', 'both']:
         conversions = [entry['conversions'] for entry in dashboard_data]
-        plt.figure(figsize=(6, 3))
-        plt.plot(times, conversions, label='Conversions', color='#32CD32', linewidth=2, marker='o')
-        plt.title('Conversions Over Time', fontsize=12, fontweight='bold')
-        plt.xlabel('Time (HH:MM)', fontsize=10)
-        plt.ylabel('Conversions', fontsize=10)
-        plt.legend(loc='upper left', fontsize=8)
-        plt.grid(True, linestyle='--', alpha=0.7)
-        plt.xticks(rotation=45, ha='right', fontsize=8)
-        plt.tight_layout()
-        plt.savefig('conv_trend_chart.png', bbox_inches='tight', dpi=100)
-        plt.close()
-        story.append(Image('conv_trend_chart.png', width=5 * inch, height=2.5 * inch))
+        chart = trend_chart(times, conversions, 'Conversions', '#32CD32', chart_files)
+        story.append(Image(chart, width=5 * inch, height=2.5 * inch))
+        story.append(Spacer(1, 0.25 * inch))
+
+    # Prediction Drivers (model feature contributions, averaged over rows for uploads)
+    table = contributions_table(contributions or {}, model_type)
+    if table is not None:
+        story.append(Paragraph("Prediction Drivers", styles['SectionTitle']))
+        story.append(Paragraph(
+            "How much each feature moved the prediction away from the model's average prediction"
+            + (" (mean across all rows)." if results else "."),
+            styles['CustomBodyText']
+        ))
+        story.append(KeepTogether(table))
         story.append(Spacer(1, 0.25 * inch))
 
     # Suggestions
@@ -251,7 +298,3 @@ def generate_pdf(filename, dashboard_data, actual_roi, predicted_roi, actual_con
                 story.append(Paragraph(f"• {suggestion}", styles['Suggestion']))
 
     doc.build(story, onFirstPage=add_header_footer, onLaterPages=add_header_footer)
-
-    for file in ['roi_upload_chart.png', 'conv_upload_chart.png', 'roi_trend_chart.png', 'conv_trend_chart.png']:
-        if os.path.exists(file):
-            os.remove(file)
\ No newline at end of file
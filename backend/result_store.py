@@ -0,0 +1,165 @@
+"""
+Server-side copies of batch prediction results, referenced by result id.
+
+After /upload_predict the client gets a result_id and can page through the results or
+ask for a report or export by id, instead of posting every row (suggestion text and
+all) back to the server. Each batch is one zstd-compressed Parquet file in
+RESULT_STORE_DIR, written in row groups of ROW_GROUP_SIZE so a page only decodes the row
+groups it overlaps. Owner and model type are kept in the file's metadata. Nested
+contributions become struct columns and read back as dicts.
+
+Files expire RESULT_STORE_TTL_SECONDS after they are written: expired files are purged
+whenever a new batch is stored and are treated as missing when read.
+"""
+import os
+import time
+import uuid
+from datetime import datetime, timezone
+from config import RESULT_STORE, RESULT_STORE_DIR, RESULT_STORE_TTL_SECONDS
+from serializers import to_columnar
+from logging_setup import get_logger
+
+
+log = get_logger('result_store')
+
+ROW_GROUP_SIZE = 1000
+
+
+class ResultStoreError(Exception):
+    """Result lookup failure that maps to an HTTP status code."""
+
+    def __init__(self, message, status_code=400):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def _result_path(result_id):
+    # result ids are uuid4 hex strings; anything else could escape the store directory
+    if not result_id or not isinstance(result_id, str) or len(result_id) != 32 \
+            or not all(c in '0123456789abcdef' for c in result_id):
+        raise ResultStoreError('Result not found or expired', 404)
+    return os.path.join(RESULT_STORE_DIR, f'{result_id}.parquet')
+
+
+def _expires_at(path):
+    return os.path.getmtime(path) + RESULT_STORE_TTL_SECONDS
+
+
+def _isoformat(timestamp):
+    return datetime.fromtimestamp(timestamp, timezone.utc).isoformat(timespec='seconds')
+
+
+def purge_expired(now=None):
+    """Remove stored results older than RESULT_STORE_TTL_SECONDS."""
+    now = now or time.time()
+    if not os.path.isdir(RESULT_STORE_DIR):
+        return 0
+    removed = 0
+    for name in os.listdir(RESULT_STORE_DIR):
+        path = os.path.join(RESULT_STORE_DIR, name)
+        try:
+            if now > _expires_at(path):
+                os.remove(path)
+                removed += 1
+        except OSError:
+            continue
+    return removed
+
+
+def store_results(result_id, owner, model_type, results):
+    """Write results as one Parquet file; returns the stored batch's info."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    purge_expired()
+    os.makedirs(RESULT_STORE_DIR, exist_ok=True)
+    path = _result_path(result_id)
+    table = pa.Table.from_pydict(to_columnar(results)).replace_schema_metadata({
+        'owner': owner,
+        'model_type': model_type
+    })
+    # Written under a temporary name and renamed, so readers never see a partial file
+    partial = f'{path}.{uuid.uuid4().hex}.tmp'
+    try:
+        pq.write_table(table, partial, compression='zstd', row_group_size=ROW_GROUP_SIZE)
+        os.replace(partial, path)
+    except Exception:
+        if os.path.exists(partial):
+            os.remove(partial)
+        raise
+    return {
+        'result_id': result_id,
+        'rows': len(results),
+        'expires_at': _isoformat(_expires_at(path))
+    }
+
+
+def save_results(result_id, owner, model_type, results):
+    """store_results for request and job code paths: a storage failure is logged, never raised."""
+    if not RESULT_STORE or not results:
+        return None
+    try:
+        return store_results(result_id, owner, model_type, results)
+    except Exception as e:
+        log.exception(f"❌ Result store error: {str(e)}")
+        return None
+
+
+def _open(result_id, owner):
+    import pyarrow.parquet as pq
+    path = _result_path(result_id)
+    try:
+        if time.time() > _expires_at(path):
+            raise ResultStoreError('Result not found or expired', 404)
+        parquet = pq.ParquetFile(path)
+    except OSError:
+        raise ResultStoreError('Result not found or expired', 404)
+    metadata = parquet.schema_arrow.metadata or {}
+    if metadata.get(b'owner', b'').decode() != owner:
+        raise ResultStoreError('Result not found or expired', 404)
+    info = {
+        'result_id': result_id,
+        'model_type': metadata.get(b'model_type', b'both').decode(),
+        'total': parquet.metadata.num_rows,
+        'expires_at': _isoformat(_expires_at(path))
+    }
+    return parquet, info
+
+
+def result_exists(result_id, owner):
+    try:
+        _open(result_id, owner)
+        return True
+    except ResultStoreError:
+        return False
+
+
+def _rows(table):
+    # Every row has every column; a field that was None (or missing) reads back as null
+    return table.to_pylist()
+
+
+def load_results(result_id, owner, offset=0, limit=None):
+    """
+    (results, info) for a stored batch, or one page of it.
+
+    Only the row groups that overlap [offset, offset + limit) are read.
+    """
+    import pyarrow as pa
+    parquet, info = _open(result_id, owner)
+    total = info['total']
+    offset = min(max(int(offset), 0), total)
+    end = total if limit is None else min(offset + max(int(limit), 0), total)
+    if offset == 0 and end == total:
+        return _rows(parquet.read()), info
+    if end <= offset:
+        return [], info
+
+    groups, starts, position = [], [], 0
+    for group in range(parquet.num_row_groups):
+        rows = parquet.metadata.row_group(group).num_rows
+        if position < end and position + rows > offset:
+            groups.append(group)
+            starts.append(position)
+        position += rows
+    table = parquet.read_row_groups(groups) if groups else pa.table({})
+    return _rows(table.slice(offset - starts[0], end - offset)), info
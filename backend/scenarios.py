@@ -0,0 +1,185 @@
+"""
+What-if sweeps: score a grid of variations of one campaign in a single batch.
+
+A request names a base campaign and, per swept feature, the values to try:
+
+    numeric      [500, 1000, 2000]                   explicit values
+                 {"min": 500, "max": 5000, "steps": 10}  evenly spaced values
+                 {"scale": [0.5, 1, 2]}              multiples of the base value
+    categorical  ["Email", "Search Ads"]             explicit categories
+                 "all"                               every known category
+
+Every combination is built as one DataFrame and each model is called once for the whole
+grid. Features that are not swept keep their base value. No suggestions are fetched.
+"""
+import math
+import numpy as np
+import pandas as pd
+from config import SCENARIO_MAX_ROWS
+from input_predict import expected_columns, expected_categories, numeric_features
+from models import (
+    predict_conversions_batch, predict_roi_batch, predict_actual_roi_batch, predict_actual_conversions_batch
+)
+
+
+MAX_STEPS = 1000
+
+
+class ScenarioError(ValueError):
+    """Invalid base campaign or sweep specification."""
+
+
+def parse_base(data):
+    """Base campaign from a /predict style 'input' list or a 'base' dict keyed by feature."""
+    if isinstance(data.get('base'), dict):
+        base = dict(data['base'])
+        missing = [feature for feature in expected_columns if feature not in base]
+        if missing:
+            raise ScenarioError(f"Missing base features: {', '.join(missing)}")
+    elif isinstance(data.get('input'), list):
+        if len(data['input']) != len(expected_columns):
+            raise ScenarioError(f"Expected {len(expected_columns)} features, got {len(data['input'])}")
+        base = dict(zip(expected_columns, data['input']))
+    else:
+        raise ScenarioError("Missing base campaign: send 'base' (object) or 'input' (list)")
+
+    for feature, categories in expected_categories.items():
+        if base[feature] not in categories:
+            raise ScenarioError(f"Invalid category for {feature}: {base[feature]}. Expected one of: {categories}")
+    for feature in numeric_features:
+        try:
+            base[feature] = float(base[feature])
+        except (TypeError, ValueError):
+            raise ScenarioError(f"Invalid numeric value for {feature}")
+    return {feature: base[feature] for feature in expected_columns}
+
+
+def _numeric_values(feature, spec, base_value):
+    if isinstance(spec, dict) and 'scale' in spec:
+        values = np.asarray(spec['scale'], dtype=np.float64) * base_value
+    elif isinstance(spec, dict) and 'min' in spec and 'max' in spec:
+        steps = int(spec.get('steps', 10))
+        if not 2 <= steps <= MAX_STEPS:
+            raise ScenarioError(f"{feature}: steps must be between 2 and {MAX_STEPS}")
+        values = np.linspace(float(spec['min']), float(spec['max']), steps)
+    else:
+        values = np.asarray(spec.get('values') if isinstance(spec, dict) else spec, dtype=np.float64)
+    if values.ndim != 1 or len(values) == 0:
+        raise ScenarioError(f"{feature}: expected a non-empty list of values")
+    if len(values) > MAX_STEPS:
+        raise ScenarioError(f"{feature}: at most {MAX_STEPS} values can be swept")
+    if not np.isfinite(values).all() or (values < 0).any():
+        raise ScenarioError(f"{feature}: values must be finite and non-negative")
+    return values
+
+
+def _categorical_values(feature, spec):
+    if spec == 'all':
+        return list(expected_categories[feature])
+    values = spec.get('values') if isinstance(spec, dict) else spec
+    if not isinstance(values, list) or not values:
+        raise ScenarioError(f"{feature}: expected a non-empty list of categories or \"all\"")
+    if len(values) > MAX_STEPS:
+        raise ScenarioError(f"{feature}: at most {MAX_STEPS} values can be swept")
+    invalid = [value for value in values if value not in expected_categories[feature]]
+    if invalid:
+        raise ScenarioError(f"Invalid category for {feature}: {invalid}. Expected one of: {expected_categories[feature]}")
+    return values
+
+
+def parse_sweep(sweep, base):
+    """{feature: values} for each swept feature, in request order."""
+    if not isinstance(sweep, dict) or not sweep:
+        raise ScenarioError("Missing sweep: send an object mapping features to values")
+    grid = {}
+    for feature, spec in sweep.items():
+        if feature in expected_categories:
+            grid[feature] = _categorical_values(feature, spec)
+        elif feature in numeric_features:
+            try:
+                grid[feature] = _numeric_values(feature, spec, base[feature])
+            except ScenarioError:
+                raise
+            except (TypeError, ValueError):
+                raise ScenarioError(f"{feature}: values must be numbers")
+        else:
+            raise ScenarioError(f"Unknown feature to sweep: {feature}")
+
+    # Python ints: a numpy product would wrap around past int64 and slip under the cap
+    total = math.prod(len(values) for values in grid.values())
+    if total > SCENARIO_MAX_ROWS:
+        raise ScenarioError(f"Sweep has {total} scenarios; the maximum is {SCENARIO_MAX_ROWS}")
+    return grid
+
+
+def build_scenarios(base, grid):
+    """Cartesian product of the grid, with every other feature set to its base value."""
+    swept = pd.MultiIndex.from_product(list(grid.values()), names=list(grid)).to_frame(index=False)
+    for feature in expected_columns:
+        if feature not in grid:
+            swept[feature] = base[feature]
+    return swept[expected_columns]
+
+
+def status_array(predicted, actual):
+    """Vectorized determine_status: positive/negative beyond a 5% relative difference."""
+    relative = np.divide(predicted - actual, np.abs(actual), out=np.zeros_like(predicted), where=actual != 0)
+    return np.select([actual == 0, relative > 0.05, relative < -0.05], ['moderate', 'positive', 'negative'], 'moderate')
+
+
+def score_scenarios(scenarios, model_type):
+    """One batched call per model for the whole grid; returns {column: numpy array}."""
+    actual_roi = predict_actual_roi_batch(scenarios)
+    actual_conversions = predict_actual_conversions_batch(scenarios)
+    conversions = predict_conversions_batch(scenarios)
+
+    scores = {}
+    if model_type in ['conversions', 'both']:
+        scores['conversions'] = conversions
+        scores['actual_conversions'] = actual_conversions
+        scores['conversions_status'] = status_array(conversions, actual_conversions)
+    if model_type in ['roi', 'both']:
+        roi = predict_roi_batch(scenarios.assign(Conversions=conversions))
+        scores['roi'] = roi
+        scores['actual_roi'] = actual_roi
+        scores['roi_status'] = status_array(roi, actual_roi)
+    return scores
+
+
+def run_sweep(data):
+    """
+    Parse, build and score a sweep request.
+
+    Returns the base campaign's scores, the swept feature values and predictions as
+    columns (one entry per scenario), and the best scenario for each predicted metric.
+    """
+    model_type = data.get('model_type', 'both')
+    if model_type not in ('conversions', 'roi', 'both'):
+        raise ScenarioError("model_type must be 'conversions', 'roi' or 'both'")
+    base = parse_base(data)
+    grid = parse_sweep(data.get('sweep'), base)
+    scenarios = build_scenarios(base, grid)
+
+    # The base campaign is scored as one extra row in the same batch
+    scores = score_scenarios(pd.concat([scenarios, pd.DataFrame([base])], ignore_index=True), model_type)
+
+    columns = {feature: scenarios[feature].tolist() for feature in grid}
+    columns.update({name: values[:-1].tolist() for name, values in scores.items()})
+    best = {}
+    for metric in ('conversions', 'roi'):
+        if metric in scores:
+            index = int(np.argmax(scores[metric][:-1]))
+            best[metric] = {
+                'index': index,
+                'value': float(scores[metric][index]),
+                'scenario': {feature: columns[feature][index] for feature in grid}
+            }
+
+    return {
+        'model_type': model_type,
+        'swept': list(grid),
+        'scenario_count': len(scenarios),
+        'base': {name: values[-1].item() for name, values in scores.items()},
+        'best': best,
+        'columns': columns
+    }
@@ -0,0 +1,165 @@
+import os
+import threading
+from contextlib import contextmanager
+import numpy as np
+from config import SEGMENT_WINDOW_CAPACITY, SEGMENT_METRICS_SHM, TEMP_DIR
+
+
+# Metrics tracked per segment, named like the dashboard point fields
+SEGMENT_METRICS = ['roi', 'conversions', 'ctr', 'cost_per_conversion', 'ad_spend']
+
+SEGMENT_CAMPAIGN_TYPES = ['Search Ads', 'Display Ads', 'Email', 'Social Media']
+SEGMENT_REGIONS = ['South America', 'North America', 'Asia', 'Europe']
+
+
+class SegmentRingBuffer:
+    """
+    Fixed-memory rolling aggregates of live prediction metrics per (Campaign Type, Region).
+
+    Every segment owns a ring of capacity + 1 slots holding running totals of each metric,
+    so an update writes a single slot and the sum over the last w predictions is the
+    difference of two slots. Updates and windowed sum/mean/count queries are O(1) per
+    segment, and the whole state is one float64 array plus one int64 array.
+
+    When shm_name is set the arrays live in a named shared-memory block, so every worker
+    that opens the same name reads and updates the same aggregates.
+    """
+
+    def __init__(self, campaign_types=SEGMENT_CAMPAIGN_TYPES, regions=SEGMENT_REGIONS,
+                 metrics=SEGMENT_METRICS, capacity=SEGMENT_WINDOW_CAPACITY, shm_name=None):
+        self.campaign_types = list(campaign_types)
+        self.regions = list(regions)
+        self.metrics = list(metrics)
+        self.capacity = int(capacity)
+        self._segment_index = {
+            (campaign_type, region): i * len(self.regions) + j
+            for i, campaign_type in enumerate(self.campaign_types)
+            for j, region in enumerate(self.regions)
+        }
+        n_segments = len(self._segment_index)
+        slots = self.capacity + 1
+
+        totals_shape = (n_segments, slots, len(self.metrics))
+        totals_bytes = int(np.prod(totals_shape)) * 8
+        counts_bytes = n_segments * 8
+
+        self._shm = None
+        if shm_name:
+            from multiprocessing import shared_memory, resource_tracker
+            # The capacity is part of the name, so a resized buffer never attaches to an old block
+            name = f"{shm_name}-{self.capacity}"
+            try:
+                # A new block is zero-filled already; clearing it here could wipe updates
+                # another worker made right after attaching
+                self._shm = shared_memory.SharedMemory(name=name, create=True, size=totals_bytes + counts_bytes)
+            except FileExistsError:
+                self._shm = shared_memory.SharedMemory(name=name)
+            # Otherwise the block is unlinked as soon as any one worker exits
+            resource_tracker.unregister(self._shm._name, 'shared_memory')
+            buffer = self._shm.buf
+            self._lock_path = os.path.join(TEMP_DIR, f"{name}.lock")
+        else:
+            buffer = bytearray(totals_bytes + counts_bytes)
+            self._lock_path = None
+
+        self._totals = np.ndarray(totals_shape, dtype=np.float64, buffer=buffer)
+        self._counts = np.ndarray((n_segments,), dtype=np.int64, buffer=buffer, offset=totals_bytes)
+        self._thread_lock = threading.Lock()
+
+    @contextmanager
+    def _locked(self):
+        with self._thread_lock:
+            if self._lock_path is None:
+                yield
+                return
+            import fcntl
+            with open(self._lock_path, 'a') as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def segment_index(self, campaign_type, region):
+        return self._segment_index.get((campaign_type, region))
+
+    def _push(self, segment, values):
+        slots = self.capacity + 1
+        n = self._counts[segment]
+        self._totals[segment, (n + 1) % slots] = self._totals[segment, n % slots] + values
+        self._counts[segment] = n + 1
+
+    def update(self, campaign_type, region, values):
+        """
+        Add one prediction to its segment.
+
+        Args:
+            campaign_type (str): Campaign Type of the prediction.
+            region (str): Region of the prediction.
+            values (dict): Metric name -> value; missing metrics count as 0.
+
+        Returns:
+            bool: False if the segment is unknown and the prediction was skipped.
+        """
+        segment = self.segment_index(campaign_type, region)
+        if segment is None:
+            return False
+        row = np.array([float(values.get(metric, 0.0) or 0.0) for metric in self.metrics])
+        with self._locked():
+            self._push(segment, row)
+        return True
+
+    def update_many(self, points):
+        """Add a batch of dashboard points (dicts with campaign_type, region and metric fields)."""
+        rows = []
+        for point in points:
+            segment = self.segment_index(point.get('campaign_type'), point.get('region'))
+            if segment is not None:
+                rows.append((segment, np.array([float(point.get(metric, 0.0) or 0.0) for metric in self.metrics])))
+        with self._locked():
+            for segment, row in rows:
+                self._push(segment, row)
+        return len(rows)
+
+    def effective_window(self, window=None):
+        """The window actually used for a requested one: the whole capacity by default, else clamped to 1..capacity."""
+        return self.capacity if window is None else max(1, min(int(window), self.capacity))
+
+    def window(self, window=None):
+        """
+        Windowed count, sum and mean of every metric over the last `window` predictions
+        of each segment (the whole capacity by default).
+
+        Returns:
+            tuple: (counts[n_segments], sums[n_segments, n_metrics], means[n_segments, n_metrics])
+        """
+        window = self.effective_window(window)
+        slots = self.capacity + 1
+        with self._locked():
+            n = self._counts.copy()
+            k = np.minimum(n, window)
+            segments = np.arange(len(n))
+            sums = self._totals[segments, n % slots] - self._totals[segments, (n - k) % slots]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            means = np.where(k[:, None] > 0, sums / k[:, None], 0.0)
+        return k, sums, means
+
+    def summary(self, window=None):
+        """Windowed aggregates as a list of JSON-ready dicts, one per segment."""
+        counts, sums, means = self.window(window)
+        summary = []
+        for (campaign_type, region), segment in self._segment_index.items():
+            summary.append({
+                'campaign_type': campaign_type,
+                'region': region,
+                'count': int(counts[segment]),
+                'sum': {metric: float(sums[segment, i]) for i, metric in enumerate(self.metrics)},
+                'mean': {metric: float(means[segment, i]) for i, metric in enumerate(self.metrics)}
+            })
+        return summary
+
+    def close(self):
+        if self._shm is not None:
+            # The array views must go before the shared-memory mapping can be closed
+            del self._totals, self._counts
+            self._shm.close()
@@ -0,0 +1,98 @@
+import json
+import numpy as np
+from flask import Response, request
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; fall back to the standard library encoder
+    orjson = None
+
+
+JSON_MIME_TYPE = 'application/json'
+COLUMNAR_JSON_MIME_TYPE = 'application/vnd.finvix.columnar+json'
+ARROW_STREAM_MIME_TYPE = 'application/vnd.apache.arrow.stream'
+
+# ?format= values and the media types they stand for
+RESULT_FORMATS = {
+    'json': JSON_MIME_TYPE,
+    'columnar': COLUMNAR_JSON_MIME_TYPE,
+    'arrow': ARROW_STREAM_MIME_TYPE,
+}
+
+
+def _default(obj):
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps(obj):
+    """Serialize to JSON bytes, handling NumPy scalars and arrays natively."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, default=_default, separators=(',', ':')).encode('utf-8')
+
+
+def json_response(obj, status=200, mimetype=JSON_MIME_TYPE):
+    return Response(dumps(obj), status=status, mimetype=mimetype)
+
+
+def negotiate_result_format():
+    """Pick the result format from ?format= or, failing that, the Accept header."""
+    requested = request.args.get('format') or request.form.get('format')
+    if requested in RESULT_FORMATS:
+        return requested
+    best = request.accept_mimetypes.best_match(
+        [JSON_MIME_TYPE, COLUMNAR_JSON_MIME_TYPE, ARROW_STREAM_MIME_TYPE], default=JSON_MIME_TYPE
+    )
+    return {mime: name for name, mime in RESULT_FORMATS.items()}[best]
+
+
+def to_columnar(results):
+    """Turn a list of per-row dicts into one list per field (fields in first-seen order)."""
+    fields = {}
+    for row in results:
+        for key in row:
+            fields.setdefault(key, None)
+    return {field: [row.get(field) for row in results] for field in fields}
+
+
+def arrow_stream(columns):
+    """Encode columnar results as an Arrow IPC stream."""
+    import pyarrow as pa
+    table = pa.Table.from_pydict(columns)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def results_response(results, metadata=None):
+    """
+    Serialize batch prediction results in the negotiated format.
+
+    json      - {'results': [...], 'status'} plus the metadata (always a list, even for one row)
+    columnar  - {'columns', 'data': {field: [values]}, 'row_count', 'status'}
+    arrow     - Arrow IPC stream with one column per field; metadata goes in X-Finvix-* headers
+    """
+    metadata = metadata or {}
+    result_format = negotiate_result_format()
+
+    if result_format == 'arrow':
+        response = Response(arrow_stream(to_columnar(results)), mimetype=ARROW_STREAM_MIME_TYPE)
+        response.headers['X-Finvix-Row-Count'] = str(len(results))
+        for key, value in metadata.items():
+            response.headers[f"X-Finvix-{key.replace('_', '-').title()}"] = str(value)
+        return response
+
+    if result_format == 'columnar':
+        columns = to_columnar(results)
+        body = {'columns': list(columns), 'data': columns, 'row_count': len(results), 'status': 'success'}
+        body.update(metadata)
+        return json_response(body, mimetype=COLUMNAR_JSON_MIME_TYPE)
+
+    body = {'results': results, 'status': 'success'}
+    body.update(metadata)
+    return json_response(body)
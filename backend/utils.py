@@ -1,5 +1,16 @@
-import requests
-from config import GEMINI_API_KEY
+from config import GEMINI_API_KEY, GEMINI_API_BASE, GEMINI_MODEL, GEMINI_TIMEOUT_SECONDS
+
+# One pooled session per process: keeps TLS connections to Gemini alive between calls.
+# requests is imported on first use to keep worker start-up light.
+_session = None
+
+def get_session():
+    global _session
+    if _session is None:
+        import requests
+        _session = requests.Session()
+        _session.headers.update({'Content-Type': 'application/json'})
+    return _session
 
 def fetch_suggestions(prompt):
     """
@@ -14,13 +25,16 @@ def fetch_suggestions(prompt):
     gemini_payload = {
         "contents": [{"parts": [{"text": prompt}]}]
     }
-    headers = {'Content-Type': 'application/json'}
-    gemini_url = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0-flash:generateContent?key={GEMINI_API_KEY}"
-    response = requests.post(gemini_url, headers=headers, json=gemini_payload)
+    gemini_url = f"{GEMINI_API_BASE}/models/{GEMINI_MODEL}:generateContent?key={GEMINI_API_KEY}"
+    import requests
+    try:
+        response = get_session().post(gemini_url, json=gemini_payload, timeout=GEMINI_TIMEOUT_SECONDS)
+    except requests.RequestException as e:
+        return f'Unable to fetch suggestions ({type(e).__name__})'
     if response.status_code == 200:
         try:
             return response.json()['candidates'][0]['content']['parts'][0]['text']
         except (KeyError, IndexError):
             return 'Failed to parse Gemini API response'
     else:
-        return f'Unable to fetch suggestions (HTTP {response.status_code})'
\ No newline at end of file
+        return f'Unable to fetch suggestions (HTTP {response.status_code})'
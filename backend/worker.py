@@ -0,0 +1,64 @@
+"""
+Background worker for queued /upload_predict jobs.
+
+Run one or more of these next to the web service, on any node that can reach the database:
+    python worker.py            # poll forever
+    python worker.py --burst    # drain the queue and exit
+"""
+import argparse
+import signal
+import time
+from app import app, init_db, warm_up_worker
+from config import JOB_POLL_INTERVAL, JOB_STALE_SECONDS
+from jobs import claim_next_job, requeue_stale_jobs, run_job, default_worker_id
+from logging_setup import get_logger
+
+
+log = get_logger('worker')
+
+
+stopping = False
+
+
+def request_stop(signum, frame):
+    global stopping
+    stopping = True
+    log.info("🛑 Worker stopping after the current job...")
+
+
+def work(worker_id, burst=False):
+    last_recovery = 0.0
+    with app.app_context():
+        while not stopping:
+            if time.monotonic() - last_recovery >= JOB_STALE_SECONDS / 2:
+                requeued, failed = requeue_stale_jobs()
+                if requeued or failed:
+                    log.warning(f"♻️ Requeued {requeued} stale job(s), failed {failed}")
+                last_recovery = time.monotonic()
+
+            job = claim_next_job(worker_id)
+            if job is None:
+                if burst:
+                    break
+                time.sleep(JOB_POLL_INTERVAL)
+                continue
+
+            log.info(f"⚙️ {worker_id} running job {job.id} ({job.filename})")
+            started = time.perf_counter()
+            run_job(job, worker_id)
+            log.info(f"✅ Job {job.id} finished in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Finvix background job worker')
+    parser.add_argument('--burst', action='store_true', help='Exit when the queue is empty')
+    parser.add_argument('--worker-id', default=default_worker_id())
+    args = parser.parse_args()
+
+    signal.signal(signal.SIGTERM, request_stop)
+    signal.signal(signal.SIGINT, request_stop)
+
+    init_db()
+    warm_up_worker()
+    log.info(f"🚀 Starting Finvix worker {args.worker_id}")
+    work(args.worker_id, burst=args.burst)
@@ -58,7 +58,12 @@ const FileUpload = ({ onUpload }) => {
         results = [results];
       }
 
-      onUpload(results, modelType, fileFormat);
+      // The server keeps a copy under result_id: pages, reports and exports refer to it
+      // instead of holding (and re-posting) every row
+      onUpload(results, modelType, fileFormat, {
+        resultId: res.data.result_id || null,
+        total: results.length,
+      });
       toast.success('File uploaded and predictions generated successfully!');
       
       // Clear file after successful upload
@@ -1,23 +1,57 @@
 import React, { useState } from 'react';
 import { motion } from 'framer-motion';
+import { toast } from 'react-toastify';
+import api from '../config/api';
 import FileUpload from './FileUpload';
 import ResultsDisplay from './ResultsDisplay';
 import ReportButton from './ReportButton';
 
+// Rows shown per page when the server holds the results under a result_id
+const PAGE_SIZE = 100;
+
 const FileUploadContent = () => {
   const [fileUploadResults, setFileUploadResults] = useState(null);
   const [modelType, setModelType] = useState('both');
   const [fileFormat, setFileFormat] = useState('csv');
+  const [resultId, setResultId] = useState(null);
+  const [total, setTotal] = useState(0);
+  const [offset, setOffset] = useState(0);
+  const [isPaging, setIsPaging] = useState(false);
 
-  const handleFileUploadResults = (results, modelType, format = 'csv') => {
+  const handleFileUploadResults = (results, modelType, format = 'csv', { resultId = null, total } = {}) => {
     const normalizedResults = Array.isArray(results) ? results : [results];
-    setFileUploadResults(normalizedResults);
+    // With a result_id only the first page is kept; the rest is fetched on demand
+    setFileUploadResults(resultId ? normalizedResults.slice(0, PAGE_SIZE) : normalizedResults);
+    setResultId(resultId);
+    setTotal(total ?? normalizedResults.length);
+    setOffset(0);
     setModelType(modelType);
     setFileFormat(format);
   };
 
+  const loadPage = async (pageOffset) => {
+    if (!resultId) return;
+    setIsPaging(true);
+    try {
+      const res = await api.get(`/results/${resultId}`, {
+        params: { offset: pageOffset, limit: PAGE_SIZE },
+      });
+      setFileUploadResults(res.data.results || []);
+      setTotal(res.data.total);
+      setOffset(res.data.offset);
+    } catch (err) {
+      console.error('Results page error:', err.response?.data || err);
+      toast.error(`Failed to load results: ${err.response?.data?.error || err.message || 'Unknown error'}`);
+    } finally {
+      setIsPaging(false);
+    }
+  };
+
   const handleClearResults = () => {
     setFileUploadResults(null);
+    setResultId(null);
+    setTotal(0);
+    setOffset(0);
     setModelType('both');
     setFileFormat('csv');
   };
@@ -60,7 +94,7 @@ const FileUploadContent = () => {
                   Prediction Results
                 </h3>
                 <p className="text-slate-400 text-sm">
-                  {fileUploadResults.length} prediction{fileUploadResults.length > 1 ? 's' : ''} generated successfully
+                  {total} prediction{total > 1 ? 's' : ''} generated successfully
                 </p>
               </div>
               <button
@@ -75,6 +109,29 @@ const FileUploadContent = () => {
           {/* Results Display */}
           <ResultsDisplay results={fileUploadResults} modelType={modelType} />
 
+          {/* Pagination - only when the server holds more rows than one page */}
+          {resultId && total > PAGE_SIZE && (
+            <div className="flex items-center justify-between bg-slate-800/50 rounded-xl px-6 py-4 border border-slate-700/50">
+              <button
+                onClick={() => loadPage(Math.max(offset - PAGE_SIZE, 0))}
+                disabled={isPaging || offset === 0}
+                className="px-4 py-2 bg-slate-700 hover:bg-slate-600 text-slate-200 rounded-lg transition-colors duration-200 text-sm font-medium disabled:opacity-50 disabled:cursor-not-allowed"
+              >
+                Previous
+              </button>
+              <span className="text-slate-400 text-sm">
+                Rows {offset + 1}-{Math.min(offset + PAGE_SIZE, total)} of {total}
+              </span>
+              <button
+                onClick={() => loadPage(offset + PAGE_SIZE)}
+                disabled={isPaging || offset + PAGE_SIZE >= total}
+                className="px-4 py-2 bg-slate-700 hover:bg-slate-600 text-slate-200 rounded-lg transition-colors duration-200 text-sm font-medium disabled:opacity-50 disabled:cursor-not-allowed"
+              >
+                Next
+              </button>
+            </div>
+          )}
+
           {/* Report Action Buttons */}
           <div className="bg-gradient-to-br from-slate-900 via-slate-800 to-slate-900 rounded-2xl p-6 sm:p-8 shadow-2xl border border-slate-700/50 backdrop-blur-lg">
             <div className="mb-4">
@@ -89,11 +146,13 @@ const FileUploadContent = () => {
               <ReportButton
                 type="upload-report"
                 results={fileUploadResults}
+                resultId={resultId}
                 modelType={modelType}
               />
               <ReportButton
                 type="download-results"
                 results={fileUploadResults}
+                resultId={resultId}
                 modelType={modelType}
                 fileFormat={fileFormat}
               />
@@ -51,7 +51,12 @@ const Greeting = () => {
   }, [navigate]);
 
   const handleLogout = () => {
+    const refreshToken = localStorage.getItem('refresh_token');
+    if (refreshToken) {
+      api.post('/logout', null, { headers: { Authorization: `Bearer ${refreshToken}` } }).catch(() => {});
+    }
     localStorage.removeItem('token');
+    localStorage.removeItem('refresh_token');
     localStorage.removeItem('username');
     navigate('/login');
   };
@@ -6,6 +6,7 @@ import 'react-toastify/dist/ReactToastify.css';
 import { FaBars } from 'react-icons/fa';
 import { FiLogOut } from 'react-icons/fi';
 import Sidebar from './Sidebar';
+import api from '../config/api';
 
 const Layout = () => {
   const [isSidebarOpen, setIsSidebarOpen] = useState(false);
@@ -14,8 +15,13 @@ const Layout = () => {
   const toggleSidebar = () => setIsSidebarOpen(!isSidebarOpen);
 
   const handleLogout = () => {
-    // Clear all user data
+    // Revoke the refresh token server-side, then clear all user data
+    const refreshToken = localStorage.getItem('refresh_token');
+    if (refreshToken) {
+      api.post('/logout', null, { headers: { Authorization: `Bearer ${refreshToken}` } }).catch(() => {});
+    }
     localStorage.removeItem('token');
+    localStorage.removeItem('refresh_token');
     localStorage.removeItem('username');
     navigate('/login');
   };
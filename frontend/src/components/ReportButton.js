@@ -6,7 +6,10 @@ import { toast } from 'react-toastify';
 import { FiDownload, FiFileText, FiDatabase } from 'react-icons/fi';
 import api from '../config/api';
 
-const ReportButton = ({ sectionId, type, results, modelType, fileFormat = 'csv' }) => {
+const ReportButton = ({ sectionId, type, results, resultId, modelType, fileFormat = 'csv' }) => {
+  // Stored upload results are referenced by id; the client may only hold one page of them
+  const resultsPayload = () => (resultId ? { result_id: resultId } : { results });
+
   const handleFrontendDownload = () => {
     const section = document.getElementById(sectionId);
     if (!section) {
@@ -89,16 +92,16 @@ const ReportButton = ({ sectionId, type, results, modelType, fileFormat = 'csv'
   };
 
   const handleUploadReportDownload = async () => {
-    console.log('Sending to /upload_report:', { results, model_type: modelType });
+    console.log('Sending to /upload_report:', { ...resultsPayload(), model_type: modelType });
     
-    if (!results || !Array.isArray(results) || results.length === 0 || !modelType) {
+    if ((!resultId && (!results || !Array.isArray(results) || results.length === 0)) || !modelType) {
       toast.error('No valid results or model type provided to generate report');
       return;
     }
 
     try {
       const res = await api.post('/upload_report', 
-        { results, model_type: modelType }, 
+        { ...resultsPayload(), model_type: modelType }, 
         {
           headers: { 'Content-Type': 'application/json' },
           responseType: 'blob',
@@ -145,7 +148,7 @@ const ReportButton = ({ sectionId, type, results, modelType, fileFormat = 'csv'
   };
 
   const handleDownloadResults = async () => {
-    if (!results || !modelType) {
+    if ((!resultId && !results) || !modelType) {
       toast.error('No results or model type provided to download');
       return;
     }
@@ -154,7 +157,7 @@ const ReportButton = ({ sectionId, type, results, modelType, fileFormat = 'csv'
 
     try {
       const res = await api.post('/download_results', 
-        { results, model_type: modelType, file_type: fileType }, 
+        { ...resultsPayload(), model_type: modelType, file_type: fileType }, 
         {
           headers: { 'Content-Type': 'application/json' },
           responseType: 'blob',
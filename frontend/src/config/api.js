@@ -21,7 +21,8 @@ const api = axios.create({
 api.interceptors.request.use(
   (config) => {
     const token = localStorage.getItem('token');
-    if (token) {
+    // Keep an explicit Authorization header (e.g. the refresh token sent to /logout)
+    if (token && !config.headers['Authorization']) {
       config.headers['Authorization'] = `Bearer ${token}`;
     }
     
@@ -61,7 +62,24 @@ api.interceptors.response.use(
     
     return response;
   },
-  (error) => {
+  async (error) => {
+    // Access tokens are short-lived: renew once with the refresh token and retry
+    const original = error.config;
+    const refreshToken = localStorage.getItem('refresh_token');
+    if (error.response?.status === 401 && refreshToken && original && !original._retried && original.url !== '/refresh') {
+      original._retried = true;
+      try {
+        const { data } = await axios.post(`${API_URL}/refresh`, null, {
+          headers: { Authorization: `Bearer ${refreshToken}` },
+        });
+        localStorage.setItem('token', data.access_token);
+        original.headers['Authorization'] = `Bearer ${data.access_token}`;
+        return api(original);
+      } catch (refreshError) {
+        console.warn('🔒 Refresh token rejected');
+      }
+    }
+
     // ✅ ENHANCED: More detailed error logging
     console.error('❌ API Error:', {
       message: error.message,
@@ -77,6 +95,7 @@ api.interceptors.response.use(
     if (error.response?.status === 401) {
       console.warn('🔒 Unauthorized - Clearing session and redirecting to login');
       localStorage.removeItem('token');
+      localStorage.removeItem('refresh_token');
       localStorage.removeItem('username');
       
       // Prevent redirect loop
@@ -19,8 +19,9 @@ const Login = () => {
     try {
       const response = await api.post('/login', { username, password });
       
-      // Store token and username
+      // Store tokens and username; the refresh token renews short-lived access tokens
       localStorage.setItem('token', response.data.access_token);
+      localStorage.setItem('refresh_token', response.data.refresh_token);
       localStorage.setItem('username', username);
       
       // Navigate to greeting page